@@ -0,0 +1,76 @@
+"""
+Back-to-back writes through the public entry points.
+
+Builds a scratch db with --problems problems, then times --writes calls of
+done.apply_done (random grades over the first problems) followed by the same
+number of show.load_show calls. With --cache the process-level connection
+cache (db.enable_connection_cache) is on, so every call reuses one
+connection and its prepared statements.
+
+    python benchmarks/connection.py [--problems 5000] [--writes 500] [--cache]
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from lc import db  # noqa: E402
+from lc.done import apply_done  # noqa: E402
+from lc.importer import import_plan  # noqa: E402
+from lc.show import load_show  # noqa: E402
+
+
+def build(tmp: Path, problems: int) -> Path:
+    plan = tmp / "plan.txt"
+    plan.write_text(
+        "Phase 0: bench\n" + "".join(f"{i} Problem {i}\n" for i in range(1, problems + 1)),
+        encoding="utf-8",
+    )
+    path = tmp / "bench.db"
+    db.init_db(path)
+    import_plan(path, plan)
+    return path
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--problems", type=int, default=5000)
+    ap.add_argument("--writes", type=int, default=500)
+    ap.add_argument("--cache", action="store_true", help="reuse one cached connection")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as d:
+        path = build(Path(d), args.problems)
+        if args.cache:
+            db.enable_connection_cache()
+
+        pool = range(1, min(args.problems, 200) + 1)
+        t0 = time.perf_counter()
+        for _ in range(args.writes):
+            apply_done(path, rng.choice(pool), rng.choice(("again", "hard", "good", "easy")), None)
+        t_done = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        for _ in range(args.writes):
+            load_show(path)
+        t_show = time.perf_counter() - t0
+
+        if args.cache:
+            db.close_cached_connections()
+
+    n = args.writes
+    print(f"apply_done: {t_done * 1000:8.1f} ms total, {t_done / n * 1e6:7.0f} us/call")
+    print(f"load_show:  {t_show * 1000:8.1f} ms total, {t_show / n * 1e6:7.0f} us/call")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
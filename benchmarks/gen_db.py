@@ -0,0 +1,149 @@
+"""
+Synthetic database generator for benchmarks.
+
+Builds a db with
+- N problems in a plan (phases of 50, plan_order 1..N; plan.txt written next to the db)
+- M cards in `reviews` (the first M problems in plan order, as if studied in order)
+- ~K rows in `review_logs`, produced by replaying grade sequences through srs.next_state
+
+Grades follow a simple forgetting model: the chance of `again` grows with the
+interval (half-life ~90 days); passing reviews are hard/good/easy 20/60/20. Each review happens at the
+card's due time plus a small delay, and each card's history is shifted so that its
+last review lies in the past. Cards that retire early hand their remaining log
+budget to the cards after them, so the log count ends up close to K (slightly
+under if the last cards retire).
+
+    python benchmarks/gen_db.py out.db --problems 50000 --cards 20000 --logs 1000000
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from lc.db import connect, init_db, tx  # noqa: E402
+from lc.done import INSERT_LOG_SQL, UPSERT_REVIEW_SQL  # noqa: E402
+from lc.frontier import advance_cursor  # noqa: E402
+from lc.srs import SECONDS_PER_DAY, next_state  # noqa: E402
+
+PHASE_SIZE = 50
+PASS_GRADES = ("hard", "good", "easy")
+PASS_WEIGHTS = (0.2, 0.6, 0.2)
+
+
+def write_plan(path: Path, problems: int) -> Path:
+    with path.open("w", encoding="utf-8") as f:
+        for i in range(problems):
+            if i % PHASE_SIZE == 0:
+                f.write(f"Phase {i // PHASE_SIZE}: synthetic {i // PHASE_SIZE}\n")
+            f.write(f"{i + 1} Problem {i + 1}\n")
+    return path
+
+
+def _grade(rng: random.Random, interval_days: float) -> str:
+    # recall halves every ~90 days of interval: histories stay within a few years
+    p_again = 0.05 + 0.9 * (1.0 - 0.5 ** (interval_days / 90.0))
+    if rng.random() < p_again:
+        return "again"
+    return rng.choices(PASS_GRADES, PASS_WEIGHTS)[0]
+
+
+def card_history(rng: random.Random, n_logs: int, now: int):
+    """
+    Replay up to n_logs reviews from t=0; stops early if the card retires.
+    Returns ([(t, grade, prev, nxt)], shift) where shift moves the last review into the past 30 days.
+    """
+    steps = []
+    prev = None
+    t = 0
+    for _ in range(n_logs):
+        grade = _grade(rng, prev.interval_days if prev else 0.0)
+        nxt = next_state(prev, grade, t)
+        steps.append((t, grade, prev, nxt))
+        if nxt.status == "retired":
+            break
+        prev = nxt
+        t = nxt.due_at + rng.randrange(0, 2 * SECONDS_PER_DAY)
+    shift = now - rng.randrange(0, 30 * SECONDS_PER_DAY) - steps[-1][0]
+    return steps, shift
+
+
+def generate(db_path: Path, problems: int, cards: int, logs: int, seed: int = 0, now: int | None = None) -> dict:
+    """Build the db at db_path (must not exist). Returns counts actually written."""
+    if db_path.exists():
+        raise FileExistsError(db_path)
+    if cards > problems:
+        raise ValueError("cards must be <= problems")
+    now = int(time.time()) if now is None else now
+    rng = random.Random(seed)
+
+    plan = write_plan(db_path.with_suffix(".plan.txt"), problems)
+    init_db(db_path)
+    conn = connect(db_path)
+    with tx(conn):
+        conn.executemany(
+            "INSERT INTO phases(id, name) VALUES(?,?);",
+            ((k + 1, f"synthetic {k}") for k in range((problems + PHASE_SIZE - 1) // PHASE_SIZE)),
+        )
+        conn.executemany(
+            "INSERT INTO problems(lc_num, title, phase_id, plan_order, is_optional) VALUES(?,?,?,?,0);",
+            ((i, f"Problem {i}", (i - 1) // PHASE_SIZE + 1, i) for i in range(1, problems + 1)),
+        )
+
+    log_rows = []
+    review_rows = []
+    budget = logs
+    for c in range(cards):
+        if budget <= 0:
+            break
+        share = max(1, budget // (cards - c))
+        # spread around the mean share so cards differ in history length
+        n = min(budget, rng.randint(max(1, share // 2), share * 3 // 2 + 1))
+        steps, shift = card_history(rng, n, now)
+        lc = c + 1
+        for t, grade, prev, nxt in steps:
+            log_rows.append((
+                lc, t + shift, grade,
+                prev.due_at + shift if prev else None, nxt.due_at + shift,
+                prev.interval_days if prev else None, nxt.interval_days,
+                prev.ease if prev else None, nxt.ease,
+                None,
+            ))
+        final = steps[-1][3]
+        review_rows.append((
+            lc, final.due_at + shift, final.interval_days, final.ease, final.reps, final.lapses,
+            final.easy_streak, final.last_grade, final.status, steps[-1][0] + shift,
+        ))
+        budget -= len(steps)
+
+    log_rows.sort(key=lambda r: r[1])  # ids increase with time, as in real use
+    with tx(conn):
+        conn.executemany(INSERT_LOG_SQL, log_rows)
+        conn.executemany(UPSERT_REVIEW_SQL, review_rows)
+        advance_cursor(conn)
+    conn.close()
+    return {"problems": problems, "cards": len(review_rows), "logs": len(log_rows), "plan": str(plan)}
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("out", type=Path)
+    ap.add_argument("--problems", type=int, default=5000)
+    ap.add_argument("--cards", type=int, default=2000)
+    ap.add_argument("--logs", type=int, default=50000)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    info = generate(args.out, args.problems, args.cards, args.logs, seed=args.seed)
+    print(f"{args.out}: {info['problems']} problems, {info['cards']} cards, {info['logs']} logs "
+          f"({time.perf_counter() - t0:.1f} s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""
+Import-time guard for the lc CLI.
+
+Runs `python -X importtime -c "import lc.cli"` a few times and checks that
+- no command module / rich / numpy is imported just to build the CLI
+- the lc.* modules' own import cost stays under a budget
+
+Also times a full hot `lc show` / `lc version` in a fresh interpreter.
+
+    python benchmarks/import_time.py [--db lcsrs.db] [--budget-ms 20] [--runs 5]
+
+Exits 1 if a check fails.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+
+# must not be imported by `import lc.cli`
+FORBIDDEN = (
+    "rich",
+    "numpy",
+    "lc.importer",
+    "lc.show",
+    "lc.done",
+    "lc.seed",
+    "lc.history",
+    "lc.stats",
+    "lc.open_cmd",
+    "lc.forecast",
+    "lc.replay",
+    "lc.frontier",
+    "lc.output",
+)
+
+LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+
+def _env() -> dict:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = str(SRC) + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def importtime(stmt: str) -> dict[str, tuple[int, int]]:
+    """(self, cumulative) import time in us per module for one fresh run."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", stmt],
+        capture_output=True, text=True, env=_env(), check=True,
+    )
+    out: dict[str, tuple[int, int]] = {}
+    for line in proc.stderr.splitlines():
+        m = LINE_RE.match(line)
+        if m:
+            out[m.group(4)] = (int(m.group(1)), int(m.group(2)))
+    return out
+
+
+def wall_ms(argv: list[str], runs: int) -> float:
+    code = f"import sys; sys.argv={['lc', *argv]!r}; from lc.cli import main; main()"
+    best = float("inf")
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], stdout=subprocess.DEVNULL, env=_env(), check=True)
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def wall_ms_pass(runs: int) -> float:
+    best = float("inf")
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], env=_env(), check=True)
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--db", type=Path, default=None, help="db for timing `lc show` (skipped if omitted)")
+    ap.add_argument("--budget-ms", type=float, default=20.0, help="max self import time of lc.* modules")
+    ap.add_argument("--runs", type=int, default=5)
+    args = ap.parse_args()
+
+    runs = [importtime("import lc.cli") for _ in range(args.runs)]
+    best = min(runs, key=lambda t: t.get("lc.cli", (0, 0))[1])
+
+    failed = False
+    bad = sorted(m for m in best if any(m == f or m.startswith(f + ".") for f in FORBIDDEN))
+    if bad:
+        print(f"FAIL eagerly imported: {', '.join(bad)}")
+        failed = True
+
+    total_ms = best.get("lc.cli", (0, 0))[1] / 1000
+    typer_ms = best.get("typer", (0, 0))[1] / 1000
+    own_ms = sum(v[0] for m, v in best.items() if m == "lc" or m.startswith("lc.")) / 1000
+    print(f"import lc.cli: {total_ms:.1f} ms (typer {typer_ms:.1f} ms, lc.* self {own_ms:.1f} ms)")
+    if own_ms > args.budget_ms:
+        print(f"FAIL lc.* import cost {own_ms:.1f} ms > budget {args.budget_ms:.1f} ms")
+        failed = True
+
+    print(f"python -c pass: {wall_ms_pass(args.runs):.1f} ms")
+    print(f"lc version:     {wall_ms(['version'], args.runs):.1f} ms")
+    if args.db is not None:
+        print(f"lc show:        {wall_ms(['show', '--db', str(args.db)], args.runs):.1f} ms")
+        print(f"lc stats:       {wall_ms(['stats', '--db', str(args.db)], args.runs):.1f} ms")
+
+    print("FAIL" if failed else "OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
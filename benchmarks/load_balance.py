@@ -0,0 +1,95 @@
+"""
+Queue-stability simulation for load-levelled due dates (meta load_balance=1).
+
+Pure in-memory: no db. Each simulated day introduces --new cards, then reviews
+the cards due that day (oldest first) up to --capacity; the rest carry over as
+backlog. Grades come from the same forgetting model as gen_db.py and go through
+srs.next_state, once without a balancer and once with balance.LoadBalancer over
+the simulated due-day histogram. Reports mean / std / peak of the cards due per
+day (after a warm-up), the largest backlog and the number of days over capacity.
+
+    python benchmarks/load_balance.py --days 365 --new 10 --capacity 160
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import sys
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from gen_db import _grade  # noqa: E402
+from lc.balance import LoadBalancer  # noqa: E402
+from lc.srs import SECONDS_PER_DAY, ReviewState, next_state  # noqa: E402
+
+
+def simulate(days: int, new_per_day: int, capacity: int, balance: bool, seed: int = 0, warmup: int = 60) -> Dict[str, float]:
+    rng = random.Random(seed)
+    cards: Dict[int, ReviewState] = {}
+    load: Counter = Counter()  # active cards per due day, as due_days would hold it
+    bal: Optional[LoadBalancer] = None
+    if balance:
+        bal = LoadBalancer(capacity=capacity, loader=lambda lo, hi: {d: load[d] for d in range(lo, hi + 1)})
+
+    def schedule(c: int, prev: Optional[ReviewState], grade: str, now: int) -> None:
+        if prev is not None and prev.status == "active":
+            load[prev.due_at // SECONDS_PER_DAY] -= 1
+            if bal is not None:
+                bal.release(prev.due_at)
+        nxt = next_state(prev, grade, now, bal)
+        cards[c] = nxt
+        if nxt.status == "active":
+            load[nxt.due_at // SECONDS_PER_DAY] += 1
+
+    due_per_day: List[int] = []
+    backlog_max = 0
+    over = 0
+    next_id = 0
+    for day in range(days):
+        now = day * SECONDS_PER_DAY + 9 * 3600
+        due = sorted(
+            (s.due_at, c) for c, s in cards.items() if s.status == "active" and s.due_at // SECONDS_PER_DAY <= day
+        )
+        done_today = due[:capacity] if capacity > 0 else due
+        for _, c in done_today:
+            prev = cards[c]
+            schedule(c, prev, _grade(rng, prev.interval_days), now)
+        for _ in range(new_per_day):
+            next_id += 1
+            schedule(next_id, None, _grade(rng, 0.0), now)
+        if day >= warmup:
+            due_per_day.append(len(due))
+            backlog_max = max(backlog_max, len(due) - len(done_today))
+            over += capacity > 0 and len(due) > capacity
+    return {
+        "mean": statistics.fmean(due_per_day),
+        "std": statistics.pstdev(due_per_day),
+        "peak": max(due_per_day),
+        "backlog_max": backlog_max,
+        "days_over": over,
+    }
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--days", type=int, default=365)
+    ap.add_argument("--new", type=int, default=10, help="new cards per day")
+    ap.add_argument("--capacity", type=int, default=160, help="reviews per day (0 = unlimited)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--warmup", type=int, default=60, help="days excluded from the stats")
+    args = ap.parse_args()
+
+    print(f"{'':<10} {'mean':>7} {'std':>7} {'peak':>6} {'backlog':>8} {'days>cap':>9}")
+    for name, balance in (("ideal", False), ("balanced", True)):
+        r = simulate(args.days, args.new, args.capacity, balance, seed=args.seed, warmup=args.warmup)
+        print(f"{name:<10} {r['mean']:7.1f} {r['std']:7.1f} {r['peak']:6d} {r['backlog_max']:8d} {r['days_over']:9d}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+"""
+Benchmark suite: times the public entry points on generated databases.
+
+For each scale (see SCALES) a db is generated once with gen_db.py into --workdir
+(reused on later runs), then each operation is timed --repeat times:
+
+  load_show        show.load_show
+  show_phase       show.load_show(phase=...) for a phase in the middle of the plan
+  apply_done       done.apply_done on a random studied card
+  compute_stats    stats.compute_stats
+  phase_stats      stats.compute_phase_stats (lc stats --by-phase)
+  fetch_history    history.fetch_history(n=20), first page
+  history_deep     history.fetch_history(n=20) 90% of the way back (keyset cursor)
+  import_plan      importer.import_plan of the full plan into an empty db
+  reimport_plan    importer.import_plan(force=True) of the same plan (diff, no changes)
+  mark_done_before seed.mark_done_before(last problem) on a freshly imported db
+
+Writes go to a copy of the generated db, so the cached one stays pristine.
+Results (min/median ms per op) are written as JSON; --compare old.json prints
+min-time ratios and exits 1 if any op got slower than --threshold.
+
+    python benchmarks/run.py --scales small,medium --out bench.json
+    python benchmarks/run.py --scales small --compare bench.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+from gen_db import PHASE_SIZE, generate  # noqa: E402
+from lc.db import init_db  # noqa: E402
+from lc.done import apply_done  # noqa: E402
+from lc.history import fetch_history  # noqa: E402
+from lc.importer import import_plan  # noqa: E402
+from lc.seed import mark_done_before  # noqa: E402
+from lc.show import load_show  # noqa: E402
+from lc.stats import compute_phase_stats, compute_stats  # noqa: E402
+
+# name -> (problems, cards, logs)
+SCALES = {
+    "small": (1_000, 500, 10_000),
+    "medium": (10_000, 5_000, 100_000),
+    "large": (50_000, 20_000, 1_000_000),
+}
+
+
+def _time(fn: Callable[[], object], repeat: int, setup: Callable[[], object] | None = None) -> Dict[str, float]:
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return {"min_ms": round(min(samples), 3), "median_ms": round(statistics.median(samples), 3), "runs": repeat}
+
+
+def _ensure_db(workdir: Path, scale: str) -> Path:
+    problems, cards, logs = SCALES[scale]
+    path = workdir / f"{scale}.db"
+    if not path.exists():
+        t0 = time.perf_counter()
+        generate(path, problems, cards, logs, seed=0)
+        print(f"  generated {path.name} ({time.perf_counter() - t0:.1f} s)", file=sys.stderr)
+    return path
+
+
+def bench_scale(workdir: Path, scale: str, repeat: int) -> Dict[str, Dict[str, float]]:
+    problems, cards, _ = SCALES[scale]
+    src = _ensure_db(workdir, scale)
+    plan = src.with_suffix(".plan.txt")
+    rng = random.Random(1)
+    out: Dict[str, Dict[str, float]] = {}
+
+    with tempfile.TemporaryDirectory(dir=workdir) as d:
+        tmp = Path(d)
+        db = tmp / "work.db"
+        shutil.copy(src, db)
+
+        out["load_show"] = _time(lambda: load_show(db), repeat)
+        out["apply_done"] = _time(
+            lambda: apply_done(db, rng.randint(1, cards), rng.choice(("again", "hard", "good")), None), repeat
+        )
+        out["show_phase"] = _time(lambda: load_show(db, phase=f"synthetic {problems // PHASE_SIZE // 2}"), repeat)
+        out["compute_stats"] = _time(lambda: compute_stats(db), repeat)
+        out["phase_stats"] = _time(lambda: compute_phase_stats(db), repeat)
+        out["fetch_history"] = _time(lambda: fetch_history(db, n=20), repeat)
+
+        conn = sqlite3.connect(str(db))
+        n_logs = conn.execute("SELECT COUNT(*) FROM review_logs;").fetchone()[0]
+        row = conn.execute(
+            "SELECT reviewed_at, id FROM review_logs ORDER BY reviewed_at DESC, id DESC LIMIT 1 OFFSET ?;",
+            (max(0, int(n_logs * 0.9) - 1),),
+        ).fetchone()
+        conn.close()
+        deep = f"{row[0]}:{row[1]}" if row else None
+        out["history_deep"] = _time(lambda: fetch_history(db, n=20, before=deep), repeat)
+
+        empty = tmp / "empty.db"
+        init_db(empty)
+        fresh = tmp / "fresh.db"
+        out["import_plan"] = _time(
+            lambda: import_plan(fresh, plan), max(3, repeat // 5), setup=lambda: shutil.copy(empty, fresh)
+        )
+        out["reimport_plan"] = _time(lambda: import_plan(fresh, plan, force=True), max(3, repeat // 5))
+
+        imported = tmp / "imported.db"
+        shutil.copy(fresh, imported)
+        out["mark_done_before"] = _time(
+            lambda: mark_done_before(fresh, problems), max(3, repeat // 5), setup=lambda: shutil.copy(imported, fresh)
+        )
+    return out
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(old: dict, new: dict, threshold: float) -> bool:
+    """
+    Print old/new per op; True if any op regressed beyond threshold. Compares the
+    min of the runs, which is far less noisy than the median on a busy machine.
+    """
+    regressed = False
+    print(f"{'scale':<8} {'op':<18} {'old ms':>10} {'new ms':>10} {'ratio':>7}")
+    for scale, ops in new["results"].items():
+        for op, r in ops.items():
+            base = old.get("results", {}).get(scale, {}).get(op)
+            if base is None:
+                continue
+            ratio = r["min_ms"] / base["min_ms"] if base["min_ms"] else float("inf")
+            flag = "  REGRESSION" if ratio > threshold else ""
+            regressed |= bool(flag)
+            print(f"{scale:<8} {op:<18} {base['min_ms']:>10.2f} {r['min_ms']:>10.2f} {ratio:>6.2f}x{flag}")
+    return regressed
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--scales", default="small,medium", help=f"comma list of {', '.join(SCALES)}")
+    ap.add_argument("--repeat", type=int, default=20)
+    ap.add_argument("--workdir", type=Path, default=ROOT / "benchmarks" / ".data", help="generated dbs are cached here")
+    ap.add_argument("--out", type=Path, default=None, help="write results JSON here")
+    ap.add_argument("--compare", type=Path, default=None, help="previous results JSON")
+    ap.add_argument("--threshold", type=float, default=1.25, help="min-time ratio counted as a regression")
+    args = ap.parse_args()
+
+    scales = [s.strip() for s in args.scales.split(",") if s.strip()]
+    unknown = [s for s in scales if s not in SCALES]
+    if unknown:
+        ap.error(f"unknown scale(s): {', '.join(unknown)}")
+    args.workdir.mkdir(parents=True, exist_ok=True)
+
+    results = {}
+    for scale in scales:
+        print(f"[{scale}] problems/cards/logs = {SCALES[scale]}", file=sys.stderr)
+        results[scale] = bench_scale(args.workdir, scale, args.repeat)
+        for op, r in results[scale].items():
+            print(f"  {op:<18} min {r['min_ms']:9.2f} ms   median {r['median_ms']:9.2f} ms")
+
+    doc = {
+        "meta": {
+            "commit": _git_commit(),
+            "created_at": int(time.time()),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "scales": {s: dict(zip(("problems", "cards", "logs"), SCALES[s])) for s in scales},
+        },
+        "results": results,
+    }
+    if args.out is not None:
+        args.out.write_text(json.dumps(doc, indent=2) + "\n", encoding="utf-8")
+        print(f"wrote {args.out}", file=sys.stderr)
+
+    if args.compare is not None:
+        old = json.loads(args.compare.read_text(encoding="utf-8"))
+        return 1 if compare(old, doc, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
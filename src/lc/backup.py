@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from functools import partial
+from typing import Dict, List, Optional, Tuple
+
+from . import clock
+
+# `lc backup` / `lc restore`: online copies through the SQLite backup API, never
+# a file copy (which can tear while `lc done` writes).
+#
+# The copy runs in steps of `pages` pages with a short sleep in between, so a
+# nightly run over many databases doesn't saturate the disk. On a WAL database
+# (the default, db.DEFAULT_PRAGMAS) the source connection also holds one read
+# snapshot for the whole copy: writers are not blocked by readers in WAL, and a
+# commit from another process can't force the backup to start over. Other
+# journal modes take a shared lock per step only, so writers get in between.
+# The copy is written to a temp file and renamed into place, so a failed run
+# never leaves a half-written backup under the final name.
+
+DEFAULT_PAGES = 1024        # per step; 4 MiB at the default page size
+DEFAULT_SLEEP = 0.005       # seconds between steps
+DEFAULT_KEEP = 7
+SNAPSHOT_TIME_FORMAT = "%Y%m%d-%H%M%S"
+
+
+@dataclass(frozen=True)
+class BackupResult:
+    path: Path
+    pages: int
+    steps: int
+    seconds: float
+    removed: List[Path]         # snapshots dropped by retention
+
+
+def _open_ro(path: Path) -> sqlite3.Connection:
+    if not path.exists():
+        raise FileNotFoundError(path)
+    conn = sqlite3.connect(f"{path.resolve().as_uri()}?mode=ro", uri=True, isolation_level=None)
+    conn.execute("PRAGMA busy_timeout = 5000;")
+    return conn
+
+
+def _copy(src: sqlite3.Connection, dst: sqlite3.Connection, pages: int, sleep: float) -> tuple[int, int]:
+    """Backup src into dst; returns (pages copied, steps)."""
+    steps = 0
+    total = 0
+
+    def progress(status: int, remaining: int, count: int) -> None:
+        nonlocal steps, total
+        steps += 1
+        total = count
+        if remaining and sleep > 0:
+            time.sleep(sleep)  # the source lock is released between steps
+
+    wal = str(src.execute("PRAGMA journal_mode;").fetchone()[0]).lower() == "wal"
+    if wal:
+        src.execute("BEGIN;")
+        src.execute("SELECT COUNT(*) FROM sqlite_master;").fetchone()  # pin the read snapshot
+    try:
+        src.backup(dst, pages=pages if pages > 0 else -1, progress=progress)
+    finally:
+        if wal:
+            src.execute("COMMIT;")
+    return total, steps
+
+
+def backup_db(db_path: Path, dest: Path, pages: int = DEFAULT_PAGES, sleep: float = DEFAULT_SLEEP) -> BackupResult:
+    """Consistent copy of db_path at dest (replaced atomically), as a single rollback-journal file."""
+    t0 = time.perf_counter()
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(f".{dest.name}.tmp-{os.getpid()}")
+    src = _open_ro(db_path)
+    try:
+        tmp.unlink(missing_ok=True)
+        dst = sqlite3.connect(str(tmp), isolation_level=None)
+        try:
+            n, steps = _copy(src, dst, pages, sleep)
+            dst.execute("PRAGMA journal_mode = DELETE;")  # self-contained: no -wal/-shm next to it
+        finally:
+            dst.close()
+        os.replace(tmp, dest)
+    finally:
+        src.close()
+        tmp.unlink(missing_ok=True)
+    return BackupResult(path=dest, pages=n, steps=steps, seconds=time.perf_counter() - t0, removed=[])
+
+
+def snapshots(directory: Path, stem: str) -> List[Path]:
+    """Snapshots of databases named <stem>.db in directory, oldest first."""
+    out = []
+    for p in directory.glob(f"{stem}-*.db"):
+        rest = p.stem[len(stem) + 1:]          # YYYYmmdd-HHMMSS[-k]
+        ts, suffix = rest[:15], rest[16:]
+        try:
+            when = datetime.strptime(ts, SNAPSHOT_TIME_FORMAT)
+        except ValueError:
+            continue
+        if rest[15:] and not (rest[15] == "-" and suffix.isdigit()):
+            continue
+        out.append((when, int(suffix or 0), p))
+    return [p for _, _, p in sorted(out)]
+
+
+def snapshot(
+    db_path: Path,
+    directory: Path,
+    keep: int = DEFAULT_KEEP,
+    pages: int = DEFAULT_PAGES,
+    sleep: float = DEFAULT_SLEEP,
+) -> BackupResult:
+    """Backup to directory/<stem>-<YYYYmmdd-HHMMSS>.db, then keep only the newest `keep` snapshots."""
+    if keep < 1:
+        raise ValueError("keep must be >= 1")
+    stem = db_path.stem
+    name = f"{stem}-{datetime.fromtimestamp(clock.now()).strftime(SNAPSHOT_TIME_FORMAT)}"
+    dest = directory / f"{name}.db"
+    k = 1
+    while dest.exists():
+        dest = directory / f"{name}-{k}.db"
+        k += 1
+    result = backup_db(db_path, dest, pages=pages, sleep=sleep)
+    old = snapshots(directory, stem)
+    removed = old[: max(0, len(old) - keep)]
+    for p in removed:
+        p.unlink(missing_ok=True)
+    return BackupResult(result.path, result.pages, result.steps, result.seconds, removed)
+
+
+def backup_all(
+    workspace: Path,
+    directory: Path,
+    keep: int = DEFAULT_KEEP,
+    pages: int = DEFAULT_PAGES,
+    sleep: float = DEFAULT_SLEEP,
+) -> Tuple[Dict[str, BackupResult], Dict[str, str]]:
+    """Snapshot every <user>.db of a workspace into directory, one user at a time."""
+    from .workspace import fan_out
+
+    # one worker on purpose: parallel copies would only compete with users' reviews for the disk
+    return fan_out(partial(snapshot, directory=directory, keep=keep, pages=pages, sleep=sleep), workspace, workers=1)
+
+
+def restore(backup_path: Path, db_path: Path, safety_copy: Optional[Path] = None,
+            pages: int = DEFAULT_PAGES) -> BackupResult:
+    """
+    Replace the contents of db_path with backup_path. The backup is checked first
+    (quick_check + a problems table); with safety_copy, the current db is backed
+    up there before it is overwritten. Goes through the backup API into the live
+    file, so other connections (a running `lc serve`) see an ordinary commit.
+    """
+    t0 = time.perf_counter()
+    src = _open_ro(backup_path)
+    try:
+        ok = str(src.execute("PRAGMA quick_check;").fetchone()[0])
+        if ok != "ok":
+            raise ValueError(f"{backup_path} failed quick_check: {ok}")
+        if src.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='problems';").fetchone() is None:
+            raise ValueError(f"{backup_path} is not an lc database (no problems table)")
+        if safety_copy is not None and db_path.exists():
+            backup_db(db_path, safety_copy, pages=pages)
+        dst = sqlite3.connect(str(db_path), isolation_level=None)
+        try:
+            dst.execute("PRAGMA busy_timeout = 5000;")
+            n, steps = _copy(src, dst, -1, 0.0)  # one step: the live db never shows a half-restored state
+        finally:
+            dst.close()
+    finally:
+        src.close()
+    return BackupResult(path=db_path, pages=n, steps=steps, seconds=time.perf_counter() - t0, removed=[])
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import sqlite3
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from .config import Config, load_config
+from .db import DUE_DAYS_REBUILD_SQL, connect, tx
+from .srs import SECONDS_PER_DAY
+
+# Load-levelled due dates (meta load_balance=1).
+#
+# srs.next_state computes the ideal due date; the balancer may move it within a
+# fuzz window of ±~10% of the interval to the least loaded day, preferring days
+# under meta.daily_capacity and, on ties, the day closest to (then before) the
+# ideal one. interval_days is left as computed, so growth is unchanged; only
+# due_at moves. Per-day load comes from the trigger-maintained due_days
+# histogram (db.SCHEMA_SQL), read once per window and then updated in memory.
+#
+# rebuild (replay.py) recomputes ideal due dates; it does not re-balance.
+
+FUZZ_FRACTION = 0.10
+MAX_FUZZ_DAYS = 7
+
+Loader = Callable[[int, int], Dict[int, int]]  # (first_day, last_day) -> {day: n}
+
+
+def fuzz_days(interval_days: float) -> int:
+    if interval_days < 3:
+        return 0
+    if interval_days < 7:
+        return 1
+    return min(MAX_FUZZ_DAYS, max(1, round(interval_days * FUZZ_FRACTION)))
+
+
+class LoadBalancer:
+    """
+    Callable passed to srs.next_state(balancer=...): (ideal_due_at, interval_days, now) -> due_at.
+    Keeps its own copy of the per-day load so a batch of scheduling calls sees its own choices.
+    """
+
+    def __init__(self, capacity: int = 0, loader: Optional[Loader] = None) -> None:
+        self.capacity = capacity
+        self.loader = loader
+        self.load: Dict[int, int] = {}
+
+    def _ensure(self, lo: int, hi: int) -> None:
+        missing = [d for d in range(lo, hi + 1) if d not in self.load]
+        if not missing:
+            return
+        got = self.loader(missing[0], missing[-1]) if self.loader is not None else {}
+        for d in range(missing[0], missing[-1] + 1):
+            self.load.setdefault(d, got.get(d, 0))
+
+    def _best(self, lo: int, hi: int, ideal: int) -> int:
+        self._ensure(lo, hi)
+        cap = self.capacity
+        return min(
+            range(lo, hi + 1),
+            key=lambda d: (cap > 0 and self.load[d] >= cap, self.load[d], abs(d - ideal), d),
+        )
+
+    def __call__(self, ideal_due_at: int, interval_days: float, now: int) -> int:
+        ideal = ideal_due_at // SECONDS_PER_DAY
+        f = fuzz_days(interval_days)
+        lo = max(now // SECONDS_PER_DAY + 1, ideal - f)
+        hi = max(lo, ideal + f)
+        day = self._best(lo, hi, ideal)
+        if self.capacity > 0 and self.load[day] >= self.capacity and f > 0:
+            # whole window is full: look a little further out before giving up
+            day = self._best(lo, ideal + 2 * f, ideal)
+        self.load[day] += 1
+        return ideal_due_at + (day - ideal) * SECONDS_PER_DAY
+
+    def release(self, due_at: int) -> None:
+        """The card that was due at due_at has been rescheduled or retired."""
+        day = due_at // SECONDS_PER_DAY
+        self._ensure(day, day)  # a fresh balancer hasn't read that day yet; due_days still counts the card there
+        self.load[day] = max(0, self.load[day] - 1)
+
+
+def due_days_loader(conn: sqlite3.Connection) -> Loader:
+    def load(lo: int, hi: int) -> Dict[int, int]:
+        return {
+            int(r["day"]): int(r["n"])
+            for r in conn.execute("SELECT day, n FROM due_days WHERE day BETWEEN ? AND ?;", (lo, hi))
+        }
+    return load
+
+
+def balancer_for(conn: sqlite3.Connection, cfg: Optional[Config] = None) -> Optional[LoadBalancer]:
+    """A LoadBalancer over this db's due_days, or None when meta.load_balance is off."""
+    cfg = cfg or load_config(conn)
+    if not cfg.load_balance:
+        return None
+    return LoadBalancer(capacity=cfg.daily_capacity, loader=due_days_loader(conn))
+
+
+def verify_due_days(db_path: Path, repair: bool = False) -> int:
+    """
+    Number of days whose due_days count differs from the active reviews.
+    repair=True rebuilds the histogram.
+    """
+    conn = connect(db_path)
+    try:
+        bad = int(conn.execute(
+            """
+            SELECT COUNT(*) AS c FROM (
+              SELECT day, SUM(n) AS n FROM (
+                SELECT day, n FROM due_days
+                UNION ALL
+                SELECT due_at / 86400, -COUNT(*) FROM reviews WHERE status = 'active' GROUP BY 1
+              ) GROUP BY day
+            ) WHERE n != 0;
+            """
+        ).fetchone()["c"])
+        if repair and bad:
+            with tx(conn):
+                for sql in DUE_DAYS_REBUILD_SQL:
+                    conn.execute(sql)
+        return bad
+    finally:
+        conn.close()
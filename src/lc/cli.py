@@ -1,67 +1,149 @@
+import time
+from datetime import datetime
 from pathlib import Path
+
 import typer
-from rich import print as rprint
-from lc.db import DEFAULT_DB_PATH, init_db
-from .importer import import_plan
-from .show import load_show
-from .done import apply_done
-from .seed import cursor_set, mark_done_before
 
-from datetime import datetime
-from rich.table import Table
-from rich.console import Console
+from .config import ALLOWED
+from .db import DEFAULT_DB_PATH
+
+# Command modules (and rich) are imported inside each command so that a hot
+# `lc show` only pays for what it uses; benchmarks/import_time.py guards this.
+# Hot commands print through typer.echo/typer.style (click is loaded anyway);
+# rich is kept for tables and less frequent commands.
+
+
+def rprint(*args, **kwargs) -> None:
+    from rich import print as _rprint
+    _rprint(*args, **kwargs)
+
+
+def _bold(text: str) -> str:
+    return typer.style(text, bold=True)
+
+
+def _ok(msg: str) -> None:
+    typer.echo(f"{typer.style('OK', fg='cyan', bold=True)} {msg}")
+
+
+def _check_format(fmt: str) -> None:
+    from .output import FORMATS
+
+    if fmt not in FORMATS:
+        rprint(f"[bold red]ERROR[/bold red] --format must be one of: {', '.join(FORMATS)}")
+        raise typer.Exit(2)
 
-from .history import fetch_history
-from .stats import compute_stats
 
-from .open_cmd import open_problem
-from .config import config_get, config_set, ALLOWED
+def _write_rows(fmt: str, columns, rows) -> None:
+    import sys
+
+    from .output import write_rows
+
+    try:
+        write_rows(sys.stdout, fmt, columns, rows)
+    except BrokenPipeError:
+        _stdout_gone()
+        raise typer.Exit(1)
+
+
+def _stdout_gone() -> None:
+    # the reader went away (`| head`): stop quietly, and keep the exit-time flush from failing again
+    import os
+    import sys
+
+    os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+
+
+_FORMAT_HELP = "Print rows as tsv|jsonl as they are fetched (for grep/awk/jq; no tables)"
 
 
 app = typer.Typer(help="LeetCode SRS CLI (Plan+Cursor+SRS)")
 
 @app.callback()
-def root():
+def root(
+    profile: bool = typer.Option(False, "--profile", help="Trace SQL and print a timing summary to stderr at exit (also LCSRS_TRACE=1)"),
+    trace_file: Path | None = typer.Option(None, "--trace-file", help="With --profile: also write every statement as JSONL here"),
+    now: str | None = typer.Option(None, "--now", help="Pretend it is this time (unix seconds or ISO date/datetime; also LCSRS_NOW)"),
+):
     """Command group for lc."""
     # 这里可以放全局选项（以后比如 --db-path）
-    pass
+    if profile or trace_file is not None:
+        from .trace import enable
+
+        enable(trace_file)
+    if now is not None:
+        from . import clock
+
+        try:
+            clock.set_now(clock.parse_now(now))
+        except ValueError as e:
+            raise typer.BadParameter(str(e), param_hint="--now")
 
 @app.command()
 def version():
     """Show version."""
-    rprint("[bold green]lcsrs[/bold green] v0.1.0")
+    typer.echo(f"{typer.style('lcsrs', fg='green', bold=True)} v0.1.0")
 
 @app.command()
 def init(db: Path = typer.Option(DEFAULT_DB_PATH, "--db", help="Path to sqlite db file")):
     """Initialize database schema and default meta."""
+    from .db import init_db
+
     path = init_db(db)
     rprint(f"[bold cyan]OK[/bold cyan] initialized db at: {path}")
 
 @app.command("import")
 def import_(plan: Path = typer.Argument(..., help="Path to plan.txt"),
+            force: bool = typer.Option(False, "--force", help="Re-import even if plan.txt is unchanged"),
             db: Path = typer.Option(DEFAULT_DB_PATH, "--db", help="Path to sqlite db file")):
     """Import plan.txt into problems table (authoritative plan_order)."""
-    n, last_order = import_plan(db, plan)
-    rprint(f"[bold cyan]OK[/bold cyan] imported {n} problems (last plan_order={last_order})")
+    from .importer import import_plan
+
+    r = import_plan(db, plan, force=force)
+    if r.unchanged:
+        rprint(f"[bold cyan]OK[/bold cyan] plan unchanged ({r.total} problems, last plan_order={r.last_order})")
+        return
+    rprint(
+        f"[bold cyan]OK[/bold cyan] imported {r.total} problems (last plan_order={r.last_order}): "
+        f"added={r.added} removed={r.removed} retitled={r.retitled} reordered={r.reordered}"
+    )
 @app.command()
-def show(db: Path = typer.Option(DEFAULT_DB_PATH, "--db", help="Path to sqlite db file")):
+def show(
+    phase: str | None = typer.Option(None, "--phase", help="Only this phase (exact name or a unique part of it)"),
+    fmt: str | None = typer.Option(None, "--format", help=_FORMAT_HELP),
+    db: Path = typer.Option(DEFAULT_DB_PATH, "--db", help="Path to sqlite db file"),
+):
     """Show today's NEW + REVIEW (cursor only affects NEW)."""
-    new_items, review_items = load_show(db)
-
-    rprint("[bold]NEW[/bold]")
+    from .show import load_show
+
+    if fmt is not None:
+        _check_format(fmt)
+    try:
+        new_items, review_items = load_show(db, phase=phase)
+    except ValueError as e:
+        rprint(f"[bold red]ERROR[/bold red] {e}")
+        raise typer.Exit(2)
+
+    if fmt is not None:
+        rows = [("new", it.lc_num, it.title) for it in new_items]
+        rows += [("review", it.lc_num, it.title) for it in review_items]
+        _write_rows(fmt, ("section", "lc_num", "title"), rows)
+        return
+
+    typer.echo(_bold("NEW"))
     if not new_items:
-        rprint("  (none)")
+        typer.echo("  (none)")
     else:
         for it in new_items:
-            rprint(f"  {it.lc_num}  {it.title}")
+            typer.echo(f"  {it.lc_num}  {it.title}")
 
-    rprint("")
-    rprint("[bold]REVIEW[/bold]")
+    typer.echo("")
+    typer.echo(_bold("REVIEW"))
     if not review_items:
-        rprint("  (none)")
+        typer.echo("  (none)")
     else:
         for it in review_items:
-            rprint(f"  {it.lc_num}  {it.title}")
+            typer.echo(f"  {it.lc_num}  {it.title}")
 @app.command()
 def done(
     lc_num: int = typer.Argument(..., help="LeetCode problem number"),
@@ -70,11 +152,15 @@ def done(
     db: Path = typer.Option(DEFAULT_DB_PATH, "--db", help="Path to sqlite db file"),
 ):
     """Mark a problem done and schedule next review (SRS)."""
+    from .done import apply_done
+
     prev_due, next_due = apply_done(db, lc_num, grade, note if note else None)
-    rprint(f"[bold cyan]OK[/bold cyan] done {lc_num} grade={grade} prev_due={prev_due} next_due={next_due}")
+    _ok(f"done {lc_num} grade={grade} prev_due={prev_due} next_due={next_due}")
 def _quick_done(lc_num: int, grade: str, note: str, db: Path):
+    from .done import apply_done
+
     prev_due, next_due = apply_done(db, lc_num, grade, note if note else None)
-    rprint(f"[bold cyan]OK[/bold cyan] done {lc_num} grade={grade} prev_due={prev_due} next_due={next_due}")
+    _ok(f"done {lc_num} grade={grade} prev_due={prev_due} next_due={next_due}")
 
 @app.command()
 def again(
@@ -112,6 +198,72 @@ def easy(
     """Shortcut for: done <lc_num> easy"""
     _quick_done(lc_num, "easy", note, db)
 
+@app.command()
+def note(
+    lc_num: int = typer.Argument(..., help="LeetCode problem number"),
+    text: str | None = typer.Argument(None, help="New note (omit to print the current one; \"\" clears it)"),
+    db: Path = typer.Option(DEFAULT_DB_PATH, "--db", help="Path to sqlite db file"),
+):
+    """Write/overwrite a problem's note, or print it."""
+    from .notes import get_note, set_note
+
+    try:
+        if text is None:
+            typer.echo(get_note(db, lc_num) or "(no note)")
+            return
+        set_note(db, lc_num, text)
+    except ValueError as e:
+        rprint(f"[bold red]ERROR[/bold red] {e}")
+        raise typer.Exit(2)
+    _ok(f"note saved for {lc_num}")
+
+@app.command()
+def search(
+    query: str = typer.Argument(..., help='FTS5 query: words, "phrase", prefix*, AND/OR/NOT'),
+    n: int = typer.Option(20, "--n", help="Max results"),
+    phase: str | None = typer.Option(None, "--phase", help="Only this phase (exact name or a unique part of it)"),
+    grade: str | None = typer.Option(None, "--grade", help="Only review notes with this grade"),
+    db: Path = typer.Option(DEFAULT_DB_PATH, "--db", help="Path to sqlite db file"),
+):
+    """Full-text search over problem notes and review notes (best match first)."""
+    from .notes import search_notes
+
+    try:
+        hits = search_notes(db, query, limit=n, phase=phase, grade=grade)
+    except ValueError as e:
+        rprint(f"[bold red]ERROR[/bold red] {e}")
+        raise typer.Exit(2)
+    if not hits:
+        typer.echo("(no matches)")
+        return
+    for h in hits:
+        if h.kind == "log":
+            when = datetime.fromtimestamp(h.reviewed_at).strftime("%Y-%m-%d") if h.reviewed_at else "?"
+            src = f"{when} {h.grade}"
+        else:
+            src = "note"
+        typer.echo(f"{_bold(str(h.lc_num))}  {h.title}  [{src}]  {h.snippet}")
+
+@app.command("done-batch")
+def done_batch(
+    file: Path = typer.Argument(..., help="CSV or JSONL: lc_num, grade, note, optional timestamp"),
+    db: Path = typer.Option(DEFAULT_DB_PATH, "--db", help="Path to sqlite db file"),
+):
+    """Apply many grades in a single transaction (backfill)."""
+    from .done import apply_done_batch, read_batch_file
+
+    try:
+        entries = read_batch_file(file)
+        t0 = time.perf_counter()
+        n = apply_done_batch(db, entries)
+    except (OSError, ValueError) as e:
+        # nothing was applied: the batch is one transaction
+        rprint(f"[bold red]ERROR[/bold red] {e}")
+        raise typer.Exit(2)
+    dt = time.perf_counter() - t0
+    rate = n / dt if dt > 0 else 0.0
+    rprint(f"[bold cyan]OK[/bold cyan] applied {n} grades in {dt * 1000:.1f} ms ({rate:,.0f} grades/s)")
+
 cursor_app = typer.Typer(help="Manage NEW cursor (only affects NEW)")
 app.add_typer(cursor_app, name="cursor")
 
@@ -120,30 +272,171 @@ def cursor_set_cmd(
     lc_num: int = typer.Argument(..., help="Set NEW start to this LeetCode number"),
     db: Path = typer.Option(DEFAULT_DB_PATH, "--db", help="Path to sqlite db file"),
 ):
-    po = cursor_set(db, lc_num)
+    from .seed import cursor_set
+
+    try:
+        po = cursor_set(db, lc_num)
+    except ValueError as e:
+        rprint(f"[bold red]ERROR[/bold red] {e}")
+        raise typer.Exit(2)
     rprint(f"[bold cyan]OK[/bold cyan] cursor_plan_order set to {po} (lc_num={lc_num})")
 
 @app.command("mark-done-before")
 def mark_done_before_cmd(
     lc_num: int = typer.Argument(..., help="All problems before this become due REVIEW"),
     force: bool = typer.Option(False, "--force", help="Also force existing reviews to become due now"),
+    from_lc: int | None = typer.Option(None, "--from", help="Only seed from this lc_num (inclusive, plan order)"),
+    to_lc: int | None = typer.Option(None, "--to", help="Only seed up to this lc_num (exclusive, plan order)"),
+    db: Path = typer.Option(DEFAULT_DB_PATH, "--db", help="Path to sqlite db file"),
+):
+    from .seed import mark_done_before
+
+    t0 = time.perf_counter()
+    try:
+        n = mark_done_before(db, lc_num, force=force, from_lc=from_lc, to_lc=to_lc)
+    except ValueError as e:
+        rprint(f"[bold red]ERROR[/bold red] {e}")
+        raise typer.Exit(2)
+    dt = time.perf_counter() - t0
+    rprint(f"[bold cyan]OK[/bold cyan] seeded {n} missing problems before {lc_num}; force={force} ({dt * 1000:.1f} ms)")
+
+@app.command()
+def rebuild(
+    full: bool = typer.Option(False, "--full", help="Ignore the checkpoint and replay every log (after scheduler changes)"),
     db: Path = typer.Option(DEFAULT_DB_PATH, "--db", help="Path to sqlite db file"),
 ):
-    n = mark_done_before(db, lc_num, force=force)
-    rprint(f"[bold cyan]OK[/bold cyan] seeded {n} missing problems before {lc_num}; force={force}")
+    """Rebuild reviews by replaying review_logs (incremental by default)."""
+    from .replay import rebuild_reviews
+
+    t0 = time.perf_counter()
+    r = rebuild_reviews(db, full=full)
+    dt = time.perf_counter() - t0
+    mode = "full" if r.full else "incremental"
+    rprint(
+        f"[bold cyan]OK[/bold cyan] {mode} rebuild: replayed {r.logs} logs, "
+        f"updated {r.cards} reviews (checkpoint log id={r.last_log_id}) in {dt * 1000:.1f} ms"
+    )
+
+@app.command()
+def check(
+    repair: bool = typer.Option(False, "--repair", help="Rebuild derived tables that are out of sync"),
+    db: Path = typer.Option(DEFAULT_DB_PATH, "--db", help="Path to sqlite db file"),
+):
+    """Verify derived tables (NEW frontier, stats counters, due-day histogram, notes index) against the base tables."""
+    from .balance import verify_due_days
+    from .frontier import verify as verify_frontier
+    from .notes import verify as verify_notes
+    from .stats import verify_counters
+
+    fr = verify_frontier(db, repair=repair)
+    fr_ok = not (fr.missing or fr.stale)
+    tag = "[bold cyan]OK[/bold cyan]" if fr_ok else "[bold red]MISMATCH[/bold red]"
+    rprint(f"{tag} new_frontier: missing={fr.missing} stale={fr.stale}" + (" (repaired)" if repair and not fr_ok else ""))
+
+    bad = verify_counters(db, repair=repair)
+    tag = "[bold red]MISMATCH[/bold red]" if bad else "[bold cyan]OK[/bold cyan]"
+    rprint(f"{tag} counters: {', '.join(bad) or 'consistent'}" + (" (repaired)" if repair and bad else ""))
+
+    days = verify_due_days(db, repair=repair)
+    tag = "[bold red]MISMATCH[/bold red]" if days else "[bold cyan]OK[/bold cyan]"
+    rprint(f"{tag} due_days: {days} day(s) off" + (" (repaired)" if repair and days else ""))
+
+    nt = verify_notes(db, repair=repair)
+    nt_ok = not (nt.missing or nt.stale)
+    tag = "[bold cyan]OK[/bold cyan]" if nt_ok else "[bold red]MISMATCH[/bold red]"
+    rprint(f"{tag} notes_fts: missing={nt.missing} stale={nt.stale}" + (" (repaired)" if repair and not nt_ok else ""))
+
+    if not repair and (bad or days or not fr_ok or not nt_ok):
+        raise typer.Exit(1)
 
 @app.command()
 def history(
     n: int = typer.Option(15, "--n", help="How many recent logs to show"),
     all: bool = typer.Option(False, "--all", help="Include seed logs"),
     notes: bool = typer.Option(False, "--notes", help="Show note column"),
+    fmt: str | None = typer.Option(None, "--format", help=_FORMAT_HELP + "; notes included"),
+    before: str | None = typer.Option(None, "--before", help="Page cursor (<reviewed_at>:<id>) printed after the previous page"),
+    export: str | None = typer.Option(None, "--export", help="Stream every log as jsonl|csv (oldest first)"),
+    out: Path | None = typer.Option(None, "--out", help="Export to this file instead of stdout"),
+    all_users: bool = typer.Option(False, "--all-users", help="Merge history of every user in the workspace"),
+    workspace: Path | None = typer.Option(None, "--workspace", envvar="LCSRS_WORKSPACE", help="Directory of <user>.db shards"),
     db: Path = typer.Option(DEFAULT_DB_PATH, "--db", help="Path to sqlite db file"),
 ):
-    """Show recent review logs."""
-    items = fetch_history(db, n=n, include_seed=all)
+    """Show recent review logs (paged with --before), or export them all."""
+    if export is not None:
+        import sys
+
+        from .history import EXPORT_FORMATS, export_history
+
+        if export not in EXPORT_FORMATS:
+            rprint(f"[bold red]ERROR[/bold red] --export must be one of: {', '.join(EXPORT_FORMATS)}")
+            raise typer.Exit(2)
+        if all_users:
+            rprint("[bold red]ERROR[/bold red] --export works on one db; export each shard with --db")
+            raise typer.Exit(2)
+        if out is None:
+            export_history(db, sys.stdout, fmt=export, include_seed=all)
+        else:
+            with out.open("w", encoding="utf-8", newline="") as f:
+                count = export_history(db, f, fmt=export, include_seed=all)
+            _ok(f"exported {count} logs to {out}")
+        return
+
+    if before is not None:
+        from .history import parse_cursor
+
+        try:
+            parse_cursor(before)
+        except ValueError as e:
+            rprint(f"[bold red]ERROR[/bold red] {e}")
+            raise typer.Exit(2)
+
+    if fmt is not None:
+        from .history import HISTORY_COLUMNS
+
+        _check_format(fmt)
+        if all_users:
+            from .workspace import all_history
+
+            if before is not None:
+                rprint("[bold red]ERROR[/bold red] --before is not supported with --all-users")
+                raise typer.Exit(2)
+            pairs, errors = all_history(_require_workspace(workspace), n=n, include_seed=all)
+            _print_shard_errors(errors)
+            rows = (
+                (u, it.log_id, it.reviewed_at, it.lc_num, it.title, it.grade, it.next_due_at, it.note)
+                for u, it in pairs
+            )
+            _write_rows(fmt, ("user", *HISTORY_COLUMNS), rows)
+            return
+        from .history import iter_history
+
+        _write_rows(fmt, HISTORY_COLUMNS, iter_history(db, n=n, include_seed=all, before=before))
+        return
+
+    from rich.console import Console
+    from rich.table import Table
+
+    if all_users:
+        from .workspace import all_history
+
+        if before is not None:
+            rprint("[bold red]ERROR[/bold red] --before is not supported with --all-users")
+            raise typer.Exit(2)
+        pairs, errors = all_history(_require_workspace(workspace), n=n, include_seed=all)
+        _print_shard_errors(errors)
+        users = [u for u, _ in pairs]
+        items = [it for _, it in pairs]
+    else:
+        from .history import fetch_history
+
+        users = []
+        items = fetch_history(db, n=n, include_seed=all, before=before)
 
     table = Table(title=f"History (last {len(items)})", show_lines=False)
     table.add_column("Time", no_wrap=True)
+    if users:
+        table.add_column("User", no_wrap=True)
     table.add_column("LC", justify="right", no_wrap=True)
     table.add_column("Grade", no_wrap=True)
     table.add_column("NextDue", no_wrap=True)
@@ -152,28 +445,246 @@ def history(
     if notes:
         table.add_column("Note")
 
-    for it in items:
+    for i, it in enumerate(items):
         t = datetime.fromtimestamp(it.reviewed_at).strftime("%m-%d %H:%M")
         nd = "-" if it.next_due_at is None else datetime.fromtimestamp(it.next_due_at).strftime("%m-%d")
         row = [t, str(it.lc_num), it.grade, nd, it.title]
+        if users:
+            row.insert(1, users[i])
 
         if notes:
             row.append(it.note or "")
         table.add_row(*row)
 
     Console().print(table)
+    if not users and len(items) == n:
+        typer.echo(typer.style(f"next page: lc history --n {n} --before {items[-1].cursor}", dim=True))
+
+def _print_stats(s) -> None:
+    typer.echo(_bold("STATS"))
+    typer.echo(f"Cursor: plan_order={s.cursor_plan_order}  lc={s.cursor_lc_num}  {s.cursor_title or ''}")
+    typer.echo(f"Problems: {s.problems_total}")
+    typer.echo(f"Reviews:  total={s.reviews_total}  active={s.active_total}  retired={s.retired_total}")
+    typer.echo(f"Due now:  {s.due_total}")
+    typer.echo(f"Activity: today={s.logs_today}  last7d={s.logs_7d}")
+
+def _print_phase_stats(rows) -> None:
+    typer.echo(_bold("STATS BY PHASE"))
+    width = max([len("phase")] + [len(r.phase) for r in rows])
+    typer.echo(f"{'phase':<{width}} {'problems':>8} {'new':>6} {'active':>7} {'retired':>7} {'due':>6}")
+    for r in rows:
+        typer.echo(f"{r.phase:<{width}} {r.problems:>8} {r.new:>6} {r.active:>7} {r.retired:>7} {r.due:>6}")
+
+def _require_workspace(workspace: Path | None) -> Path:
+    if workspace is None:
+        rprint("[bold red]ERROR[/bold red] --all-users needs --workspace DIR (or LCSRS_WORKSPACE)")
+        raise typer.Exit(2)
+    return workspace
+
+def _print_shard_errors(errors: dict) -> None:
+    for user, err in errors.items():
+        typer.echo(typer.style(f"skipped {user}: {err}", fg="red"), err=True)
+
+def _print_workspace_stats(ws) -> None:
+    _print_shard_errors(ws.errors)
+    typer.echo(_bold(f"STATS ({len(ws.per_user)} users)"))
+    typer.echo(f"{'user':<16} {'problems':>8} {'reviews':>8} {'active':>7} {'retired':>7} {'due':>6} {'today':>6} {'7d':>6}")
+    rows = [(u, vars(s)) for u, s in ws.per_user.items()] + [("TOTAL", ws.totals)]
+    for user, v in rows:
+        line = (
+            f"{user:<16} {v['problems_total']:>8} {v['reviews_total']:>8} {v['active_total']:>7} "
+            f"{v['retired_total']:>7} {v['due_total']:>6} {v['logs_today']:>6} {v['logs_7d']:>6}"
+        )
+        typer.echo(_bold(line) if user == "TOTAL" else line)
 
 @app.command()
-def stats(db: Path = typer.Option(DEFAULT_DB_PATH, "--db", help="Path to sqlite db file")):
+def stats(
+    watch: bool = typer.Option(False, "--watch", help="Refresh until Ctrl-C"),
+    interval: float = typer.Option(2.0, "--interval", help="Refresh interval for --watch (seconds)"),
+    verify: bool = typer.Option(False, "--verify", help="Recompute counters from scratch and compare"),
+    all_users: bool = typer.Option(False, "--all-users", help="Aggregate over every user in the workspace"),
+    workspace: Path | None = typer.Option(None, "--workspace", envvar="LCSRS_WORKSPACE", help="Directory of <user>.db shards"),
+    by_phase: bool = typer.Option(False, "--by-phase", help="new/active/retired/due per plan phase"),
+    fmt: str | None = typer.Option(None, "--format", help=_FORMAT_HELP + "; with --watch, a row per change"),
+    db: Path = typer.Option(DEFAULT_DB_PATH, "--db", help="Path to sqlite db file"),
+):
     """Show key SRS stats."""
-    s = compute_stats(db)
+    from dataclasses import astuple, fields
+
+    if fmt is not None:
+        _check_format(fmt)
+    if by_phase:
+        from .stats import PhaseStats, compute_phase_stats
+
+        rows = compute_phase_stats(db)
+        if fmt is not None:
+            _write_rows(fmt, [f.name for f in fields(PhaseStats)], map(astuple, rows))
+        else:
+            _print_phase_stats(rows)
+        return
+    if all_users:
+        from .workspace import all_stats
+
+        ws = all_stats(_require_workspace(workspace))
+        if fmt is not None:
+            from .stats import Stats
+
+            _print_shard_errors(ws.errors)
+            rows = ((u, *astuple(s)) for u, s in ws.per_user.items())
+            _write_rows(fmt, ["user", *(f.name for f in fields(Stats))], rows)
+        else:
+            _print_workspace_stats(ws)
+        return
+
+    from .stats import Stats, compute_stats, stats_for, verify_counters
+
+    columns = [f.name for f in fields(Stats)]
+
+    if verify:
+        bad = verify_counters(db)
+        if bad:
+            rprint(f"[bold red]MISMATCH[/bold red] counters differ from scan: {', '.join(bad)} (fix: lc check --repair)")
+            raise typer.Exit(1)
+        rprint("[bold cyan]OK[/bold cyan] counters match a full recount")
+        return
+
+    if not watch:
+        if fmt is not None:
+            _write_rows(fmt, columns, [astuple(compute_stats(db))])
+        else:
+            _print_stats(compute_stats(db))
+        return
+
+    from .db import connect
+
+    # one connection for the whole session; each refresh is a handful of indexed lookups
+    conn = connect(db)
+    last = None
+    writer = None
+    if fmt is not None:
+        import sys
+
+        from .output import RowWriter
+
+        writer = RowWriter(sys.stdout, fmt, columns)
+    try:
+        while True:
+            s = stats_for(conn)
+            if s != last:
+                if writer is not None:
+                    writer.write(astuple(s))
+                    writer.flush()
+                else:
+                    typer.clear()
+                    _print_stats(s)
+                    typer.echo(typer.style(f"{datetime.now():%H:%M:%S}  refresh {interval:g}s, Ctrl-C to quit", dim=True))
+                last = s
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+    except BrokenPipeError:
+        _stdout_gone()
+    finally:
+        conn.close()
+
+@app.command()
+def forecast(
+    days: int = typer.Option(30, "--days", help="Forecast horizon in days"),
+    runs: int = typer.Option(20, "--runs", help="Monte-Carlo runs to average"),
+    seed: int = typer.Option(0, "--seed", help="RNG seed"),
+    check: bool = typer.Option(False, "--check", help="Cross-check the vectorized step against srs.next_state first"),
+    db: Path = typer.Option(DEFAULT_DB_PATH, "--db", help="Path to sqlite db file"),
+):
+    """Forecast expected reviews per day (vectorized SRS simulation)."""
+    from .forecast import check_against_scalar, forecast_load
 
-    rprint("[bold]STATS[/bold]")
-    rprint(f"Cursor: plan_order={s.cursor_plan_order}  lc={s.cursor_lc_num}  {s.cursor_title or ''}")
-    rprint(f"Problems: {s.problems_total}")
-    rprint(f"Reviews:  total={s.reviews_total}  active={s.active_total}  retired={s.retired_total}")
-    rprint(f"Due now:  {s.due_total}")
-    rprint(f"Activity: today={s.logs_today}  last7d={s.logs_7d}")
+    if check:
+        n = check_against_scalar()
+        rprint(f"[bold cyan]OK[/bold cyan] vectorized step matches next_state on {n} samples")
+
+    t0 = time.perf_counter()
+    fc = forecast_load(db, days=days, runs=runs, seed=seed)
+    dt = time.perf_counter() - t0
+
+    dist = "  ".join(f"{g}={p:.2f}" for g, p in fc.grade_probs.items())
+    rprint(f"[bold]FORECAST[/bold] cards={fc.cards} runs={fc.runs} grades: {dist}")
+    for d, v in enumerate(fc.expected):
+        day = datetime.fromtimestamp(fc.day0 + d * 86400).strftime("%Y-%m-%d")
+        rprint(f"  {day}  {v:8.1f}")
+    peak = max(fc.expected, default=0.0)
+    rprint(f"total={sum(fc.expected):.1f}  peak={peak:.1f}  [dim]({dt * 1000:.0f} ms)[/dim]")
+
+@app.command()
+def simulate(
+    days: int = typer.Option(365, "--days", help="Simulated days"),
+    policy: str = typer.Option("history", "--policy", help="Grade model: history | recall[:R] | again|hard|good|easy"),
+    new_quota: int | None = typer.Option(None, "--new-quota", help="Try this new_quota instead of the db's"),
+    review_per_new: int | None = typer.Option(None, "--review-per-new", help="Try this review_per_new instead of the db's"),
+    seed: int = typer.Option(0, "--seed", help="RNG seed"),
+    every: int = typer.Option(30, "--every", help="Print one row every N days (0 = summary only)"),
+    db: Path = typer.Option(DEFAULT_DB_PATH, "--db", help="Path to sqlite db file (only read)"),
+):
+    """Simulate daily show -> done sessions on an in-memory copy of the db."""
+    from .simulate import simulate as run
+
+    try:
+        res = run(db, days=days, policy=policy, seed=seed, new_quota=new_quota, review_per_new=review_per_new)
+    except ValueError as e:
+        rprint(f"[bold red]ERROR[/bold red] {e}")
+        raise typer.Exit(2)
+
+    rprint(f"[bold]SIMULATE[/bold] {days} days  policy={res.policy}  "
+           f"new_quota={res.new_quota}  review_per_new={res.review_per_new}")
+    if every > 0 and res.days:
+        typer.echo(f"  {'date':<10} {'due':>6} {'new':>4} {'rev':>5} {'backlog':>8} {'active':>7} {'retired':>8}")
+        for d in res.days:
+            if d.day % every == 0 or d.day == len(res.days) - 1:
+                day = datetime.fromtimestamp(d.at).strftime("%Y-%m-%d")
+                typer.echo(f"  {day:<10} {d.due:>6} {d.new:>4} {d.reviewed:>5} {d.backlog:>8} {d.active:>7} {d.retired:>8}")
+    if res.days:
+        n = len(res.days)
+        last = res.days[-1]
+        rprint(
+            f"queue mean={sum(d.due for d in res.days) / n:.1f} max={max(d.due for d in res.days)}  "
+            f"backlog max={max(d.backlog for d in res.days)} final={last.backlog}  "
+            f"retired {last.retired - res.retired_start} ({(last.retired - res.retired_start) / n:.2f}/day)  "
+            f"new {sum(d.new for d in res.days)}"
+        )
+    rate = len(res.days) / res.seconds if res.seconds > 0 else 0.0
+    rprint(f"[dim]{res.seconds * 1000:.0f} ms, {rate:,.0f} simulated days/s[/dim]")
+
+@app.command()
+def optimize(
+    retention: float = typer.Option(0.9, "--retention", help="Recall probability an interval is meant to hit"),
+    iters: int = typer.Option(50, "--iters", help="Max optimizer iterations"),
+    dry_run: bool = typer.Option(False, "--dry-run", help="Fit and print, but keep the current params"),
+    reset: bool = typer.Option(False, "--reset", help="Go back to the built-in scheduler constants"),
+    db: Path = typer.Option(DEFAULT_DB_PATH, "--db", help="Path to sqlite db file"),
+):
+    """Fit the scheduler constants (ease deltas, multipliers, start intervals) to your review_logs."""
+    from dataclasses import fields
+
+    from .optimize import MIN_PREDICTIONS, optimize as fit, reset_params
+
+    if reset:
+        reset_params(db)
+        rprint("[bold cyan]OK[/bold cyan] scheduler params reset to defaults")
+        return
+
+    res = fit(db, retention=retention, iters=iters, dry_run=dry_run)
+    if res.predictions < MIN_PREDICTIONS:
+        rprint(f"[bold yellow]SKIP[/bold yellow] {res.predictions} repeat reviews; need {MIN_PREDICTIONS} to fit")
+        return
+    rprint(f"[bold]OPTIMIZE[/bold] logs={res.logs} predictions={res.predictions} iters={res.iters} "
+           f"[dim](load {res.load_ms:.0f} ms, fit {res.fit_ms:.0f} ms)[/dim]")
+    for f in fields(res.params):
+        old, new = getattr(res.before, f.name), getattr(res.params, f.name)
+        rprint(f"  {f.name:<15} {old:8.4f} -> {new:8.4f}")
+    rprint(f"log loss {res.loss_before:.4f} -> {res.loss_after:.4f}")
+    if dry_run:
+        rprint("[dim]dry run: params not saved[/dim]")
+    else:
+        rprint("[bold cyan]OK[/bold cyan] saved; applies to new grades ([bold]lc rebuild --full[/bold] reschedules existing cards)")
 
 @app.command()
 def open(
@@ -181,8 +692,137 @@ def open(
     db: Path = typer.Option(DEFAULT_DB_PATH, "--db", help="Path to sqlite db file"),
 ):
     """Open LeetCode page for current NEW (or a specific lc_num)."""
+    from .open_cmd import open_problem
+
     url = open_problem(db, lc_num=lc_num)
-    rprint(f"[dim]{url}[/dim]")
+    typer.echo(typer.style(url, dim=True))
+
+@app.command()
+def serve(
+    port: int = typer.Option(8765, "--port", help="TCP port (localhost)"),
+    host: str = typer.Option("127.0.0.1", "--host", help="Loopback bind address (127.0.0.1, ::1, localhost)"),
+    socket: Path | None = typer.Option(None, "--socket", help="Listen on a Unix socket instead of TCP"),
+    db: Path = typer.Option(DEFAULT_DB_PATH, "--db", help="Path to sqlite db file"),
+):
+    """Run a local JSON daemon (show/done/stats/history) with an in-memory due queue."""
+    from .server import serve as run_server
+
+    try:
+        run_server(db, host=host, port=port, socket_path=socket, ready=lambda addr: _ok(f"serving {db} on {addr}"))
+    except ValueError as e:
+        rprint(f"[bold red]ERROR[/bold red] {e}")
+        raise typer.Exit(2)
+    except KeyboardInterrupt:
+        pass
+@app.command()
+def backup(
+    to: Path | None = typer.Option(None, "--to", help="Write one backup to this file (replaced atomically)"),
+    dir: Path | None = typer.Option(None, "--dir", help="Rotating snapshot directory (default: backups/ next to the db)"),
+    keep: int = typer.Option(7, "--keep", help="Snapshots to keep per database in --dir"),
+    pages: int = typer.Option(1024, "--pages", help="Pages copied per step (-1: all at once)"),
+    sleep_ms: float = typer.Option(5.0, "--sleep-ms", help="Pause between steps"),
+    all_users: bool = typer.Option(False, "--all-users", help="Snapshot every user in the workspace"),
+    workspace: Path | None = typer.Option(None, "--workspace", envvar="LCSRS_WORKSPACE", help="Directory of <user>.db shards"),
+    db: Path = typer.Option(DEFAULT_DB_PATH, "--db", help="Path to sqlite db file"),
+):
+    """Online backup through the SQLite backup API (safe while lc done / lc serve write)."""
+    import sqlite3
+
+    from .backup import backup_all, backup_db, snapshot
+
+    sleep = max(sleep_ms, 0.0) / 1000.0
+    try:
+        if all_users:
+            if to is not None:
+                raise ValueError("--to is a single file; use --dir with --all-users")
+            ws = _require_workspace(workspace)
+            done, errors = backup_all(ws, dir or ws / "backups", keep=keep, pages=pages, sleep=sleep)
+            _print_shard_errors(errors)
+            _ok(f"{len(done)} snapshot(s) in {dir or ws / 'backups'}")
+            if errors:
+                raise typer.Exit(1)
+            return
+        if to is not None:
+            r = backup_db(db, to, pages=pages, sleep=sleep)
+        else:
+            r = snapshot(db, dir or db.parent / "backups", keep=keep, pages=pages, sleep=sleep)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        rprint(f"[bold red]ERROR[/bold red] {e}")
+        raise typer.Exit(2)
+    _ok(f"{r.path} ({r.pages} pages, {r.steps} steps, {r.seconds:.2f}s)")
+    for p in r.removed:
+        typer.echo(typer.style(f"removed {p}", dim=True))
+
+@app.command()
+def restore(
+    backup: Path = typer.Argument(..., help="Backup file (lc backup --to, or a snapshot)"),
+    yes: bool = typer.Option(False, "--yes", "-y", help="Don't ask for confirmation"),
+    db: Path = typer.Option(DEFAULT_DB_PATH, "--db", help="Path to sqlite db file"),
+):
+    """Replace the db with a backup (the current db is saved as <db>.pre-restore first)."""
+    import sqlite3
+
+    from .backup import restore as restore_db
+
+    if not yes:
+        typer.confirm(f"Replace {db} with {backup}?", abort=True)
+    safety = db.with_name(f"{db.name}.pre-restore")
+    try:
+        r = restore_db(backup, db, safety_copy=safety)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        rprint(f"[bold red]ERROR[/bold red] {e}")
+        raise typer.Exit(2)
+    _ok(f"restored {r.pages} pages into {db}" + (f" (previous db saved to {safety})" if safety.exists() else ""))
+
+@app.command()
+def sync(
+    other: Path = typer.Argument(..., help="The other device's db file (opened read-only)"),
+    db: Path = typer.Option(DEFAULT_DB_PATH, "--db", help="Path to sqlite db file"),
+):
+    """Pull review logs from another device's db (only those since the last sync) and replay the cards they touch."""
+    import sqlite3
+
+    from .sync import sync_from
+
+    t0 = time.perf_counter()
+    try:
+        r = sync_from(db, other)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        rprint(f"[bold red]ERROR[/bold red] {e}")
+        raise typer.Exit(2)
+    dt = time.perf_counter() - t0
+    _ok(
+        f"pulled {r.pulled} logs{' (full pull)' if r.full_pull else ''}: merged {r.merged}, "
+        f"{r.duplicates} already here, {r.unknown} not in this plan; "
+        f"replayed {r.cards} cards, cursor={r.cursor} ({dt * 1000:.1f} ms)"
+    )
+
+slugs_app = typer.Typer(help="Offline lc_num -> URL slug catalog (lc open goes straight to the problem)")
+app.add_typer(slugs_app, name="slugs")
+
+@slugs_app.command("import")
+def slugs_import_cmd(
+    file: Path = typer.Argument(..., help="Catalog dump: api/problems/all JSON, GraphQL questions JSON, JSONL, or CSV lc_num,slug"),
+    db: Path = typer.Option(DEFAULT_DB_PATH, "--db", help="Path to sqlite db file"),
+):
+    """Bulk-load slugs from a local dump (replaces derived ones)."""
+    from .slugs import import_slugs
+
+    try:
+        r = import_slugs(db, file)
+    except (OSError, ValueError) as e:
+        rprint(f"[bold red]ERROR[/bold red] {e}")
+        raise typer.Exit(2)
+    _ok(f"loaded {r.loaded} slugs (skipped {r.skipped})")
+
+@slugs_app.command("derive")
+def slugs_derive_cmd(db: Path = typer.Option(DEFAULT_DB_PATH, "--db", help="Path to sqlite db file")):
+    """Derive slugs from the imported plan titles (never replaces imported slugs)."""
+    from .slugs import derive_slugs
+
+    r = derive_slugs(db)
+    _ok(f"derived {r.loaded} slugs from plan titles (skipped {r.skipped} that don't slugify, e.g. non-English)")
+
 config_app = typer.Typer(help="Read/write config (meta table)")
 app.add_typer(config_app, name="config")
 
@@ -191,6 +831,8 @@ def config_get_cmd(
     key: str = typer.Argument(..., help="Config key"),
     db: Path = typer.Option(DEFAULT_DB_PATH, "--db", help="Path to sqlite db file"),
 ):
+    from .config import config_get
+
     v = config_get(db, key)
     rprint(f"{key}={v}")
 
@@ -200,12 +842,21 @@ def config_set_cmd(
     value: str = typer.Argument(..., help="Config value"),
     db: Path = typer.Option(DEFAULT_DB_PATH, "--db", help="Path to sqlite db file"),
 ):
+    from .config import config_set
+
     config_set(db, key, value)
     rprint(f"[bold cyan]OK[/bold cyan] {key}={value}")
 
 
 def main():
-    app()
+    from .db import DatabaseNotReady
+
+    try:
+        app()
+    except DatabaseNotReady as e:
+        # commands that don't already turn ValueError into ERROR (missing --db, needs `lc init`)
+        rprint(f"[bold red]ERROR[/bold red] {e}")
+        raise SystemExit(2)
 
 if __name__ == "__main__":
     main()
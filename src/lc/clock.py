@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import os
+import time
+from datetime import datetime
+from typing import Optional
+
+# The one place "now" comes from. `lc --now 2026-01-01T09:00 ...` / LCSRS_NOW pin it
+# for a whole command (tests, replaying a past day); simulate.py moves it day by day.
+
+_NOW: Optional[int] = None
+
+
+def parse_now(raw: str) -> int:
+    """Unix seconds, or an ISO date/datetime (local time)."""
+    raw = raw.strip()
+    try:
+        return int(float(raw))
+    except ValueError:
+        pass
+    try:
+        return int(datetime.fromisoformat(raw).timestamp())
+    except ValueError:
+        raise ValueError(f"bad time {raw!r} (expected unix seconds or an ISO date/datetime)") from None
+
+
+def set_now(ts: Optional[int]) -> Optional[int]:
+    """Pin now() to ts; None goes back to LCSRS_NOW / the system clock. Returns the previous pin."""
+    global _NOW
+    prev, _NOW = _NOW, ts
+    return prev
+
+
+def pinned() -> Optional[int]:
+    """The set_now() pin, if any; it lives in this process only (workspace.fan_out hands it to workers)."""
+    return _NOW
+
+
+def now() -> int:
+    if _NOW is not None:
+        return _NOW
+    env = os.environ.get("LCSRS_NOW")
+    if env:
+        return parse_now(env)
+    return int(time.time())
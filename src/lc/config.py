@@ -1,8 +1,14 @@
 from __future__ import annotations
 
+import sqlite3
+import weakref
+from dataclasses import dataclass, field
 from pathlib import Path
+from types import MappingProxyType
+from typing import Mapping, Optional, Tuple
 
 from .db import connect, tx, get_meta, set_meta
+from .srs import SrsParams
 
 ALLOWED = {
     "new_quota": "int>=0",
@@ -10,6 +16,8 @@ ALLOWED = {
     "window_size": "int>=1",
     "interleave_ratio": "float(0..1)",
     "leetcode_base_url": "str",
+    "load_balance": "bool",
+    "daily_capacity": "int>=0",
 }
 
 def _validate(key: str, value: str) -> str:
@@ -25,6 +33,12 @@ def _validate(key: str, value: str) -> str:
             raise ValueError(f"{key} must be >= 0")
         return str(v)
 
+    if rule == "bool":
+        v = value.strip().lower()
+        if v not in ("0", "1", "true", "false", "on", "off"):
+            raise ValueError(f"{key} must be 0 or 1")
+        return "1" if v in ("1", "true", "on") else "0"
+
     if rule.startswith("float"):
         v = float(value)
         if not (0.0 <= v <= 1.0):
@@ -33,6 +47,87 @@ def _validate(key: str, value: str) -> str:
 
     return value
 
+def _typed(key: str, raw: str):
+    v = _validate(key, raw)
+    rule = ALLOWED[key]
+    if rule.startswith("int"):
+        return int(v)
+    if rule == "bool":
+        return v == "1"
+    if rule.startswith("float"):
+        return float(v)
+    return v
+
+
+@dataclass(frozen=True)
+class Config:
+    """
+    Typed snapshot of the whole meta table (defaults = db.DEFAULT_META).
+    ALLOWED keys are parsed with their rule; raw has every key, internal ones
+    (plan_hash, srs_params, replay checkpoint, ...) included.
+    """
+    cursor_plan_order: int = 1
+    new_quota: int = 1
+    review_per_new: int = 3
+    window_size: int = 30
+    interleave_ratio: float = 0.0
+    leetcode_base_url: str = "https://leetcode.com"
+    load_balance: bool = False
+    daily_capacity: int = 0
+    raw: Mapping[str, str] = field(default_factory=dict, compare=False, repr=False)
+
+
+def _parse(raw: dict[str, str]) -> Config:
+    values = {}
+    for key in ALLOWED:
+        if raw.get(key, "") == "":
+            continue  # unset / empty: keep the default
+        try:
+            values[key] = _typed(key, raw[key])
+        except ValueError as e:
+            raise ValueError(f"bad meta value {key}={raw[key]!r}: {e} (fix: lc config set {key} ...)") from None
+    if raw.get("cursor_plan_order", "") != "":
+        values["cursor_plan_order"] = int(raw["cursor_plan_order"])
+    return Config(**values, raw=MappingProxyType(raw))
+
+
+# connection -> ((data_version, meta_writes), snapshot). data_version moves when another
+# connection commits; meta_writes when this one writes meta (db.set_meta, init_db) and when
+# db.tx rolls back, since the snapshot may hold values the rollback just undid.
+_SNAPSHOTS: "weakref.WeakKeyDictionary[sqlite3.Connection, Tuple[Tuple[int, int], Config]]" = weakref.WeakKeyDictionary()
+
+
+def load_config(conn: sqlite3.Connection) -> Config:
+    """The meta table as a Config: one query, then cached until the db changes."""
+    stamp = (int(conn.execute("PRAGMA data_version;").fetchone()[0]), getattr(conn, "meta_writes", 0))
+    try:
+        hit = _SNAPSHOTS.get(conn)
+    except TypeError:  # plain sqlite3.Connection: no weakrefs, no cache
+        hit = None
+    if hit is not None and hit[0] == stamp:
+        return hit[1]
+    cfg = _parse({str(r[0]): str(r[1]) for r in conn.execute("SELECT key, value FROM meta;")})
+    try:
+        _SNAPSHOTS[conn] = (stamp, cfg)
+    except TypeError:
+        pass
+    return cfg
+
+
+# scheduler params fitted by `lc optimize` (optimize.py), as SrsParams JSON
+PARAMS_KEY = "srs_params"
+
+
+def load_params(conn: sqlite3.Connection, cfg: Optional[Config] = None) -> SrsParams:
+    """Fitted scheduler params from meta, or the built-in defaults."""
+    return SrsParams.from_json((cfg or load_config(conn)).raw.get(PARAMS_KEY))
+
+
+def save_params(conn: sqlite3.Connection, params: Optional[SrsParams]) -> None:
+    """Store params (None = back to the defaults)."""
+    set_meta(conn, PARAMS_KEY, "" if params is None else params.to_json())
+
+
 def config_get(db_path: Path, key: str) -> str | None:
     conn = connect(db_path)
     try:
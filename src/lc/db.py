@@ -6,20 +6,39 @@ from contextlib import contextmanager
 from pathlib import Path
 from typing import Iterator
 
-DEFAULT_DB_PATH = Path(os.environ.get("LCSRS_DB", "./lcsrs.db")).resolve()
+def _default_db_path() -> Path:
+    # LCSRS_DB wins; otherwise LCSRS_WORKSPACE + LCSRS_USER route to that user's shard (see workspace.py)
+    if "LCSRS_DB" not in os.environ and os.environ.get("LCSRS_WORKSPACE") and os.environ.get("LCSRS_USER"):
+        return (Path(os.environ["LCSRS_WORKSPACE"]) / f"{os.environ['LCSRS_USER']}.db").resolve()
+    return Path(os.environ.get("LCSRS_DB", "./lcsrs.db")).resolve()
 
-SCHEMA_SQL = """
-PRAGMA foreign_keys = ON;
+DEFAULT_DB_PATH = _default_db_path()
+
+# plan.txt "Phase N: ..." headers; problems.phase_id points here (see phases.py)
+PHASES_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS phases (
+  id   INTEGER PRIMARY KEY,
+  name TEXT    NOT NULL UNIQUE
+);
+"""
 
-CREATE TABLE IF NOT EXISTS problems (
+# {name}: the phases migration rebuilds the table under another name on old SQLite
+PROBLEMS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS {name} (
   lc_num      INTEGER PRIMARY KEY,
   title       TEXT    NOT NULL,
-  phase       TEXT    NOT NULL,
+  phase_id    INTEGER NOT NULL REFERENCES phases(id),
   plan_order  INTEGER NOT NULL UNIQUE,
   is_optional INTEGER NOT NULL DEFAULT 0,
   note        TEXT,
-  created_at  TEXT    NOT NULL DEFAULT (datetime('now'))
+  created_at  TEXT    NOT NULL DEFAULT (datetime('now')),
+  parked      INTEGER NOT NULL DEFAULT 0   -- 1 = dropped from plan.txt, kept after the plan end (importer.py)
 );
+"""
+
+SCHEMA_SQL = """
+PRAGMA foreign_keys = ON;
+""" + PHASES_TABLE_SQL + PROBLEMS_TABLE_SQL.format(name="problems") + """
 
 CREATE TABLE IF NOT EXISTS reviews (
   lc_num        INTEGER PRIMARY KEY,
@@ -50,6 +69,21 @@ CREATE TABLE IF NOT EXISTS review_logs (
   FOREIGN KEY(lc_num) REFERENCES problems(lc_num) ON DELETE CASCADE
 );
 
+-- replay checkpoint: scheduler state as of meta.replay_last_log_id (see replay.py)
+CREATE TABLE IF NOT EXISTS replay_state (
+  lc_num           INTEGER PRIMARY KEY,
+  due_at           INTEGER NOT NULL,
+  interval_days    REAL    NOT NULL,
+  ease             REAL    NOT NULL,
+  reps             INTEGER NOT NULL,
+  lapses           INTEGER NOT NULL,
+  easy_streak      INTEGER NOT NULL,
+  last_grade       TEXT    NOT NULL,
+  status           TEXT    NOT NULL,
+  last_reviewed_at INTEGER NOT NULL,
+  FOREIGN KEY(lc_num) REFERENCES problems(lc_num) ON DELETE CASCADE
+);
+
 CREATE TABLE IF NOT EXISTS meta (
   key   TEXT PRIMARY KEY,
   value TEXT NOT NULL
@@ -57,6 +91,291 @@ CREATE TABLE IF NOT EXISTS meta (
 
 CREATE INDEX IF NOT EXISTS idx_reviews_due ON reviews(due_at);
 CREATE INDEX IF NOT EXISTS idx_logs_time  ON review_logs(reviewed_at);
+-- one card's logs in replay order; also the (lc_num, reviewed_at, grade) duplicate check of `lc sync`
+CREATE INDEX IF NOT EXISTS idx_logs_card  ON review_logs(lc_num, reviewed_at);
+-- one phase = one index range, already in plan order
+CREATE INDEX IF NOT EXISTS idx_problems_phase ON problems(phase_id, plan_order);
+
+-- NEW frontier: plan problems (not parked) without a reviews row, keyed by plan_order (see frontier.py)
+CREATE TABLE IF NOT EXISTS new_frontier (
+  plan_order INTEGER PRIMARY KEY,
+  lc_num     INTEGER NOT NULL UNIQUE
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_frontier_problem_ins AFTER INSERT ON problems
+WHEN NEW.parked = 0 AND NOT EXISTS (SELECT 1 FROM reviews WHERE lc_num = NEW.lc_num)
+BEGIN
+  INSERT INTO new_frontier(plan_order, lc_num) VALUES(NEW.plan_order, NEW.lc_num);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_frontier_problem_del AFTER DELETE ON problems
+BEGIN
+  DELETE FROM new_frontier WHERE lc_num = OLD.lc_num;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_frontier_problem_order AFTER UPDATE OF plan_order ON problems
+BEGIN
+  UPDATE new_frontier SET plan_order = NEW.plan_order WHERE lc_num = NEW.lc_num;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_frontier_problem_park AFTER UPDATE OF parked ON problems
+WHEN OLD.parked != NEW.parked
+BEGIN
+  DELETE FROM new_frontier WHERE NEW.parked != 0 AND lc_num = NEW.lc_num;
+  INSERT OR IGNORE INTO new_frontier(plan_order, lc_num)
+  SELECT NEW.plan_order, NEW.lc_num
+  WHERE NEW.parked = 0 AND NOT EXISTS (SELECT 1 FROM reviews WHERE lc_num = NEW.lc_num);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_frontier_review_ins AFTER INSERT ON reviews
+BEGIN
+  DELETE FROM new_frontier WHERE lc_num = NEW.lc_num;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_frontier_review_del AFTER DELETE ON reviews
+BEGIN
+  INSERT OR IGNORE INTO new_frontier(plan_order, lc_num)
+  SELECT plan_order, lc_num FROM problems WHERE lc_num = OLD.lc_num AND parked = 0;
+END;
+
+-- counters for stats.compute_stats, kept in sync by triggers (see stats.py)
+CREATE TABLE IF NOT EXISTS counters (
+  name  TEXT PRIMARY KEY,
+  value INTEGER NOT NULL
+);
+
+-- non-seed review_logs per day (day = reviewed_at / 86400)
+CREATE TABLE IF NOT EXISTS log_days (
+  day INTEGER PRIMARY KEY,
+  n   INTEGER NOT NULL
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_counters_problem_ins AFTER INSERT ON problems
+WHEN NEW.parked = 0
+BEGIN
+  UPDATE counters SET value = value + 1 WHERE name = 'problems_total';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_counters_problem_del AFTER DELETE ON problems
+WHEN OLD.parked = 0
+BEGIN
+  UPDATE counters SET value = value - 1 WHERE name = 'problems_total';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_counters_problem_park AFTER UPDATE OF parked ON problems
+WHEN OLD.parked != NEW.parked
+BEGIN
+  UPDATE counters SET value = value + (NEW.parked = 0) - (OLD.parked = 0) WHERE name = 'problems_total';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_counters_review_ins AFTER INSERT ON reviews
+BEGIN
+  UPDATE counters SET value = value + CASE name
+      WHEN 'reviews_total' THEN 1
+      WHEN 'active_total'  THEN NEW.status = 'active'
+      WHEN 'retired_total' THEN NEW.status = 'retired'
+    END
+  WHERE name IN ('reviews_total', 'active_total', 'retired_total');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_counters_review_del AFTER DELETE ON reviews
+BEGIN
+  UPDATE counters SET value = value - CASE name
+      WHEN 'reviews_total' THEN 1
+      WHEN 'active_total'  THEN OLD.status = 'active'
+      WHEN 'retired_total' THEN OLD.status = 'retired'
+    END
+  WHERE name IN ('reviews_total', 'active_total', 'retired_total');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_counters_review_status AFTER UPDATE OF status ON reviews
+WHEN OLD.status != NEW.status
+BEGIN
+  UPDATE counters SET value = value + CASE name
+      WHEN 'active_total'  THEN (NEW.status = 'active') - (OLD.status = 'active')
+      WHEN 'retired_total' THEN (NEW.status = 'retired') - (OLD.status = 'retired')
+    END
+  WHERE name IN ('active_total', 'retired_total');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_log_days_ins AFTER INSERT ON review_logs
+WHEN NEW.grade != 'seed'
+BEGIN
+  INSERT INTO log_days(day, n) VALUES(NEW.reviewed_at / 86400, 1)
+  ON CONFLICT(day) DO UPDATE SET n = n + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_log_days_del AFTER DELETE ON review_logs
+WHEN OLD.grade != 'seed'
+BEGIN
+  UPDATE log_days SET n = n - 1 WHERE day = OLD.reviewed_at / 86400;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_log_days_upd AFTER UPDATE OF reviewed_at, grade ON review_logs
+BEGIN
+  UPDATE log_days SET n = n - 1 WHERE OLD.grade != 'seed' AND day = OLD.reviewed_at / 86400;
+  INSERT INTO log_days(day, n) SELECT NEW.reviewed_at / 86400, 1 WHERE NEW.grade != 'seed'
+  ON CONFLICT(day) DO UPDATE SET n = n + 1;
+END;
+
+-- active reviews per due day (day = due_at / 86400), for load balancing (see balance.py)
+CREATE TABLE IF NOT EXISTS due_days (
+  day INTEGER PRIMARY KEY,
+  n   INTEGER NOT NULL
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_due_days_ins AFTER INSERT ON reviews
+WHEN NEW.status = 'active'
+BEGIN
+  INSERT INTO due_days(day, n) VALUES(NEW.due_at / 86400, 1)
+  ON CONFLICT(day) DO UPDATE SET n = n + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_due_days_del AFTER DELETE ON reviews
+WHEN OLD.status = 'active'
+BEGIN
+  UPDATE due_days SET n = n - 1 WHERE day = OLD.due_at / 86400;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_due_days_upd AFTER UPDATE OF due_at, status ON reviews
+WHEN OLD.due_at != NEW.due_at OR OLD.status != NEW.status
+BEGIN
+  UPDATE due_days SET n = n - 1 WHERE OLD.status = 'active' AND day = OLD.due_at / 86400;
+  INSERT INTO due_days(day, n) SELECT NEW.due_at / 86400, 1 WHERE NEW.status = 'active'
+  ON CONFLICT(day) DO UPDATE SET n = n + 1;
+END;
+
+-- offline lc_num -> URL slug catalog for `lc open` (see slugs.py); not tied to the plan
+CREATE TABLE IF NOT EXISTS slugs (
+  lc_num INTEGER PRIMARY KEY,
+  slug   TEXT    NOT NULL,
+  source TEXT    NOT NULL      -- 'import' (a catalog dump) | 'plan' (derived from a plan title)
+);
+
+-- full-text index over problems.note (rowid = -lc_num) and review_logs.note (rowid = log id), see notes.py
+CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(
+  body,
+  lc_num UNINDEXED,
+  kind UNINDEXED,          -- 'problem' | 'log'
+  tokenize = 'unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_notes_log_ins AFTER INSERT ON review_logs
+WHEN COALESCE(NEW.note, '') != ''
+BEGIN
+  INSERT INTO notes_fts(rowid, body, lc_num, kind) VALUES(NEW.id, NEW.note, NEW.lc_num, 'log');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_notes_log_del AFTER DELETE ON review_logs
+WHEN COALESCE(OLD.note, '') != ''
+BEGIN
+  DELETE FROM notes_fts WHERE rowid = OLD.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_notes_log_upd AFTER UPDATE OF note ON review_logs
+BEGIN
+  DELETE FROM notes_fts WHERE rowid = OLD.id;
+  INSERT INTO notes_fts(rowid, body, lc_num, kind)
+  SELECT NEW.id, NEW.note, NEW.lc_num, 'log' WHERE COALESCE(NEW.note, '') != '';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_notes_problem_ins AFTER INSERT ON problems
+WHEN COALESCE(NEW.note, '') != ''
+BEGIN
+  INSERT INTO notes_fts(rowid, body, lc_num, kind) VALUES(-NEW.lc_num, NEW.note, NEW.lc_num, 'problem');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_notes_problem_del AFTER DELETE ON problems
+WHEN COALESCE(OLD.note, '') != ''
+BEGIN
+  DELETE FROM notes_fts WHERE rowid = -OLD.lc_num;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_notes_problem_upd AFTER UPDATE OF note ON problems
+BEGIN
+  DELETE FROM notes_fts WHERE rowid = -OLD.lc_num;
+  INSERT INTO notes_fts(rowid, body, lc_num, kind)
+  SELECT -NEW.lc_num, NEW.note, NEW.lc_num, 'problem' WHERE COALESCE(NEW.note, '') != '';
+END;
+"""
+
+# recompute counters/log_days from scratch (init on old databases, lc check --repair)
+COUNTERS_REBUILD_SQL = (
+    "DELETE FROM counters;",
+    "DELETE FROM log_days;",
+    """
+    INSERT INTO counters(name, value)
+    SELECT 'problems_total', COUNT(*) FROM problems WHERE parked = 0
+    UNION ALL SELECT 'reviews_total', COUNT(*) FROM reviews
+    UNION ALL SELECT 'active_total', COUNT(*) FROM reviews WHERE status = 'active'
+    UNION ALL SELECT 'retired_total', COUNT(*) FROM reviews WHERE status = 'retired';
+    """,
+    """
+    INSERT INTO log_days(day, n)
+    SELECT reviewed_at / 86400, COUNT(*) FROM review_logs WHERE grade != 'seed' GROUP BY 1;
+    """,
+)
+
+# recompute due_days from reviews (older databases, lc check --repair)
+DUE_DAYS_REBUILD_SQL = (
+    "DELETE FROM due_days;",
+    "INSERT INTO due_days(day, n) SELECT due_at / 86400, COUNT(*) FROM reviews WHERE status = 'active' GROUP BY 1;",
+)
+
+# (re)fill notes_fts from both note columns (older databases, lc check --repair)
+NOTES_FTS_REBUILD_SQL = (
+    "DELETE FROM notes_fts;",
+    """
+    INSERT INTO notes_fts(rowid, body, lc_num, kind)
+    SELECT id, note, lc_num, 'log' FROM review_logs WHERE COALESCE(note, '') != ''
+    UNION ALL
+    SELECT -lc_num, note, lc_num, 'problem' FROM problems WHERE COALESCE(note, '') != '';
+    """,
+    "INSERT INTO notes_fts(notes_fts) VALUES('optimize');",
+)
+
+# problems.phase (free text) -> phases + problems.phase_id, for databases before schema v4
+PHASES_MIGRATION_SQL = (
+    PHASES_TABLE_SQL,
+    "ALTER TABLE problems ADD COLUMN phase_id INTEGER REFERENCES phases(id);",
+    "INSERT OR IGNORE INTO phases(name) SELECT phase FROM problems GROUP BY phase ORDER BY MIN(plan_order);",
+    "UPDATE problems SET phase_id = (SELECT id FROM phases WHERE name = problems.phase);",
+    "ALTER TABLE problems DROP COLUMN phase;",
+)
+
+# the same for SQLite < 3.35 (no DROP COLUMN): copy into a new table and swap it in.
+# Runs with foreign_keys off (dropping problems would otherwise cascade to reviews/logs);
+# the problems triggers and idx_problems_phase go with the old table and SCHEMA_SQL recreates them.
+PHASES_REBUILD_SQL = (
+    PHASES_TABLE_SQL,
+    "INSERT OR IGNORE INTO phases(name) SELECT phase FROM problems GROUP BY phase ORDER BY MIN(plan_order);",
+    PROBLEMS_TABLE_SQL.format(name="problems_v4"),
+    """
+    INSERT INTO problems_v4(lc_num, title, phase_id, plan_order, is_optional, note, created_at)
+    SELECT lc_num, title, (SELECT id FROM phases WHERE name = problems.phase), plan_order, is_optional, note, created_at
+    FROM problems;
+    """,
+    "DROP TABLE problems;",
+    "ALTER TABLE problems_v4 RENAME TO problems;",
+)
+
+# problems.parked, for databases before schema v7. The triggers that now skip parked
+# rows are dropped so SCHEMA_SQL recreates them; rows parked by an older import carry
+# no flag yet, so the stored plan hash is cleared and the next `lc import` re-diffs the plan.
+PARKED_MIGRATION_SQL = (
+    "DROP TRIGGER IF EXISTS trg_frontier_problem_ins;",
+    "DROP TRIGGER IF EXISTS trg_frontier_review_del;",
+    "DROP TRIGGER IF EXISTS trg_counters_problem_ins;",
+    "DROP TRIGGER IF EXISTS trg_counters_problem_del;",
+    "DELETE FROM meta WHERE key = 'plan_hash';",
+)
+
+# one-time backfill for databases created before the frontier existed
+BACKFILL_SQL = """
+INSERT OR IGNORE INTO new_frontier(plan_order, lc_num)
+SELECT p.plan_order, p.lc_num
+FROM problems p
+WHERE p.parked = 0 AND NOT EXISTS (SELECT 1 FROM reviews r WHERE r.lc_num = p.lc_num);
 """
 
 DEFAULT_META = {
@@ -65,35 +384,223 @@ DEFAULT_META = {
     "review_per_new": "3",
     "interleave_ratio": "0",  # MVP 先关
     "window_size": "30",
+    "load_balance": "0",     # 1 = spread due dates over a fuzz window (balance.py)
+    "daily_capacity": "0",   # reviews/day the balancer tries to stay under; 0 = no cap
 }
 
-def connect(db_path: Path = DEFAULT_DB_PATH) -> sqlite3.Connection:
-    db_path.parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(str(db_path))
+# bump whenever SCHEMA_SQL gains tables/triggers; `lc init` (init_db) upgrades older files in place
+SCHEMA_VERSION = 7
+
+# applied to every new connection; override per call (connect(pragmas=...)) or via
+# LCSRS_PRAGMAS="synchronous=FULL,cache_size=-65536"
+DEFAULT_PRAGMAS = {
+    "journal_mode": "WAL",       # readers don't block the writer and vice versa
+    "synchronous": "NORMAL",     # safe with WAL; fsync only at checkpoints
+    "busy_timeout": "5000",      # ms to wait for another writer instead of failing
+    "cache_size": "-16384",      # KiB (negative = size, not pages)
+    "temp_store": "MEMORY",
+    "foreign_keys": "ON",
+}
+
+CACHED_STATEMENTS = 256
+
+# SQLite 老版本单条语句最多 999 个参数: `IN (...)` lists are sent in chunks of this size
+IN_CHUNK = 500
+
+
+def _env_pragmas() -> dict[str, str]:
+    raw = os.environ.get("LCSRS_PRAGMAS", "")
+    out: dict[str, str] = {}
+    for part in raw.split(","):
+        if "=" in part:
+            k, v = part.split("=", 1)
+            out[k.strip()] = v.strip()
+    return out
+
+
+class Connection(sqlite3.Connection):
+    """sqlite3.Connection whose close() is a no-op while it is held by the connection cache."""
+
+    cached = False
+    meta_writes = 0  # bumped by set_meta: lets config.load_config see this connection's own writes
+
+    def close(self) -> None:
+        if not self.cached:
+            super().close()
+
+
+# class used for new connections; trace.enable() (lc --profile / LCSRS_TRACE=1) swaps in a tracing subclass
+CONNECTION_FACTORY: type[Connection] = Connection
+
+# process-level cache: db path -> open connection (None = disabled)
+_CACHE: dict[str, Connection] | None = None
+
+
+def enable_connection_cache() -> None:
+    """
+    Reuse one connection per db file for the rest of the process. For long-running
+    callers (scripts, a daemon); connect() then returns the cached connection and
+    the callers' conn.close() is ignored. Connections are bound to the creating thread.
+    """
+    global _CACHE
+    if _CACHE is None:
+        _CACHE = {}
+
+
+def close_cached_connections() -> None:
+    """Really close every cached connection and disable the cache."""
+    global _CACHE
+    cache, _CACHE = _CACHE, None
+    for conn in (cache or {}).values():
+        conn.cached = False
+        conn.close()
+
+
+def _cache_key(db_path: Path) -> str:
+    s = str(db_path)
+    return s if s == ":memory:" else str(db_path.resolve())
+
+
+class DatabaseNotReady(ValueError):
+    """connect() refused the file: missing, not an lc database, or an older schema (run `lc init`)."""
+
+
+def _not_ready(conn: sqlite3.Connection, db_path: Path, version: int) -> str:
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='problems';").fetchone() is None:
+        return f"{db_path} is not an lc database (no problems table); run `lc init --db {db_path}` to create one"
+    return f"{db_path} has schema v{version}, this lc needs v{SCHEMA_VERSION}: run `lc init --db {db_path}` to upgrade it"
+
+
+def connect(db_path: Path = DEFAULT_DB_PATH, pragmas: dict[str, str] | None = None,
+            create: bool = False) -> sqlite3.Connection:
+    """
+    Open an existing, up-to-date lc database. Only create=True (init_db, and
+    in-memory databases) creates the file or migrates an older schema, so a
+    read command never writes tables into a typo'd or foreign file.
+    """
+    key = _cache_key(db_path)
+    if _CACHE is not None and key in _CACHE:
+        return _CACHE[key]
+
+    if CONNECTION_FACTORY is Connection and os.environ.get("LCSRS_TRACE", "0") not in ("", "0"):
+        from .trace import enable
+
+        trace_file = os.environ.get("LCSRS_TRACE_FILE")
+        enable(Path(trace_file) if trace_file else None)
+
+    create = create or str(db_path) == ":memory:"
+    if create:
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        target, uri = str(db_path), False
+    elif not db_path.exists():
+        raise DatabaseNotReady(f"no database at {db_path}: run `lc init --db {db_path}` first")
+    else:
+        # mode=rw: never create the file, even if it vanishes between the check and the open
+        target, uri = f"{db_path.resolve().as_uri()}?mode=rw", True
+    # isolation_level=None: no implicit transactions, writers go through tx()
+    conn = sqlite3.connect(
+        target,
+        factory=CONNECTION_FACTORY,
+        isolation_level=None,
+        cached_statements=CACHED_STATEMENTS,
+        uri=uri,
+    )
     conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA foreign_keys = ON;")
+    version = conn.execute("PRAGMA user_version;").fetchone()[0]
+    if version < SCHEMA_VERSION and not create:
+        reason = _not_ready(conn, db_path, version)
+        conn.close()
+        raise DatabaseNotReady(reason)
+    for k, v in {**DEFAULT_PRAGMAS, **_env_pragmas(), **(pragmas or {})}.items():
+        conn.execute(f"PRAGMA {k} = {v};")
+    if version < SCHEMA_VERSION:
+        ensure_schema(conn)
+
+    if _CACHE is not None:
+        conn.cached = True
+        _CACHE[key] = conn
     return conn
 
 @contextmanager
 def tx(conn: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
+    # IMMEDIATE takes the write lock up front, so a concurrent writer waits on
+    # busy_timeout here instead of failing later on a read->write upgrade
     try:
-        conn.execute("BEGIN;")
+        conn.execute("BEGIN IMMEDIATE;")
         yield conn
         conn.execute("COMMIT;")
     except Exception:
-        conn.execute("ROLLBACK;")
+        if conn.in_transaction:
+            conn.execute("ROLLBACK;")
+            _meta_written(conn)  # the rollback may undo meta writes a cached Config already saw
         raise
 
+def _rebuild_problems(conn: sqlite3.Connection) -> None:
+    # both pragmas are no-ops inside a transaction, so they go around tx()
+    fk = int(conn.execute("PRAGMA foreign_keys;").fetchone()[0])
+    conn.execute("PRAGMA foreign_keys = OFF;")
+    # 3.26+ re-checks every trigger on RENAME and would trip over the ones naming the dropped table
+    conn.execute("PRAGMA legacy_alter_table = ON;")
+    try:
+        with tx(conn):
+            for sql in PHASES_REBUILD_SQL:
+                conn.execute(sql)
+            bad = conn.execute("PRAGMA foreign_key_check(problems);").fetchone()
+            if bad is not None:
+                raise sqlite3.IntegrityError(f"phases migration broke a foreign key: {tuple(bad)}")
+    finally:
+        conn.execute("PRAGMA legacy_alter_table = OFF;")
+        conn.execute(f"PRAGMA foreign_keys = {fk};")
+
+def ensure_schema(conn: sqlite3.Connection) -> None:
+    """Create missing tables/triggers and backfill derived tables (idempotent)."""
+    version = conn.execute("PRAGMA user_version;").fetchone()[0]
+    # before SCHEMA_SQL: its idx_problems_phase needs the phase_id column
+    if "phase" in {r["name"] for r in conn.execute("PRAGMA table_info(problems);")}:
+        if sqlite3.sqlite_version_info >= (3, 35, 0):
+            with tx(conn):
+                for sql in PHASES_MIGRATION_SQL:
+                    conn.execute(sql)
+        else:
+            _rebuild_problems(conn)
+    if version < 7:
+        cols = {r["name"] for r in conn.execute("PRAGMA table_info(problems);")}
+        with tx(conn):
+            if cols and "parked" not in cols:  # the rebuild above already has it
+                conn.execute("ALTER TABLE problems ADD COLUMN parked INTEGER NOT NULL DEFAULT 0;")
+            if cols:
+                for sql in PARKED_MIGRATION_SQL:
+                    conn.execute(sql)
+    # executescript commits any open transaction first, so run it as its own transaction
+    conn.executescript(f"BEGIN IMMEDIATE;\n{SCHEMA_SQL}\nCOMMIT;")
+    with tx(conn):
+        conn.execute(BACKFILL_SQL)
+        if conn.execute("SELECT 1 FROM counters LIMIT 1;").fetchone() is None:
+            for sql in COUNTERS_REBUILD_SQL:
+                conn.execute(sql)
+        if conn.execute("SELECT 1 FROM due_days LIMIT 1;").fetchone() is None:
+            for sql in DUE_DAYS_REBUILD_SQL:
+                conn.execute(sql)
+        if conn.execute("SELECT 1 FROM notes_fts LIMIT 1;").fetchone() is None:
+            for sql in NOTES_FTS_REBUILD_SQL:
+                conn.execute(sql)
+        # identifies this file to `lc sync` peers (see sync.py)
+        conn.execute("INSERT OR IGNORE INTO meta(key, value) VALUES('db_id', lower(hex(randomblob(16))));")
+        _meta_written(conn)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION};")
+
 def init_db(db_path: Path = DEFAULT_DB_PATH) -> Path:
-    conn = connect(db_path)
+    """Create db_path, or bring an older lc database up to SCHEMA_VERSION."""
+    conn = connect(db_path, create=True)
+    ensure_schema(conn)
     with tx(conn):
-        conn.executescript(SCHEMA_SQL)
         for k, v in DEFAULT_META.items():
             conn.execute(
                 "INSERT INTO meta(key,value) VALUES(?,?) "
                 "ON CONFLICT(key) DO NOTHING;",
                 (k, v),
             )
+        _meta_written(conn)
     conn.close()
     return db_path
 
@@ -103,10 +610,16 @@ def get_meta(conn: sqlite3.Connection, key: str, default: str | None = None) ->
         return row["value"]
     return default
 
+def _meta_written(conn: sqlite3.Connection) -> None:
+    # every write to meta goes through here (set_meta, init_db)
+    if isinstance(conn, Connection):
+        conn.meta_writes += 1
+
 def set_meta(conn: sqlite3.Connection, key: str, value: str) -> None:
     conn.execute(
         "INSERT INTO meta(key,value) VALUES(?,?) "
         "ON CONFLICT(key) DO UPDATE SET value=excluded.value;",
         (key, value),
     )
+    _meta_written(conn)
 
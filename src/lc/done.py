@@ -1,14 +1,46 @@
 from __future__ import annotations
 
-import time
+import csv
+import json
+from dataclasses import dataclass
+from datetime import datetime
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple
 
-from .db import connect, tx, get_meta, set_meta
-from .srs import ReviewState, next_state
+from . import clock
+from .balance import balancer_for
+from .config import load_config, load_params
+from .db import IN_CHUNK, connect, tx
+from .frontier import advance_cursor
+from .srs import ReviewState, next_state, row_to_state
 
 RETIRE_EASY_STREAK = 3
 
+UPSERT_REVIEW_SQL = """
+INSERT INTO reviews(lc_num, due_at, interval_days, ease, reps, lapses, easy_streak, last_grade, status, updated_at)
+VALUES(?,?,?,?,?,?,?,?,?,?)
+ON CONFLICT(lc_num) DO UPDATE SET
+  due_at=excluded.due_at,
+  interval_days=excluded.interval_days,
+  ease=excluded.ease,
+  reps=excluded.reps,
+  lapses=excluded.lapses,
+  easy_streak=excluded.easy_streak,
+  last_grade=excluded.last_grade,
+  status=excluded.status,
+  updated_at=excluded.updated_at;
+"""
+
+INSERT_LOG_SQL = """
+INSERT INTO review_logs(
+  lc_num, reviewed_at, grade,
+  prev_due_at, next_due_at,
+  prev_intvl, next_intvl,
+  prev_ease, next_ease,
+  note
+) VALUES(?,?,?,?,?,?,?,?,?,?);
+"""
+
 def _should_retire(conn, lc_num: int, streak: int = RETIRE_EASY_STREAK) -> bool:
     rows = conn.execute(
         """
@@ -27,17 +59,6 @@ def _should_retire(conn, lc_num: int, streak: int = RETIRE_EASY_STREAK) -> bool:
     return all(r["grade"] == "easy" for r in rows)
 
 
-def get_meta(conn, key: str, default: str) -> str:
-    row = conn.execute("SELECT value FROM meta WHERE key=?;", (key,)).fetchone()
-    return row["value"] if row else default
-
-def set_meta(conn, key: str, value: str) -> None:
-    conn.execute(
-        "INSERT INTO meta(key,value) VALUES(?,?) "
-        "ON CONFLICT(key) DO UPDATE SET value=excluded.value;",
-        (key, value),
-    )
-
 def _load_prev_review(conn, lc_num: int) -> Optional[ReviewState]:
     row = conn.execute(
         """
@@ -48,41 +69,40 @@ def _load_prev_review(conn, lc_num: int) -> Optional[ReviewState]:
     ).fetchone()
     if not row:
         return None
-    return ReviewState(
-        due_at=int(row["due_at"]),
-        interval_days=float(row["interval_days"]),
-        ease=float(row["ease"]),
-        reps=int(row["reps"]),
-        lapses=int(row["lapses"]),
-        easy_streak=int(row["easy_streak"]),
-        last_grade=str(row["last_grade"]),
-        status=str(row["status"]),
-    )
+    return row_to_state(row)
 
-def _advance_cursor_to_next_new(conn) -> None:
-    cur = int(get_meta(conn, "cursor_plan_order", "1") or "1")
-    row = conn.execute(
-        """
-        SELECT MIN(p.plan_order) AS next_po
-        FROM problems p
-        LEFT JOIN reviews r ON r.lc_num=p.lc_num
-        WHERE r.lc_num IS NULL AND p.plan_order >= ?;
-        """,
-        (cur,),
-    ).fetchone()
-    next_po = row["next_po"]
-    if next_po is None:
-        # no NEW left: cursor becomes (max+1)
-        mx = conn.execute("SELECT MAX(plan_order) AS m FROM problems;").fetchone()["m"] or 0
-        set_meta(conn, "cursor_plan_order", str(int(mx) + 1))
-    else:
-        set_meta(conn, "cursor_plan_order", str(int(next_po)))
+def _load_prev_reviews(conn, lc_nums: Iterable[int]) -> Dict[int, ReviewState]:
+    nums = sorted(set(lc_nums))
+    out: Dict[int, ReviewState] = {}
+    for i in range(0, len(nums), IN_CHUNK):
+        chunk = nums[i:i + IN_CHUNK]
+        marks = ",".join("?" * len(chunk))
+        rows = conn.execute(
+            f"""
+            SELECT lc_num, due_at, interval_days, ease, reps, lapses, easy_streak, last_grade, status
+            FROM reviews WHERE lc_num IN ({marks});
+            """,
+            chunk,
+        ).fetchall()
+        for r in rows:
+            out[int(r["lc_num"])] = row_to_state(r)
+    return out
+
+def _existing_problems(conn, lc_nums: Iterable[int]) -> set[int]:
+    nums = sorted(set(lc_nums))
+    found: set[int] = set()
+    for i in range(0, len(nums), IN_CHUNK):
+        chunk = nums[i:i + IN_CHUNK]
+        marks = ",".join("?" * len(chunk))
+        rows = conn.execute(f"SELECT lc_num FROM problems WHERE lc_num IN ({marks});", chunk).fetchall()
+        found.update(int(r["lc_num"]) for r in rows)
+    return found
 
 def apply_done(db_path: Path, lc_num: int, grade: str, note: Optional[str]) -> Tuple[int, int]:
     """
     Returns (prev_due_at, next_due_at) as unix seconds (prev_due_at may be 0 if new).
     """
-    now = int(time.time())
+    now = clock.now()
     conn = connect(db_path)
 
     with tx(conn):
@@ -96,23 +116,14 @@ def apply_done(db_path: Path, lc_num: int, grade: str, note: Optional[str]) -> T
         prev_int = prev.interval_days if prev else None
         prev_ease = prev.ease if prev else None
 
-        nxt = next_state(prev, grade, now)
+        cfg = load_config(conn)  # one meta read for balancer, params and cursor
+        balancer = balancer_for(conn, cfg)
+        if balancer is not None and prev is not None and prev.status == "active":
+            balancer.release(prev.due_at)  # this card no longer counts on its old day
+        nxt = next_state(prev, grade, now, balancer, load_params(conn, cfg))
 
         conn.execute(
-            """
-            INSERT INTO reviews(lc_num, due_at, interval_days, ease, reps, lapses, easy_streak, last_grade, status, updated_at)
-            VALUES(?,?,?,?,?,?,?,?,?,?)
-            ON CONFLICT(lc_num) DO UPDATE SET
-              due_at=excluded.due_at,
-              interval_days=excluded.interval_days,
-              ease=excluded.ease,
-              reps=excluded.reps,
-              lapses=excluded.lapses,
-              easy_streak=excluded.easy_streak,
-              last_grade=excluded.last_grade,
-              status=excluded.status,
-              updated_at=excluded.updated_at;
-            """,
+            UPSERT_REVIEW_SQL,
             (
                 lc_num,
                 nxt.due_at,
@@ -128,15 +139,7 @@ def apply_done(db_path: Path, lc_num: int, grade: str, note: Optional[str]) -> T
         )
 
         conn.execute(
-            """
-            INSERT INTO review_logs(
-              lc_num, reviewed_at, grade,
-              prev_due_at, next_due_at,
-              prev_intvl, next_intvl,
-              prev_ease, next_ease,
-              note
-            ) VALUES(?,?,?,?,?,?,?,?,?,?);
-            """,
+            INSERT_LOG_SQL,
             (
                 lc_num,
                 now,
@@ -169,9 +172,135 @@ def apply_done(db_path: Path, lc_num: int, grade: str, note: Optional[str]) -> T
 
 
 
-        _advance_cursor_to_next_new(conn)
+        advance_cursor(conn, cfg)
 
     conn.close()
     return prev_due, nxt.due_at
 
 
+@dataclass(frozen=True)
+class BatchEntry:
+    lc_num: int
+    grade: str
+    note: Optional[str] = None
+    reviewed_at: Optional[int] = None  # unix seconds; None = now
+
+
+def _parse_ts(raw) -> Optional[int]:
+    if raw is None:
+        return None
+    if isinstance(raw, (int, float)):
+        return int(raw)
+    raw = str(raw).strip()
+    if not raw:
+        return None
+    try:
+        return int(float(raw))
+    except ValueError:
+        return int(datetime.fromisoformat(raw).timestamp())
+
+
+def read_batch_file(path: Path) -> List[BatchEntry]:
+    """
+    Read grades from CSV (lc_num,grade[,note[,timestamp]]; header optional)
+    or JSONL ({"lc_num":..,"grade":..,"note":..,"timestamp":..}).
+    timestamp may be unix seconds or an ISO datetime.
+    """
+    entries: List[BatchEntry] = []
+    with path.open("r", encoding="utf-8", newline="") as f:
+        if path.suffix.lower() in {".jsonl", ".ndjson", ".json"}:
+            for lineno, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    obj = json.loads(line)
+                    entries.append(BatchEntry(
+                        lc_num=int(obj["lc_num"]),
+                        grade=str(obj["grade"]).lower().strip(),
+                        note=obj.get("note") or None,
+                        reviewed_at=_parse_ts(obj.get("timestamp", obj.get("reviewed_at"))),
+                    ))
+                except (KeyError, ValueError, TypeError) as e:
+                    raise ValueError(f"{path}:{lineno}: bad entry ({e})") from e
+        else:
+            for lineno, row in enumerate(csv.reader(f), 1):
+                if not row or not row[0].strip() or row[0].lstrip().startswith("#"):
+                    continue
+                if lineno == 1 and not row[0].strip().isdigit():
+                    continue  # header
+                try:
+                    entries.append(BatchEntry(
+                        lc_num=int(row[0]),
+                        grade=row[1].lower().strip(),
+                        note=(row[2].strip() or None) if len(row) > 2 else None,
+                        reviewed_at=_parse_ts(row[3]) if len(row) > 3 else None,
+                    ))
+                except (IndexError, ValueError) as e:
+                    raise ValueError(f"{path}:{lineno}: bad row ({e})") from e
+    return entries
+
+
+def apply_done_batch(db_path: Path, entries: Iterable[BatchEntry]) -> int:
+    """
+    Apply many grades in one transaction. Entries are replayed in timestamp
+    order (file order breaks ties) so repeated grades of one problem chain
+    correctly; reviews/review_logs are written with executemany and the
+    cursor is advanced once at the end.
+    Returns number of grades applied.
+    """
+    now = clock.now()
+    todo = sorted(
+        ((e.reviewed_at if e.reviewed_at is not None else now, i, e) for i, e in enumerate(entries)),
+        key=lambda x: (x[0], x[1]),
+    )
+    if not todo:
+        return 0
+
+    conn = connect(db_path)
+    with tx(conn):
+        nums = {e.lc_num for _, _, e in todo}
+        missing = nums - _existing_problems(conn, nums)
+        if missing:
+            raise ValueError(f"lc_num not found in problems (did you import plan.txt?): {sorted(missing)[:20]}")
+
+        states = _load_prev_reviews(conn, nums)
+        cfg = load_config(conn)
+        balancer = balancer_for(conn, cfg)
+        params = load_params(conn, cfg)
+        touched: Dict[int, Tuple[ReviewState, int]] = {}
+        log_rows = []
+
+        for ts, _, e in todo:
+            prev = states.get(e.lc_num)
+            if balancer is not None and prev is not None and prev.status == "active":
+                balancer.release(prev.due_at)
+            nxt = next_state(prev, e.grade, ts, balancer, params)
+            states[e.lc_num] = nxt
+            touched[e.lc_num] = (nxt, ts)
+            log_rows.append((
+                e.lc_num,
+                ts,
+                nxt.last_grade,
+                prev.due_at if prev else None,
+                nxt.due_at,
+                prev.interval_days if prev else None,
+                nxt.interval_days,
+                prev.ease if prev else None,
+                nxt.ease,
+                e.note,
+            ))
+
+        conn.executemany(
+            UPSERT_REVIEW_SQL,
+            [
+                (n, s.due_at, s.interval_days, s.ease, s.reps, s.lapses, s.easy_streak, s.last_grade, s.status, ts)
+                for n, (s, ts) in touched.items()
+            ],
+        )
+        conn.executemany(INSERT_LOG_SQL, log_rows)
+
+        advance_cursor(conn, cfg)
+
+    conn.close()
+    return len(log_rows)
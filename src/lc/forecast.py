@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List
+
+from . import clock
+from .config import load_params
+from .db import connect
+from .srs import DEFAULT_PARAMS, EASE_MAX, EASE_MIN, SECONDS_PER_DAY, ReviewState, SrsParams, next_state
+
+GRADES = ("again", "hard", "good", "easy")
+
+# 没有任何 review_logs 时的兜底分布
+DEFAULT_GRADE_PROBS = {"again": 0.10, "hard": 0.15, "good": 0.60, "easy": 0.15}
+
+_WINDOW_DAYS = 7
+
+
+def _np():
+    try:
+        import numpy as np
+    except ImportError as e:  # pragma: no cover - depends on environment
+        raise RuntimeError("forecast needs numpy: pip install 'lcsrs[forecast]'") from e
+    return np
+
+
+@dataclass(frozen=True)
+class Forecast:
+    day0: int                   # unix seconds of the first forecast day (day boundary)
+    expected: List[float]       # expected reviews per day, len == days
+    grade_probs: Dict[str, float]
+    cards: int
+    runs: int
+
+
+def grade_distribution(conn) -> Dict[str, float]:
+    rows = conn.execute(
+        "SELECT grade, COUNT(*) AS c FROM review_logs WHERE grade != 'seed' GROUP BY grade;"
+    ).fetchall()
+    counts = {g: 0 for g in GRADES}
+    for r in rows:
+        if r["grade"] in counts:
+            counts[r["grade"]] = int(r["c"])
+    total = sum(counts.values())
+    if total == 0:
+        return dict(DEFAULT_GRADE_PROBS)
+    return {g: c / total for g, c in counts.items()}
+
+
+def vector_step(ease, interval, easy_streak, grades, params: SrsParams = DEFAULT_PARAMS):
+    """
+    Batched srs.next_state for existing reviews (same params).
+    grades: int array, index into GRADES.
+    Returns (ease, interval, easy_streak, due_days) where due_days = round(interval),
+    i.e. next due is now + due_days * SECONDS_PER_DAY (numpy rounds half-to-even like round()).
+    """
+    np = _np()
+    again = grades == 0
+    hard = grades == 1
+    good = grades == 2
+    easy = grades == 3
+
+    P = params
+    new_ease = ease.copy()
+    new_ease[again] -= P.ease_again
+    new_ease[hard] -= P.ease_hard
+    new_ease[easy] += P.ease_easy
+    new_ease = np.clip(new_ease, EASE_MIN, EASE_MAX)
+
+    new_interval = np.empty_like(interval)
+    new_interval[again] = P.interval_again
+    new_interval[hard] = np.maximum(P.interval_hard, interval[hard] * P.hard_mult)
+    # good uses the ease *before* this review, easy the updated one (same as next_state)
+    new_interval[good] = np.maximum(P.interval_good, interval[good] * ease[good])
+    new_interval[easy] = np.maximum(P.interval_easy, interval[easy] * new_ease[easy] * P.easy_bonus)
+
+    new_streak = np.where(easy, easy_streak + 1, 0)
+    due_days = np.round(new_interval).astype(np.int64)
+    return new_ease, new_interval, new_streak, due_days
+
+
+def check_against_scalar(samples: int = 10000, seed: int = 0, params: SrsParams = DEFAULT_PARAMS) -> int:
+    """
+    Cross-check vector_step against srs.next_state on random states.
+    Returns number of samples checked; raises AssertionError on mismatch.
+    """
+    np = _np()
+    rng = random.Random(seed)
+    now = 1_700_000_000
+    states = [
+        ReviewState(
+            due_at=now,
+            interval_days=rng.choice([1.0, 2.0, 2.5, 3.0, rng.uniform(0.5, 400.0)]),
+            ease=rng.choice([1.30, 3.00, rng.uniform(1.30, 3.00)]),
+            reps=rng.randint(0, 20),
+            lapses=rng.randint(0, 5),
+            easy_streak=rng.randint(0, 2),
+            last_grade=rng.choice(GRADES + ("seed",)),
+            status="active",
+        )
+        for _ in range(samples)
+    ]
+    grade_idx = np.array([rng.randrange(4) for _ in range(samples)], dtype=np.int64)
+
+    ease, interval, streak, due_days = vector_step(
+        np.array([s.ease for s in states]),
+        np.array([s.interval_days for s in states]),
+        np.array([s.easy_streak for s in states], dtype=np.int64),
+        grade_idx,
+        params,
+    )
+    for i, s in enumerate(states):
+        exp = next_state(s, GRADES[grade_idx[i]], now, params=params)
+        got = (float(ease[i]), float(interval[i]), int(streak[i]), now + int(due_days[i]) * SECONDS_PER_DAY)
+        want = (exp.ease, exp.interval_days, exp.easy_streak, exp.due_at)
+        if not (abs(got[0] - want[0]) < 1e-9 and abs(got[1] - want[1]) < 1e-9 and got[2:] == want[2:]):
+            raise AssertionError(f"vector_step mismatch for {s} grade={GRADES[grade_idx[i]]}: {got} != {want}")
+    return samples
+
+
+def forecast_load(db_path: Path, days: int = 30, runs: int = 20, seed: int = 0) -> Forecast:
+    """
+    Monte-Carlo forecast of reviews per day for all active cards.
+    Every card due on a day is assumed reviewed that day with a grade drawn
+    from the review_logs distribution; all cards x runs are stepped together.
+    Overdue cards count on day 0.
+    """
+    np = _np()
+    now = clock.now()
+    day0 = now - (now % SECONDS_PER_DAY)
+
+    conn = connect(db_path)
+    try:
+        probs = grade_distribution(conn)
+        params = load_params(conn)
+        rows = conn.execute(
+            """
+            SELECT due_at, interval_days, ease, easy_streak
+            FROM reviews
+            WHERE status='active';
+            """
+        ).fetchall()
+    finally:
+        conn.close()
+
+    n = len(rows)
+    expected = np.zeros(days, dtype=np.float64)
+    if n == 0 or days <= 0:
+        return Forecast(day0, expected.tolist(), probs, n, runs)
+
+    base = np.array([tuple(r) for r in rows], dtype=np.float64)
+    due_day = np.tile(np.maximum(0, (base[:, 0].astype(np.int64) - day0) // SECONDS_PER_DAY), runs)
+    interval = np.tile(base[:, 1], runs)
+    ease = np.tile(base[:, 2], runs)
+    streak = np.tile(base[:, 3].astype(np.int64), runs)
+
+    p = np.array([probs[g] for g in GRADES], dtype=np.float64)
+    cdf = np.cumsum(p / p.sum())
+    rng = np.random.default_rng(seed)
+    retired_day = np.iinfo(np.int64).max
+
+    cand = np.empty(0, dtype=np.int64)
+    for d in range(days):
+        # only rescan the full population once per window; cards due later stay out of it
+        if d % _WINDOW_DAYS == 0:
+            cand = np.flatnonzero(due_day < d + _WINDOW_DAYS)
+        idx = cand[due_day[cand] == d]
+        if idx.size == 0:
+            continue
+        expected[d] = idx.size / runs
+        grades = np.searchsorted(cdf, rng.random(idx.size), side="right").clip(0, 3)
+        e, i, s, dd = vector_step(ease[idx], interval[idx], streak[idx], grades, params)
+        ease[idx] = e
+        interval[idx] = i
+        streak[idx] = s
+        due_day[idx] = np.where(s >= 3, retired_day, d + dd)
+
+    return Forecast(day0, expected.tolist(), probs, n, runs)
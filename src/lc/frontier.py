@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import random
+import sqlite3
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+from .config import Config, load_config
+from .db import BACKFILL_SQL, connect, tx, set_meta
+
+# new_frontier (db.SCHEMA_SQL) holds exactly the NEW problems — plan problems
+# (not parked by the importer) without a reviews row — keyed by plan_order, and
+# is kept in sync by triggers on problems/reviews. Every "next NEW" lookup is a
+# range seek on its rowid.
+#
+# Interleaving (meta interleave_ratio / window_size): each of the new_quota slots
+# is, with probability interleave_ratio, filled from the next window_size NEW
+# problems instead of strictly the next one. pick_new() does this in memory on
+# the result of one range query, seeded by the day, so show, open and serve agree
+# and the picks stay put for the whole day.
+
+_MASK64 = (1 << 64) - 1
+
+
+@dataclass(frozen=True)
+class FrontierReport:
+    missing: int  # NEW problems absent from new_frontier (or at a stale plan_order)
+    stale: int    # new_frontier rows that are not NEW any more
+
+
+def new_rows(conn: sqlite3.Connection, cursor_plan_order: int, limit: int) -> List[sqlite3.Row]:
+    """Next `limit` NEW problems at or after the cursor, in plan order."""
+    return conn.execute(
+        """
+        SELECT p.lc_num, p.title, f.plan_order
+        FROM new_frontier f
+        JOIN problems p ON p.lc_num = f.lc_num
+        WHERE f.plan_order >= ?
+        ORDER BY f.plan_order
+        LIMIT ?;
+        """,
+        (cursor_plan_order, limit),
+    ).fetchall()
+
+
+def phase_new_rows(conn: sqlite3.Connection, phase_id: int, limit: int) -> List[sqlite3.Row]:
+    """First `limit` NEW problems of one phase, in plan order (the cursor is not consulted)."""
+    return conn.execute(
+        """
+        SELECT p.lc_num, p.title, p.plan_order
+        FROM problems p
+        JOIN new_frontier f ON f.lc_num = p.lc_num
+        WHERE p.phase_id = ?
+        ORDER BY p.plan_order
+        LIMIT ?;
+        """,
+        (phase_id, limit),
+    ).fetchall()
+
+
+def _day_rank(day: int, lc_num: int) -> int:
+    # splitmix64 of (day, lc_num): a per-day order that does not depend on the rest of the window
+    x = (day * 0x9E3779B97F4A7C15 + lc_num) & _MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return x ^ (x >> 31)
+
+
+def pick_new(window: Sequence[int], quota: int, ratio: float, day: int) -> List[int]:
+    """
+    quota lc_nums out of window (upcoming NEW problems, plan order): the in-order
+    head first, then the interleaved picks, the day's lowest-ranked of the rest.
+    Doing a problem does not change which of the others are picked.
+    """
+    if quota <= 0:
+        return []
+    if ratio <= 0.0 or len(window) <= quota:
+        return list(window[:quota])
+    rng = random.Random(day)
+    mixed = sum(rng.random() < ratio for _ in range(quota))
+    head = list(window[: quota - mixed])
+    rest = sorted(window[quota - mixed:], key=lambda n: _day_rank(day, n))
+    return head + rest[:mixed]
+
+
+def window_len(quota: int, window_size: int, ratio: float) -> int:
+    """How many upcoming NEW problems pick_new needs to see."""
+    return max(quota, window_size) if ratio > 0.0 else quota
+
+
+def interleaved(rows: Sequence[sqlite3.Row], quota: int, ratio: float, day: int) -> List[sqlite3.Row]:
+    """pick_new over new_rows()/phase_new_rows() results."""
+    by_num = {int(r["lc_num"]): r for r in rows}
+    return [by_num[n] for n in pick_new(list(by_num), quota, ratio, day)]
+
+
+def advance_cursor(conn: sqlite3.Connection, cfg: Optional[Config] = None) -> None:
+    """Move cursor_plan_order to the first NEW problem at/after it (or max+1 if none)."""
+    cur = (cfg or load_config(conn)).cursor_plan_order
+    row = conn.execute(
+        "SELECT MIN(plan_order) AS next_po FROM new_frontier WHERE plan_order >= ?;",
+        (cur,),
+    ).fetchone()
+    next_po = row["next_po"]
+    if next_po is None:
+        # no NEW left: cursor becomes (max+1)
+        mx = conn.execute("SELECT MAX(plan_order) AS m FROM problems WHERE parked = 0;").fetchone()["m"] or 0
+        next_po = int(mx) + 1
+    if int(next_po) != cur:
+        set_meta(conn, "cursor_plan_order", str(int(next_po)))
+
+
+def check_frontier(conn: sqlite3.Connection) -> FrontierReport:
+    missing = conn.execute(
+        """
+        SELECT COUNT(*) AS c
+        FROM problems p
+        WHERE p.parked = 0
+          AND NOT EXISTS (SELECT 1 FROM reviews r WHERE r.lc_num = p.lc_num)
+          AND NOT EXISTS (SELECT 1 FROM new_frontier f WHERE f.lc_num = p.lc_num AND f.plan_order = p.plan_order);
+        """
+    ).fetchone()["c"]
+    stale = conn.execute(
+        """
+        SELECT COUNT(*) AS c
+        FROM new_frontier f
+        WHERE EXISTS (SELECT 1 FROM reviews r WHERE r.lc_num = f.lc_num)
+           OR NOT EXISTS (
+             SELECT 1 FROM problems p WHERE p.lc_num = f.lc_num AND p.plan_order = f.plan_order AND p.parked = 0
+           );
+        """
+    ).fetchone()["c"]
+    return FrontierReport(missing=int(missing), stale=int(stale))
+
+
+def rebuild_frontier(conn: sqlite3.Connection) -> None:
+    conn.execute("DELETE FROM new_frontier;")
+    conn.execute(BACKFILL_SQL)
+
+
+def verify(db_path: Path, repair: bool = False) -> FrontierReport:
+    """Compare new_frontier against problems/reviews; optionally rebuild it."""
+    conn = connect(db_path)
+    try:
+        report = check_frontier(conn)
+        if repair and (report.missing or report.stale):
+            with tx(conn):
+                rebuild_frontier(conn)
+        return report
+    finally:
+        conn.close()
@@ -1,8 +1,11 @@
 from __future__ import annotations
 
+import csv
+import json
+import sqlite3
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Optional
+from typing import IO, Iterator, List, Optional, Tuple
 
 from .db import connect
 
@@ -14,14 +17,34 @@ class HistoryItem:
     grade: str
     next_due_at: Optional[int]
     note: Optional[str]
+    log_id: int = 0
 
-def fetch_history(db_path: Path, n: int = 20, include_seed: bool = False) -> List[HistoryItem]:
-    conn = connect(db_path)
+    @property
+    def cursor(self) -> str:
+        """Keyset cursor for `--before`: everything strictly older than this log."""
+        return f"{self.reviewed_at}:{self.log_id}"
+
+def parse_cursor(cursor: str) -> Tuple[int, int]:
+    try:
+        ts, log_id = cursor.split(":", 1)
+        return int(ts), int(log_id)
+    except ValueError:
+        raise ValueError(f"bad history cursor {cursor!r} (expected <reviewed_at>:<id>)") from None
+
+# columns of iter_history rows (`lc history --format`)
+HISTORY_COLUMNS = ("id", "reviewed_at", "lc_num", "title", "grade", "next_due_at", "note")
 
-    where = "" if include_seed else "WHERE l.grade != 'seed'"
-    rows = conn.execute(
+def _page(conn: sqlite3.Connection, n: int, include_seed: bool, before: Optional[str]) -> sqlite3.Cursor:
+    conds, params = [], []
+    if not include_seed:
+        conds.append("l.grade != 'seed'")
+    if before is not None:
+        conds.append("(l.reviewed_at, l.id) < (?, ?)")
+        params.extend(parse_cursor(before))
+    where = f"WHERE {' AND '.join(conds)}" if conds else ""
+    return conn.execute(
         f"""
-        SELECT l.reviewed_at, l.lc_num,
+        SELECT l.id, l.reviewed_at, l.lc_num,
                COALESCE(p.title, '') AS title,
                l.grade, l.next_due_at, l.note
         FROM review_logs l
@@ -30,9 +53,18 @@ def fetch_history(db_path: Path, n: int = 20, include_seed: bool = False) -> Lis
         ORDER BY l.reviewed_at DESC, l.id DESC
         LIMIT ?;
         """,
-        (n,),
-    ).fetchall()
+        (*params, n),
+    )
 
+def fetch_history(db_path: Path, n: int = 20, include_seed: bool = False,
+                  before: Optional[str] = None) -> List[HistoryItem]:
+    """
+    Newest-first page of at most n logs. `before` is the cursor of the last item
+    of the previous page; paging is a keyset seek on idx_logs_time (reviewed_at, id),
+    so deep pages cost the same as the first one.
+    """
+    conn = connect(db_path)
+    rows = _page(conn, n, include_seed, before).fetchall()
     conn.close()
     return [
         HistoryItem(
@@ -42,7 +74,63 @@ def fetch_history(db_path: Path, n: int = 20, include_seed: bool = False) -> Lis
             grade=str(r["grade"]),
             next_due_at=(int(r["next_due_at"]) if r["next_due_at"] is not None else None),
             note=(str(r["note"]) if r["note"] is not None else None),
+            log_id=int(r["id"]),
         )
         for r in rows
     ]
 
+def iter_history(db_path: Path, n: int = 20, include_seed: bool = False,
+                 before: Optional[str] = None) -> Iterator[tuple]:
+    """Same page as fetch_history, streamed as HISTORY_COLUMNS tuples (no list, no HistoryItem per row)."""
+    conn = connect(db_path)
+    try:
+        yield from map(tuple, _page(conn, n, include_seed, before))
+    finally:
+        conn.close()
+
+EXPORT_FORMATS = ("jsonl", "csv")
+
+# review_logs joined with problems, oldest first (offline analysis)
+EXPORT_COLUMNS = (
+    "id", "reviewed_at", "lc_num", "title", "phase", "grade",
+    "prev_due_at", "next_due_at", "prev_intvl", "next_intvl", "prev_ease", "next_ease", "note",
+)
+
+def iter_export(db_path: Path, include_seed: bool = False) -> Iterator[tuple]:
+    """Stream every log as a tuple in EXPORT_COLUMNS order; constant memory."""
+    conn = connect(db_path)
+    try:
+        where = "" if include_seed else "WHERE l.grade != 'seed'"
+        # a plain cursor steps through the index; nothing is materialized
+        yield from map(tuple, conn.execute(
+            f"""
+            SELECT l.id, l.reviewed_at, l.lc_num, p.title, ph.name, l.grade,
+                   l.prev_due_at, l.next_due_at, l.prev_intvl, l.next_intvl, l.prev_ease, l.next_ease, l.note
+            FROM review_logs l
+            LEFT JOIN problems p ON p.lc_num = l.lc_num
+            LEFT JOIN phases ph ON ph.id = p.phase_id
+            {where}
+            ORDER BY l.reviewed_at, l.id;
+            """
+        ))
+    finally:
+        conn.close()
+
+def export_history(db_path: Path, out: IO[str], fmt: str = "jsonl", include_seed: bool = False) -> int:
+    """Write all logs to out as jsonl or csv (with header). Returns the row count."""
+    rows = iter_export(db_path, include_seed=include_seed)
+    n = 0
+    if fmt == "csv":
+        w = csv.writer(out)
+        w.writerow(EXPORT_COLUMNS)
+        for row in rows:
+            w.writerow(row)
+            n += 1
+    elif fmt == "jsonl":
+        encode = json.JSONEncoder(ensure_ascii=False).encode  # json.dumps(**kw) builds one per call
+        for row in rows:
+            out.write(encode(dict(zip(EXPORT_COLUMNS, row))) + "\n")
+            n += 1
+    else:
+        raise ValueError(f"unknown export format {fmt!r} ({'|'.join(EXPORT_FORMATS)})")
+    return n
@@ -1,41 +1,154 @@
 from __future__ import annotations
 
+import hashlib
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Tuple
+from typing import Dict, List, Tuple
 
-from .db import connect, tx
+from .config import load_config
+from .db import connect, tx, set_meta
+from .phases import ensure_phase, phase_ids, prune_phases
 from .plan_parser import parse_plan_file
 
-UPSERT_SQL = """
-INSERT INTO problems(lc_num, title, phase, plan_order, is_optional)
-VALUES(?,?,?,?,?)
-ON CONFLICT(lc_num) DO UPDATE SET
-  title=excluded.title,
-  phase=excluded.phase,
-  plan_order=excluded.plan_order,
-  is_optional=excluded.is_optional;
+PLAN_HASH_KEY = "plan_hash"
+
+INSERT_SQL = """
+INSERT INTO problems(lc_num, title, phase_id, plan_order, is_optional)
+VALUES(?,?,?,?,?);
+"""
+
+UPDATE_SQL = """
+UPDATE problems SET title=?, phase_id=?, plan_order=?, is_optional=?, parked=0 WHERE lc_num=?;
 """
 
-def import_plan(db_path: Path, plan_path: Path) -> Tuple[int, int]:
-    items = parse_plan_file(plan_path)
+PARK_SQL = """
+UPDATE problems SET plan_order=?, parked=1 WHERE lc_num=?;
+"""
+
+_BATCH = 1000
+
+
+@dataclass(frozen=True)
+class ImportResult:
+    total: int          # problems in the plan
+    last_order: int
+    added: int = 0      # new to the db, or back in the plan after being parked
+    removed: int = 0    # parked by this import
+    retitled: int = 0   # title/phase/optional changed
+    reordered: int = 0
+    unchanged: bool = False  # plan hash matched, nothing written
+
+
+def plan_hash(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _clamp_cursor(conn) -> None:
+    # 如果 cursor 还在 1，但 plan_order 不是从 1 开始（极少），可以修正；
+    # 或者 cursor 超过最大 plan_order，则夹回范围内
+    max_order = conn.execute("SELECT MAX(plan_order) AS m FROM problems WHERE parked = 0;").fetchone()["m"] or 1
+    cur = load_config(conn).raw.get("cursor_plan_order")
+    if cur is None:
+        set_meta(conn, "cursor_plan_order", "1")
+    else:
+        cur_val = int(cur)
+        if cur_val < 1:
+            set_meta(conn, "cursor_plan_order", "1")
+        elif cur_val > max_order + 1:
+            set_meta(conn, "cursor_plan_order", str(max_order + 1))
+
+
+def import_plan(db_path: Path, plan_path: Path, force: bool = False) -> ImportResult:
+    """
+    Import plan.txt incrementally.
+    - If the file hash equals meta.plan_hash, return without parsing (unless force).
+    - Otherwise diff the streamed plan against problems and write only changed rows.
+    Problems dropped from the plan are never deleted (their notes, logs and reviews
+    stay); they are parked (problems.parked=1) after the end of the plan, in their
+    old order, which keeps them out of NEW, the cursor and the problem count. A
+    parked problem that comes back in plan.txt is unparked.
+    Changed rows are first moved to negative plan_order and flipped back at the
+    end, so reorders never trip the UNIQUE(plan_order) constraint.
+    """
+    digest = plan_hash(plan_path)
 
     conn = connect(db_path)
     with tx(conn):
-        for it in items:
-            conn.execute(UPSERT_SQL, (it.lc_num, it.title, it.phase, it.plan_order, it.is_optional))
-
-        # 如果 cursor 还在 1，但 plan_order 不是从 1 开始（极少），可以修正；
-        # 或者 cursor 超过最大 plan_order，则夹回范围内
-        max_order = conn.execute("SELECT MAX(plan_order) AS m FROM problems;").fetchone()["m"] or 1
-        cur = conn.execute("SELECT value FROM meta WHERE key='cursor_plan_order';").fetchone()
-        if cur is None:
-            conn.execute("INSERT INTO meta(key,value) VALUES('cursor_plan_order','1');")
+        if not force and load_config(conn).raw.get(PLAN_HASH_KEY) == digest:
+            row = conn.execute("SELECT COUNT(*) AS c, MAX(plan_order) AS m FROM problems WHERE parked = 0;").fetchone()
+            result = ImportResult(total=int(row["c"]), last_order=int(row["m"] or 0), unchanged=True)
         else:
-            cur_val = int(cur["value"])
-            if cur_val < 1:
-                conn.execute("UPDATE meta SET value='1' WHERE key='cursor_plan_order';")
-            elif cur_val > max_order + 1:
-                conn.execute("UPDATE meta SET value=? WHERE key='cursor_plan_order';", (str(max_order + 1),))
+            result = _apply_diff(conn, plan_path)
+            _clamp_cursor(conn)
+            set_meta(conn, PLAN_HASH_KEY, digest)
 
     conn.close()
-    return (len(items), items[-1].plan_order if items else 0)
+    return result
+
+
+def _apply_diff(conn, plan_path: Path) -> ImportResult:
+    current: Dict[int, Tuple[str, int, int, int, int]] = {
+        int(r["lc_num"]): (r["title"], int(r["phase_id"]), int(r["plan_order"]), int(r["is_optional"]), int(r["parked"]))
+        for r in conn.execute("SELECT lc_num, title, phase_id, plan_order, is_optional, parked FROM problems;")
+    }
+    phases = phase_ids(conn)
+
+    inserts: List[tuple] = []
+    updates: List[tuple] = []
+    added = retitled = reordered = 0
+    total = 0
+    last_order = 0
+
+    def flush() -> None:
+        if inserts:
+            conn.executemany(INSERT_SQL, inserts)
+            inserts.clear()
+        if updates:
+            conn.executemany(UPDATE_SQL, updates)
+            updates.clear()
+
+    for it in parse_plan_file(plan_path):
+        total += 1
+        last_order = it.plan_order
+        old = current.pop(it.lc_num, None)
+        phase_id = ensure_phase(conn, it.phase, phases)
+        if old is None:
+            added += 1
+            inserts.append((it.lc_num, it.title, phase_id, -it.plan_order, it.is_optional))
+        elif old[4]:
+            added += 1  # back from the parking area
+            updates.append((it.title, phase_id, -it.plan_order, it.is_optional, it.lc_num))
+        else:
+            moved = old[2] != it.plan_order
+            relabeled = (old[0], old[1], old[3]) != (it.title, phase_id, it.is_optional)
+            if not (moved or relabeled):
+                continue
+            reordered += moved
+            retitled += relabeled
+            po = -it.plan_order if moved else it.plan_order
+            updates.append((it.title, phase_id, po, it.is_optional, it.lc_num))
+        if len(inserts) + len(updates) >= _BATCH:
+            flush()
+    flush()
+
+    # whatever is left in `current` is no longer in the plan; already parked rows
+    # sort after the newly dropped ones, as they were beyond the old plan end
+    left = sorted(current.items(), key=lambda kv: kv[1][2])
+    conn.executemany(PARK_SQL, ((-(last_order + k), n) for k, (n, _) in enumerate(left, 1)))
+    removed = sum(1 for _, old in left if not old[4])
+
+    conn.execute("UPDATE problems SET plan_order = -plan_order WHERE plan_order < 0;")
+    prune_phases(conn)
+
+    return ImportResult(
+        total=total,
+        last_order=last_order,
+        added=added,
+        removed=removed,
+        retitled=retitled,
+        reordered=reordered,
+    )
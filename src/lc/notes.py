@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import sqlite3
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional
+
+from .db import NOTES_FTS_REBUILD_SQL, connect, tx
+from .phases import resolve_phase
+
+# Notes: problems.note (`lc note`) and review_logs.note (`lc done --note`).
+# Both are mirrored into the FTS5 table notes_fts by triggers (db.SCHEMA_SQL),
+# so `lc search` is an index lookup ranked by bm25 instead of a LIKE scan.
+
+SNIPPET_TOKENS = 12
+
+
+@dataclass(frozen=True)
+class SearchHit:
+    kind: str                   # 'problem' | 'log'
+    lc_num: int
+    title: str
+    phase: str
+    grade: Optional[str]        # log hits only
+    reviewed_at: Optional[int]  # log hits only
+    snippet: str
+    score: float                # bm25; lower is better
+
+
+@dataclass(frozen=True)
+class NotesIndexReport:
+    missing: int    # notes not in notes_fts
+    stale: int      # notes_fts rows whose note is gone or changed
+
+
+def set_note(db_path: Path, lc_num: int, text: str) -> None:
+    conn = connect(db_path)
+    with tx(conn):
+        cur = conn.execute("UPDATE problems SET note=? WHERE lc_num=?;", (text or None, lc_num))
+        if cur.rowcount == 0:
+            raise ValueError(f"lc_num {lc_num} not found in problems (did you import plan.txt?)")
+    conn.close()
+
+
+def get_note(db_path: Path, lc_num: int) -> Optional[str]:
+    conn = connect(db_path)
+    try:
+        row = conn.execute("SELECT note FROM problems WHERE lc_num=?;", (lc_num,)).fetchone()
+        if row is None:
+            raise ValueError(f"lc_num {lc_num} not found in problems (did you import plan.txt?)")
+        return row["note"]
+    finally:
+        conn.close()
+
+
+def _quote(query: str) -> str:
+    # every whitespace-separated term as a phrase: "two-sum" must not parse as column filter / NOT
+    return " ".join('"' + t.replace('"', '""') + '"' for t in query.split())
+
+
+def _run(conn: sqlite3.Connection, sql: str, query: str, params: tuple) -> List[sqlite3.Row]:
+    try:
+        return conn.execute(sql, (query, *params)).fetchall()
+    except sqlite3.OperationalError:
+        try:
+            return conn.execute(sql, (_quote(query), *params)).fetchall()
+        except sqlite3.OperationalError as e:
+            raise ValueError(f"bad search query {query!r}: {e}") from None
+
+
+def search_notes(
+    db_path: Path,
+    query: str,
+    limit: int = 20,
+    phase: Optional[str] = None,
+    grade: Optional[str] = None,
+) -> List[SearchHit]:
+    """
+    Best bm25 matches first. query is FTS5 syntax (AND/OR/NOT, "phrases", prefix*);
+    if it does not parse, its terms are searched as plain words instead.
+    phase is resolved by phases.resolve_phase; grade keeps only log notes.
+    """
+    if not query.strip():
+        raise ValueError("empty search query")
+    joins, conds, params = [], ["notes_fts MATCH ?"], []
+    if grade is not None:
+        joins.append("JOIN review_logs l ON l.id = f.rowid AND f.kind = 'log'")
+        conds.append("l.grade = ?")
+        params.append(grade.lower().strip())
+
+    conn = connect(db_path)
+    try:
+        if phase is not None:
+            joins.append("JOIN problems p ON p.lc_num = f.lc_num")
+            conds.append("p.phase_id = ?")
+            params.append(resolve_phase(conn, phase))
+        # 1) top hits by rank only: snippets and joins for every match would cost more than the ranking
+        top = _run(conn, f"""
+            SELECT f.rowid AS rid, f.rank AS score FROM notes_fts f {' '.join(joins)}
+            WHERE {' AND '.join(conds)}
+            ORDER BY f.rank LIMIT ?;
+            """, query, (*params, limit))
+        if not top:
+            return []
+        ids = [int(t["rid"]) for t in top]
+        # 2) details + snippet for just those; no rank here, bm25 would redo the corpus statistics
+        rows = _run(conn, f"""
+            SELECT f.rowid AS rid, f.kind, f.lc_num, COALESCE(p.title, '') AS title, COALESCE(ph.name, '') AS phase,
+                   l.grade, l.reviewed_at,
+                   snippet(notes_fts, 0, '[', ']', '...', {SNIPPET_TOKENS}) AS snip
+            FROM notes_fts f
+            LEFT JOIN problems p ON p.lc_num = f.lc_num
+            LEFT JOIN phases ph ON ph.id = p.phase_id
+            LEFT JOIN review_logs l ON f.kind = 'log' AND l.id = f.rowid
+            WHERE notes_fts MATCH ? AND f.rowid IN ({','.join('?' * len(ids))});
+            """, query, tuple(ids))
+    finally:
+        conn.close()
+    by_id = {int(r["rid"]): r for r in rows}
+    hits: List[SearchHit] = []
+    for t in top:
+        r = by_id.get(int(t["rid"]))
+        if r is None:   # note changed between the two queries
+            continue
+        hits.append(SearchHit(
+            kind=str(r["kind"]),
+            lc_num=int(r["lc_num"]),
+            title=str(r["title"]),
+            phase=str(r["phase"]),
+            grade=r["grade"],
+            reviewed_at=(int(r["reviewed_at"]) if r["reviewed_at"] is not None else None),
+            snippet=str(r["snip"]),
+            score=float(t["score"]),
+        ))
+    return hits
+
+
+_NOTE_SOURCES = """
+    SELECT id AS rid, note AS body FROM review_logs WHERE COALESCE(note, '') != ''
+    UNION ALL
+    SELECT -lc_num, note FROM problems WHERE COALESCE(note, '') != ''
+"""
+
+
+def check_notes_index(conn: sqlite3.Connection) -> NotesIndexReport:
+    missing = conn.execute(
+        f"SELECT COUNT(*) AS c FROM (SELECT * FROM ({_NOTE_SOURCES}) EXCEPT SELECT rowid, body FROM notes_fts);"
+    ).fetchone()["c"]
+    stale = conn.execute(
+        f"SELECT COUNT(*) AS c FROM (SELECT rowid, body FROM notes_fts EXCEPT SELECT * FROM ({_NOTE_SOURCES}));"
+    ).fetchone()["c"]
+    return NotesIndexReport(missing=int(missing), stale=int(stale))
+
+
+def verify(db_path: Path, repair: bool = False) -> NotesIndexReport:
+    """Compare notes_fts against the note columns; optionally rebuild it."""
+    conn = connect(db_path)
+    try:
+        report = check_notes_index(conn)
+        if repair and (report.missing or report.stale):
+            with tx(conn):
+                for sql in NOTES_FTS_REBUILD_SQL:
+                    conn.execute(sql)
+        return report
+    finally:
+        conn.close()
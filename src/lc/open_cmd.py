@@ -1,14 +1,21 @@
 from __future__ import annotations
 
-import os
 import shutil
 import subprocess
+from functools import lru_cache
 from pathlib import Path
+from typing import Optional, Tuple
 from urllib.parse import quote
 
-from .db import connect, get_meta
+from . import clock
+from .config import load_config
+from .db import connect
+from .frontier import interleaved, new_rows, window_len
+from .slugs import slug_for
+from .srs import SECONDS_PER_DAY
 
 
+@lru_cache(maxsize=None)
 def _is_wsl() -> bool:
     try:
         with open("/proc/version", "r", encoding="utf-8") as f:
@@ -17,40 +24,48 @@ def _is_wsl() -> bool:
         return False
 
 
-def _open_url(url: str) -> None:
+@lru_cache(maxsize=None)
+def _launcher() -> Optional[Tuple[str, ...]]:
+    """argv prefix that opens a URL in the browser, or None (looked up once per process)."""
     # 1) WSL: prefer wslview, else Windows start
     if _is_wsl():
         if shutil.which("wslview"):
-            subprocess.run(["wslview", url], check=False)
-            return
+            return ("wslview",)
         if shutil.which("cmd.exe"):
             # cmd.exe /c start "" "<url>"
-            subprocess.run(["cmd.exe", "/c", "start", "", url], check=False)
-            return
+            return ("cmd.exe", "/c", "start", "")
 
     # 2) Linux desktop: xdg-open
     if shutil.which("xdg-open"):
-        subprocess.run(["xdg-open", url], check=False)
-        return
+        return ("xdg-open",)
+    return None
+
 
-    # 3) last resort: print only
-    print(url)
+def _open_url(url: str) -> None:
+    argv = _launcher()
+    if argv is None:
+        # 3) last resort: print only
+        print(url)
+        return
+    # fire and forget: don't wait for xdg-open/wslview to hand the URL to the browser
+    subprocess.Popen(
+        [*argv, url],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
 
 
 def _current_new_lc_num(conn) -> int:
-    cursor_po = int(get_meta(conn, "cursor_plan_order", "1") or "1")
-    row = conn.execute(
-        """
-        SELECT p.lc_num
-        FROM problems p
-        LEFT JOIN reviews r ON r.lc_num=p.lc_num
-        WHERE p.plan_order >= ?
-          AND r.lc_num IS NULL
-        ORDER BY p.plan_order ASC
-        LIMIT 1;
-        """,
-        (cursor_po,),
-    ).fetchone()
+    # first NEW item of `lc show`, interleaving included
+    cfg = load_config(conn)
+    quota = max(1, cfg.new_quota)
+    window = window_len(quota, cfg.window_size, cfg.interleave_ratio)
+    rows = interleaved(
+        new_rows(conn, cfg.cursor_plan_order, window), quota, cfg.interleave_ratio, clock.now() // SECONDS_PER_DAY
+    )
+    row = rows[0] if rows else None
     if not row:
         raise RuntimeError("No NEW problem found (did you import plan.txt?)")
     return int(row["lc_num"])
@@ -59,10 +74,14 @@ def _current_new_lc_num(conn) -> int:
 def open_problem(db_path: Path, lc_num: int | None = None) -> str:
     conn = connect(db_path)
     try:
-        base = get_meta(conn, "leetcode_base_url", "https://leetcode.com") or "https://leetcode.com"
+        base = load_config(conn).leetcode_base_url
         n = lc_num if lc_num is not None else _current_new_lc_num(conn)
-        # LeetCode 没有稳定的 “按题号直达 slug” 的 URL，所以用搜索页最稳
-        url = f"{base.rstrip('/')}/problemset/?search={quote(str(n))}"
+        slug = slug_for(conn, n)
+        if slug:
+            url = f"{base.rstrip('/')}/problems/{slug}/"
+        else:
+            # LeetCode 没有 “按题号直达” 的 URL：没有 slug（lc slugs import/derive）时退回搜索页
+            url = f"{base.rstrip('/')}/problemset/?search={quote(str(n))}"
         _open_url(url)
         return url
     finally:
@@ -0,0 +1,305 @@
+from __future__ import annotations
+
+import itertools
+import sqlite3
+import time
+from dataclasses import astuple, dataclass, fields
+from pathlib import Path
+from typing import Optional
+
+from .config import load_params, save_params
+from .db import connect, tx
+from .srs import EASE_MAX, EASE_MIN, SECONDS_PER_DAY, SrsParams
+
+# `lc optimize`: fit srs.SrsParams to this db's review_logs.
+#
+# The scheduler is read as a memory model: an interval of I days is meant to hit
+# TARGET_RETENTION, so a card reviewed t days after its previous review is
+# recalled with p = R ** (t / I), where I is the interval the parameterised
+# scheduler would have given the card after its (actual) previous grades. An
+# `again` is a lapse, any other grade a recall; the fit minimises the mean log
+# loss of p over every review that has a previous one.
+#
+# Cards are replayed side by side: step k advances the k-th review of every card
+# at once (cards sorted by history length, so the cards still running at step k
+# are a prefix of the state arrays). The forward pass keeps each step's inputs
+# and branch taken; the gradient of the loss is then accumulated in reverse mode,
+# walking the steps backwards with the adjoints of (ease, interval) per card.
+# Python loops over steps (the longest card history), never over logs. Adam on
+# the parameters scaled to BOUNDS.
+
+TARGET_RETENTION = 0.9
+
+# same start as replay._seed_state for cards bootstrapped by mark-done-before
+SEED_INTERVAL = 1.0
+SEED_EASE = 2.50
+
+BOUNDS = {
+    "ease_start": (EASE_MIN, EASE_MAX),
+    "ease_again": (0.0, 0.5),
+    "ease_hard": (0.0, 0.5),
+    "ease_easy": (0.0, 0.5),
+    "hard_mult": (1.0, 2.0),
+    "easy_bonus": (1.0, 2.5),
+    "interval_again": (0.5, 3.0),
+    "interval_hard": (1.0, 10.0),
+    "interval_good": (1.0, 20.0),
+    "interval_easy": (1.0, 30.0),
+}
+FIELDS = tuple(f.name for f in fields(SrsParams))
+(ES, EA, EH, EE, HM, EB, IA, IH, IG, IE) = range(len(FIELDS))
+
+MIN_PREDICTIONS = 100  # fewer repeat reviews than this: not enough history to fit 10 params
+MAX_INTERVAL = 36500.0  # days; keeps long easy streaks finite during the fit
+_EPS = 1e-9
+_FLOOR, _GROWN, _CAPPED = 0, 1, 2
+
+
+def _np():
+    try:
+        import numpy as np
+    except ImportError as e:  # pragma: no cover - depends on environment
+        raise RuntimeError("optimize needs numpy: pip install 'lcsrs[optimize]'") from e
+    return np
+
+
+@dataclass(frozen=True)
+class FitResult:
+    before: SrsParams
+    params: SrsParams
+    loss_before: float      # mean log loss per predicted review
+    loss_after: float
+    logs: int               # graded logs used
+    predictions: int        # reviews that had a previous review (the loss terms)
+    iters: int
+    load_ms: float
+    fit_ms: float
+
+
+@dataclass
+class _Logs:
+    grades: "object"        # int8, step-major: all k=0 reviews (by card rank), then k=1, ...
+    elapsed: "object"       # float days since the card's previous review (unused at k=0)
+    offsets: "object"       # step k is [offsets[k], offsets[k+1])
+    seeded: "object"        # bool per card rank: history starts from a seed log
+    predictions: int
+
+
+def _load_logs(np, conn: sqlite3.Connection) -> _Logs:
+    # idx_logs_time hands rows back in replay order; the per-card grouping is a stable numpy sort.
+    # Plain tuples straight into one flat array: sqlite3.Row objects cost more than the query.
+    total = int(conn.execute("SELECT COUNT(*) AS c FROM review_logs;").fetchone()["c"])
+    cur = conn.cursor()
+    cur.row_factory = None
+    cur.execute(
+        """
+        SELECT lc_num, reviewed_at,
+               CASE grade WHEN 'again' THEN 0 WHEN 'hard' THEN 1 WHEN 'good' THEN 2 WHEN 'easy' THEN 3 ELSE -1 END
+        FROM review_logs
+        ORDER BY reviewed_at, id;
+        """
+    )
+    data = np.fromiter(itertools.chain.from_iterable(cur), dtype=np.int64, count=3 * total).reshape(-1, 3)
+    data = data[np.argsort(data[:, 0], kind="stable")]
+    card, ts, grade = data[:, 0], data[:, 1], data[:, 2]
+
+    # a seed only matters as a card's first log (replay.replay_step ignores later ones)
+    first = np.r_[True, card[1:] != card[:-1]] if card.size else np.zeros(0, dtype=bool)
+    seeded_ids = card[first & (grade < 0)]
+    keep = grade >= 0
+    card, ts, grade = card[keep], ts[keep], grade[keep]
+
+    n = card.size
+    starts = np.flatnonzero(np.r_[True, card[1:] != card[:-1]]) if n else np.zeros(0, dtype=np.int64)
+    lengths = np.diff(np.r_[starts, n])
+    seeded = np.isin(card[starts], seeded_ids)
+    elapsed = np.zeros(n)
+    if n:
+        elapsed[1:] = np.maximum(ts[1:] - ts[:-1], 60) / SECONDS_PER_DAY  # at least a minute
+
+    order = np.argsort(-lengths, kind="stable")
+    rank = np.empty(order.size, dtype=np.int64)
+    rank[order] = np.arange(order.size)
+    k = np.arange(n) - np.repeat(starts, lengths)
+    flat = np.lexsort((np.repeat(rank, lengths), k))
+    counts = np.bincount(k) if n else np.zeros(0, dtype=np.int64)
+    return _Logs(
+        grades=grade[flat].astype(np.int8),
+        elapsed=elapsed[flat],
+        offsets=np.r_[0, np.cumsum(counts)],
+        seeded=seeded[order],
+        predictions=int(n - starts.size),
+    )
+
+
+def _loss_grad(np, th, logs: _Logs, ln_r: float):
+    """Total log loss and its gradient w.r.t. th (params in FIELDS order)."""
+    n_cards = logs.seeded.size
+    n = logs.grades.size
+    steps = logs.offsets.size - 1
+    P = th.size
+    ease = np.full(n_cards, SEED_EASE)
+    ivl = np.full(n_cards, SEED_INTERVAL)
+    # per review (step-major like logs.grades): state before it, and what the backward pass needs
+    e_in = np.empty(n)
+    i_in = np.empty(n)
+    ne_all = np.empty(n)
+    dl_di = np.zeros(n)
+    branch = np.empty(n, dtype=np.int8)   # new interval came from: _FLOOR | _GROWN | _CAPPED
+    passes = np.empty(n, dtype=bool)      # d(ease) flows through the clamp
+    loss = 0.0
+    # per-grade lookups (index = grade code)
+    delta = np.array([-th[EA], -th[EH], 0.0, th[EE]])
+    fidx = np.array([IA, IH, IG, IE])
+    floors = th[fidx]
+    hard_mult = np.array([0.0, th[HM], 0.0, 0.0])
+
+    def grow(g, good, easy, e, ne):
+        # interval multiplier: hard * HM, good * ease before, easy * ease after * EB, again 0
+        return np.where(good, e, np.where(easy, ne * th[EB], hard_mult[g]))
+
+    for k in range(steps):
+        lo, hi = logs.offsets[k], logs.offsets[k + 1]
+        m = hi - lo
+        g = logs.grades[lo:hi]
+        e, i = ease[:m], ivl[:m]
+        if k == 0:
+            e[~logs.seeded[:m]] = th[ES]
+        else:
+            a = logs.elapsed[lo:hi] * ln_r
+            p = np.clip(np.exp(a / i), _EPS, 1 - _EPS)
+            y = g != 0
+            loss -= np.log(np.where(y, p, 1 - p)).sum()
+            dl_di[lo:hi] = np.where(y, -1 / p, 1 / (1 - p)) * p * (-a / (i * i))
+        e_in[lo:hi] = e
+        i_in[lo:hi] = i
+
+        good, easy = g == 2, g == 3
+        raw = e + delta[g]
+        ne = np.clip(raw, EASE_MIN, EASE_MAX)
+        passes[lo:hi] = good | ((raw > EASE_MIN) & (raw < EASE_MAX))
+        ne_all[lo:hi] = ne
+
+        # interval: max(floor, grown); again resets; the first review from NEW takes the floor
+        x = i * grow(g, good, easy, e, ne)
+        if k == 0:
+            x[~logs.seeded[:m]] = 0.0
+        floor = floors[g]
+        branch[lo:hi] = np.where(x <= floor, _FLOOR, np.where(x < MAX_INTERVAL, _GROWN, _CAPPED))
+        ease[:m] = ne
+        ivl[:m] = np.where(x <= floor, floor, np.minimum(x, MAX_INTERVAL))
+
+    # backward: adjoints of the state after step k, by card rank
+    grad = np.zeros(P)
+    a_e = np.zeros(n_cards)
+    a_i = np.zeros(n_cards)
+    for k in range(steps - 1, -1, -1):
+        lo, hi = logs.offsets[k], logs.offsets[k + 1]
+        m = hi - lo
+        g = logs.grades[lo:hi]
+        again, hard, good, easy = g == 0, g == 1, g == 2, g == 3
+        e, i, ne = e_in[lo:hi], i_in[lo:hi], ne_all[lo:hi]
+        a_ni, a_ne = a_i[:m], a_e[:m]
+
+        br = branch[lo:hi]
+        fl = br == _FLOOR
+        grad += np.bincount(fidx[g[fl]], weights=a_ni[fl], minlength=P)
+        ax = np.where(br == _GROWN, a_ni, 0.0)
+        grad[HM] += np.dot(ax * i, hard)
+        grad[EB] += np.dot(ax * i * ne, easy)
+        ai = ax * grow(g, good, easy, e, ne)
+        ane = a_ne + np.where(easy, ax * i * th[EB], 0.0)
+        araw = np.where(passes[lo:hi], ane, 0.0)
+        grad[EA] -= np.dot(araw, again)
+        grad[EH] -= np.dot(araw, hard)
+        grad[EE] += np.dot(araw, easy)
+        ae = araw + np.where(good, ax * i, 0.0)
+        ai += dl_di[lo:hi]
+        if k == 0:
+            grad[ES] += ae[~logs.seeded[:m]].sum()
+        a_e[:m] = ae
+        a_i[:m] = ai
+
+    return loss, grad
+
+
+def fit_params(db_path: Path, retention: float = TARGET_RETENTION, iters: int = 50,
+               start: Optional[SrsParams] = None, tol: float = 1e-5) -> FitResult:
+    """
+    Fit SrsParams to review_logs (starting from start, default: the stored params).
+    Does not store the result; see save_params.
+    """
+    np = _np()
+    if not 0.0 < retention < 1.0:
+        raise ValueError("retention must be between 0 and 1")
+
+    t0 = time.perf_counter()
+    conn = connect(db_path)
+    try:
+        before = start if start is not None else load_params(conn)
+        logs = _load_logs(np, conn)
+    finally:
+        conn.close()
+    load_ms = (time.perf_counter() - t0) * 1000
+
+    t0 = time.perf_counter()
+    ln_r = float(np.log(retention))
+    lo = np.array([BOUNDS[f][0] for f in FIELDS])
+    span = np.array([BOUNDS[f][1] for f in FIELDS]) - lo
+    th0 = np.clip(np.array(astuple(before), dtype=np.float64), lo, lo + span)
+    n_pred = max(1, logs.predictions)
+
+    loss0, _ = _loss_grad(np, th0, logs, ln_r)
+    best_th, best_loss = th0, loss0
+    it = 0
+    if logs.predictions:
+        # Adam on u = (th - lo) / span in [0, 1]
+        u = (th0 - lo) / span
+        m1 = np.zeros_like(u)
+        m2 = np.zeros_like(u)
+        lr, b1, b2 = 0.05, 0.9, 0.999
+        prev = loss0
+        for it in range(1, iters + 1):
+            th = lo + u * span
+            loss, g = _loss_grad(np, th, logs, ln_r)
+            if loss < best_loss:
+                best_th, best_loss = th, loss
+            g = g * span / n_pred
+            m1 = b1 * m1 + (1 - b1) * g
+            m2 = b2 * m2 + (1 - b2) * g * g
+            u = np.clip(u - lr * (m1 / (1 - b1 ** it)) / (np.sqrt(m2 / (1 - b2 ** it)) + 1e-8), 0.0, 1.0)
+            if it > 10 and abs(prev - loss) / n_pred < tol:
+                break
+            prev = loss
+
+    params = SrsParams(*(round(float(v), 4) for v in best_th))
+    return FitResult(
+        before=before,
+        params=params,
+        loss_before=float(loss0) / n_pred,
+        loss_after=float(best_loss) / n_pred,
+        logs=int(logs.grades.size),
+        predictions=logs.predictions,
+        iters=it,
+        load_ms=load_ms,
+        fit_ms=(time.perf_counter() - t0) * 1000,
+    )
+
+
+def optimize(db_path: Path, retention: float = TARGET_RETENTION, iters: int = 50, dry_run: bool = False) -> FitResult:
+    """fit_params + store the result in meta.srs_params (unless dry_run or too little history)."""
+    res = fit_params(db_path, retention=retention, iters=iters)
+    if not dry_run and res.predictions >= MIN_PREDICTIONS:
+        conn = connect(db_path)
+        with tx(conn):
+            save_params(conn, res.params)
+        conn.close()
+    return res
+
+
+def reset_params(db_path: Path) -> None:
+    conn = connect(db_path)
+    with tx(conn):
+        save_params(conn, None)
+    conn.close()
+
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import json
+from typing import IO, Any, Iterable, List, Sequence
+
+# `--format tsv|jsonl` for history/show/stats: one line per row, written while
+# the rows are still being fetched, for grep/awk/jq. No rich here.
+# tsv starts with a header line; tab, newline, CR and backslash inside a value
+# are escaped as \t \n \r \\, None is an empty field. jsonl is one object per line.
+
+FORMATS = ("tsv", "jsonl")
+
+# lines joined into one write(); a few hundred rows amortize the per-call cost
+FLUSH_ROWS = 512
+
+_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def _tsv_field(v: Any) -> str:
+    if v is None:
+        return ""
+    if type(v) is str:
+        # `in` tests are ~3x cheaper than translating every field; escapes are rare
+        return v.translate(_ESCAPES) if ("\t" in v or "\n" in v or "\\" in v or "\r" in v) else v
+    return str(v)
+
+
+class RowWriter:
+    """Buffered tsv/jsonl writer; call flush() (or close the with-block) to push rows out."""
+
+    def __init__(self, out: IO[str], fmt: str, columns: Sequence[str]):
+        if fmt not in FORMATS:
+            raise ValueError(f"--format must be one of: {', '.join(FORMATS)}")
+        self.out = out
+        self.columns = tuple(columns)
+        self.rows = 0
+        self._buf: List[str] = []
+        if fmt == "tsv":
+            self._line = lambda row: "\t".join(map(_tsv_field, row)) + "\n"
+            self._buf.append("\t".join(self.columns) + "\n")
+        else:
+            encode = json.JSONEncoder(ensure_ascii=False).encode
+            cols = self.columns
+            self._line = lambda row: encode(dict(zip(cols, row))) + "\n"
+
+    def write(self, row: Sequence[Any]) -> None:
+        self._buf.append(self._line(row))
+        self.rows += 1
+        if len(self._buf) >= FLUSH_ROWS:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._buf:
+            self.out.write("".join(self._buf))
+            self._buf.clear()
+        self.out.flush()
+
+    def __enter__(self) -> "RowWriter":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        if exc[0] is None:
+            self.flush()
+
+
+def write_rows(out: IO[str], fmt: str, columns: Sequence[str], rows: Iterable[Sequence[Any]]) -> int:
+    """Write every row as it comes out of the iterable. Returns the row count."""
+    with RowWriter(out, fmt, columns) as w:
+        for row in rows:
+            w.write(row)
+    return w.rows
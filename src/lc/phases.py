@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import sqlite3
+from typing import Dict, List
+
+# Phases ("Phase 3: Sliding Window" headers in plan.txt) live in their own table;
+# problems.phase_id points at them, and idx_problems_phase (phase_id, plan_order)
+# turns "the problems of one phase, in plan order" into a single index range.
+
+
+def phase_ids(conn: sqlite3.Connection) -> Dict[str, int]:
+    return {str(r["name"]): int(r["id"]) for r in conn.execute("SELECT id, name FROM phases;")}
+
+
+def ensure_phase(conn: sqlite3.Connection, name: str, ids: Dict[str, int]) -> int:
+    """id of phase `name`, inserting it if needed; ids is the caller's name -> id cache."""
+    pid = ids.get(name)
+    if pid is None:
+        pid = int(conn.execute("INSERT INTO phases(name) VALUES(?);", (name,)).lastrowid)
+        ids[name] = pid
+    return pid
+
+
+def prune_phases(conn: sqlite3.Connection) -> int:
+    """Drop phases no problem points at any more (after a re-import). Returns how many."""
+    return conn.execute(
+        "DELETE FROM phases WHERE NOT EXISTS (SELECT 1 FROM problems p WHERE p.phase_id = phases.id);"
+    ).rowcount
+
+
+def resolve_phase(conn: sqlite3.Connection, name: str) -> int:
+    """
+    Phase id for a user-typed name: an exact match wins (case-insensitive),
+    otherwise the name must be a substring of exactly one phase.
+    """
+    name = name.strip()
+    row = conn.execute("SELECT id FROM phases WHERE name = ?;", (name,)).fetchone()  # UNIQUE index
+    if row is None:
+        row = conn.execute("SELECT id FROM phases WHERE name = ? COLLATE NOCASE LIMIT 1;", (name,)).fetchone()
+    if row is not None:
+        return int(row["id"])
+    hits: List[sqlite3.Row] = conn.execute(
+        "SELECT id, name FROM phases WHERE instr(lower(name), lower(?)) > 0 ORDER BY id LIMIT 6;", (name,)
+    ).fetchall()
+    if len(hits) == 1:
+        return int(hits[0]["id"])
+    if not hits:
+        raise ValueError(f"no phase matches {name!r} (lc stats --by-phase lists them)")
+    shown = ", ".join(repr(r["name"]) for r in hits[:5]) + (", ..." if len(hits) > 5 else "")
+    raise ValueError(f"phase {name!r} is ambiguous: {shown}")
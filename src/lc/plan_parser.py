@@ -3,7 +3,7 @@ from __future__ import annotations
 import re
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable
+from typing import Iterable, Iterator
 
 PHASE_RE = re.compile(r"^\s*Phase\s*\d+\s*[:：]\s*(.+?)\s*$")
 PROBLEM_RE = re.compile(r"^\s*(?P<opt>【\+】)?\s*(?P<num>\d+)\s+(?P<title>.+?)\s*$")
@@ -16,10 +16,12 @@ class PlanItem:
     plan_order: int
     is_optional: int  # 0/1
 
-def parse_plan_lines(lines: Iterable[str]) -> list[PlanItem]:
+def parse_plan_lines(lines: Iterable[str]) -> Iterator[PlanItem]:
+    """Stream PlanItems; duplicate lc_nums are skipped and reported once the input is exhausted."""
     phase = "Uncategorized"
     order = 0
-    items: list[PlanItem] = []
+    seen: set[int] = set()
+    dup: set[int] = set()
 
     for raw in lines:
         line = raw.strip()
@@ -42,15 +44,17 @@ def parse_plan_lines(lines: Iterable[str]) -> list[PlanItem]:
         lc_num = int(m_prob.group("num"))
         title = m_prob.group("title").strip()
 
-        items.append(PlanItem(lc_num, title, phase, order, is_optional))
+        # 基本健壮性：lc_num 不能重复
+        if lc_num in seen:
+            dup.add(lc_num)
+            continue
+        seen.add(lc_num)
 
-    # 基本健壮性：lc_num 不能重复
-    seen = set()
-    dup = [x.lc_num for x in items if (x.lc_num in seen) or seen.add(x.lc_num)]
-    if dup:
-        raise ValueError(f"duplicate lc_num in plan: {sorted(set(dup))}")
+        yield PlanItem(lc_num, title, phase, order, is_optional)
 
-    return items
+    if dup:
+        raise ValueError(f"duplicate lc_num in plan: {sorted(dup)}")
 
-def parse_plan_file(path: Path) -> list[PlanItem]:
-    return parse_plan_lines(path.read_text(encoding="utf-8").splitlines())
+def parse_plan_file(path: Path) -> Iterator[PlanItem]:
+    with path.open("r", encoding="utf-8") as f:
+        yield from parse_plan_lines(f)
@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+import sqlite3
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from .config import load_config, load_params
+from .db import IN_CHUNK, connect, tx, set_meta
+from .done import UPSERT_REVIEW_SQL
+from .frontier import advance_cursor
+from .srs import DEFAULT_PARAMS, ReviewState, SrsParams, next_state, row_to_state
+
+CHECKPOINT_KEY = "replay_last_log_id"
+
+SEED_INTERVAL = 1.0
+SEED_EASE = 2.50
+
+# rebuild_reviews keeps at most this many card states in memory; beyond that they
+# are written to replay_state/reviews and read back from replay_state on the next log
+FLUSH_CARDS = 50_000
+
+SAVE_STATE_SQL = """
+INSERT INTO replay_state(lc_num, due_at, interval_days, ease, reps, lapses, easy_streak, last_grade, status, last_reviewed_at)
+VALUES(?,?,?,?,?,?,?,?,?,?)
+ON CONFLICT(lc_num) DO UPDATE SET
+  due_at=excluded.due_at,
+  interval_days=excluded.interval_days,
+  ease=excluded.ease,
+  reps=excluded.reps,
+  lapses=excluded.lapses,
+  easy_streak=excluded.easy_streak,
+  last_grade=excluded.last_grade,
+  status=excluded.status,
+  last_reviewed_at=excluded.last_reviewed_at;
+"""
+
+
+@dataclass(frozen=True)
+class RebuildResult:
+    full: bool
+    logs: int           # logs replayed
+    cards: int          # reviews rows rewritten
+    last_log_id: int
+
+
+def _seed_state(row) -> ReviewState:
+    # mirrors seed.mark_done_before: due immediately, default interval/ease
+    due = row["next_due_at"] if row["next_due_at"] is not None else int(row["reviewed_at"]) - 1
+    return ReviewState(
+        due_at=int(due),
+        interval_days=SEED_INTERVAL,
+        ease=SEED_EASE,
+        reps=0,
+        lapses=0,
+        easy_streak=0,
+        last_grade="seed",
+        status="active",
+    )
+
+
+def replay_step(prev: Optional[ReviewState], row, params: SrsParams = DEFAULT_PARAMS) -> Optional[ReviewState]:
+    """Apply one review_logs row to prev. Seed logs only create state for unseen cards."""
+    if row["grade"] == "seed":
+        return prev if prev is not None else _seed_state(row)
+    return next_state(prev, row["grade"], int(row["reviewed_at"]), params=params)
+
+
+def _iter_logs(conn: sqlite3.Connection, after_id: int, redo: bool) -> Iterator[sqlite3.Row]:
+    # a plain cursor streams rows; nothing is materialized
+    where = "l.id > ?"
+    if redo:
+        where += " OR l.lc_num IN (SELECT lc_num FROM temp.replay_redo)"
+    yield from conn.execute(
+        f"""
+        SELECT l.id, l.lc_num, l.reviewed_at, l.grade, l.next_due_at
+        FROM review_logs l
+        WHERE {where}
+        ORDER BY l.reviewed_at, l.id;
+        """,
+        (after_id,),
+    )
+
+
+def replay_cards(conn: sqlite3.Connection, lc_nums: Iterable[int], params: SrsParams = DEFAULT_PARAMS
+                 ) -> Dict[int, Tuple[ReviewState, int]]:
+    """
+    Replay every log of just these cards from scratch (idx_logs_card keeps this
+    O(their logs)). Returns lc_num -> (state, last reviewed_at); reviews is not written.
+    """
+    nums = sorted(set(lc_nums))
+    states: Dict[int, Tuple[Optional[ReviewState], int]] = {}
+    for i in range(0, len(nums), IN_CHUNK):
+        chunk = nums[i:i + IN_CHUNK]
+        rows = conn.execute(
+            f"""
+            SELECT id, lc_num, reviewed_at, grade, next_due_at
+            FROM review_logs
+            WHERE lc_num IN ({','.join('?' * len(chunk))})
+            ORDER BY lc_num, reviewed_at, id;
+            """,
+            chunk,
+        )
+        for row in rows:
+            n = int(row["lc_num"])
+            prev = states[n][0] if n in states else None
+            states[n] = (replay_step(prev, row, params), int(row["reviewed_at"]))
+    return {n: (s, ts) for n, (s, ts) in states.items() if s is not None}
+
+
+def _load_checkpoint_state(conn: sqlite3.Connection, lc_num: int) -> Optional[ReviewState]:
+    row = conn.execute(
+        """
+        SELECT due_at, interval_days, ease, reps, lapses, easy_streak, last_grade, status
+        FROM replay_state WHERE lc_num=?;
+        """,
+        (lc_num,),
+    ).fetchone()
+    return row_to_state(row) if row else None
+
+
+def _mark_out_of_order(conn: sqlite3.Connection, after_id: int) -> int:
+    """
+    Cards that received logs older than their checkpointed state (e.g. merged
+    from another device) cannot be continued incrementally; replay them from scratch.
+    """
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS replay_redo (lc_num INTEGER PRIMARY KEY);")
+    conn.execute("DELETE FROM temp.replay_redo;")
+    conn.execute(
+        """
+        INSERT INTO temp.replay_redo(lc_num)
+        SELECT l.lc_num
+        FROM review_logs l
+        JOIN replay_state s ON s.lc_num = l.lc_num
+        WHERE l.id > ?
+        GROUP BY l.lc_num
+        HAVING MIN(l.reviewed_at) < MAX(s.last_reviewed_at);
+        """,
+        (after_id,),
+    )
+    n = conn.execute("SELECT COUNT(*) AS c FROM temp.replay_redo;").fetchone()["c"]
+    conn.execute("DELETE FROM replay_state WHERE lc_num IN (SELECT lc_num FROM temp.replay_redo);")
+    return int(n)
+
+
+def _flush_states(conn: sqlite3.Connection, states: Dict[int, Tuple[Optional[ReviewState], int]]) -> None:
+    rows = [
+        (n, s.due_at, s.interval_days, s.ease, s.reps, s.lapses, s.easy_streak, s.last_grade, s.status, ts)
+        for n, (s, ts) in states.items()
+        if s is not None
+    ]
+    conn.executemany(SAVE_STATE_SQL, rows)
+    conn.executemany(UPSERT_REVIEW_SQL, rows)
+    # cards flushed more than once are counted once
+    conn.executemany("INSERT OR IGNORE INTO temp.replay_touched(lc_num) VALUES(?);", ((n,) for n in states))
+    states.clear()
+
+
+def rebuild_reviews(db_path: Path, full: bool = False, flush_cards: int = FLUSH_CARDS) -> RebuildResult:
+    """
+    Regenerate reviews by replaying review_logs through srs.next_state in
+    (reviewed_at, id) order. The replayed state is checkpointed in
+    replay_state + meta.replay_last_log_id, so later runs only replay new
+    logs. full=True discards the checkpoint (use after changing the scheduler
+    or its params, e.g. after `lc optimize`).
+    Memory is bounded: at most flush_cards states are held, the rest wait in
+    replay_state (uncommitted until the run finishes).
+    """
+    conn = connect(db_path)
+    with tx(conn):
+        after_id = int(load_config(conn).raw.get(CHECKPOINT_KEY) or "0")
+        if full or after_id == 0:
+            full = True
+            after_id = 0
+            conn.execute("DELETE FROM replay_state;")
+            redo = False
+        else:
+            redo = _mark_out_of_order(conn, after_id) > 0
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS replay_touched (lc_num INTEGER PRIMARY KEY);")
+        conn.execute("DELETE FROM temp.replay_touched;")
+
+        params = load_params(conn)
+        states: Dict[int, Tuple[Optional[ReviewState], int]] = {}
+        flushed = False
+        last_id = after_id
+        n_logs = 0
+        for row in _iter_logs(conn, after_id, redo):
+            n = int(row["lc_num"])
+            if n in states:
+                prev = states[n][0]
+            elif full and not flushed:
+                prev = None  # replay_state is empty
+            else:
+                # checkpoint, or a state flushed earlier in this run; redo cards start with no row
+                prev = _load_checkpoint_state(conn, n)
+            nxt = replay_step(prev, row, params)
+            states[n] = (nxt, int(row["reviewed_at"]))
+            last_id = max(last_id, int(row["id"]))
+            n_logs += 1
+            if len(states) >= flush_cards:
+                _flush_states(conn, states)
+                flushed = True
+
+        _flush_states(conn, states)
+        cards = conn.execute("SELECT COUNT(*) AS c FROM temp.replay_touched;").fetchone()["c"]
+        conn.execute("DELETE FROM temp.replay_touched;")
+        set_meta(conn, CHECKPOINT_KEY, str(last_id))
+        advance_cursor(conn)
+
+    conn.close()
+    return RebuildResult(full=full, logs=n_logs, cards=int(cards), last_log_id=last_id)
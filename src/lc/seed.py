@@ -1,14 +1,16 @@
 from __future__ import annotations
 
-import time
 from pathlib import Path
 
+from . import clock
 from .db import connect, tx, set_meta
 
 def _plan_order_of(conn, lc_num: int) -> int:
-    row = conn.execute("SELECT plan_order FROM problems WHERE lc_num=?;", (lc_num,)).fetchone()
+    row = conn.execute("SELECT plan_order, parked FROM problems WHERE lc_num=?;", (lc_num,)).fetchone()
     if not row:
         raise ValueError(f"lc_num {lc_num} not found in problems (did you import plan.txt?)")
+    if row["parked"]:
+        raise ValueError(f"lc_num {lc_num} is no longer in the plan (dropped by a later import)")
     return int(row["plan_order"])
 
 def cursor_set(db_path: Path, lc_num: int) -> int:
@@ -19,68 +21,74 @@ def cursor_set(db_path: Path, lc_num: int) -> int:
     conn.close()
     return po
 
-def mark_done_before(db_path: Path, lc_num: int, force: bool = False) -> int:
+SEED_NOTE = "seeded by mark-done-before"
+
+def mark_done_before(
+    db_path: Path,
+    lc_num: int,
+    force: bool = False,
+    from_lc: int | None = None,
+    to_lc: int | None = None,
+) -> int:
     """
     For all problems with plan_order < plan_order(lc_num):
     - ensure they exist in reviews
     - set due_at <= now so they show up in REVIEW
     If force=True, also force existing reviews to due now.
+    from_lc/to_lc optionally restrict seeding to plan_order in
+    [plan_order(from_lc), plan_order(to_lc)) so big plans can be seeded in chunks.
     Returns number of newly seeded problems.
     """
-    now = int(time.time())
+    now = clock.now()
     due_now = now - 1
 
     conn = connect(db_path)
     with tx(conn):
         target_po = _plan_order_of(conn, lc_num)
+        lo = _plan_order_of(conn, from_lc) if from_lc is not None else 0
+        hi = min(target_po, _plan_order_of(conn, to_lc)) if to_lc is not None else target_po
 
-        # seed missing reviews rows
-        rows = conn.execute(
+        # set-based: logs first, while the NOT EXISTS still sees the missing rows
+        conn.execute(
             """
-            SELECT p.lc_num
+            INSERT INTO review_logs(
+              lc_num, reviewed_at, grade,
+              prev_due_at, next_due_at,
+              prev_intvl, next_intvl,
+              prev_ease, next_ease,
+              note
+            )
+            SELECT p.lc_num, ?, 'seed', NULL, ?, NULL, 1.0, NULL, 2.50, ?
             FROM problems p
-            LEFT JOIN reviews r ON r.lc_num=p.lc_num
-            WHERE p.plan_order < ?
-              AND r.lc_num IS NULL;
+            WHERE p.plan_order >= ? AND p.plan_order < ?
+              AND NOT EXISTS (SELECT 1 FROM reviews r WHERE r.lc_num = p.lc_num)
+            ORDER BY p.plan_order;
             """,
-            (target_po,),
-        ).fetchall()
-
-        for r in rows:
-            n = int(r["lc_num"])
-            conn.execute(
-                """
-                INSERT INTO reviews(lc_num, due_at, interval_days, ease, reps, lapses, easy_streak, last_grade, status, updated_at)
-                VALUES(?,?,?,?,?,?,?,?,?,?);
-                """,
-                (n, due_now, 1.0, 2.50, 0, 0, 0, "seed", "active", now),
-            )
-            conn.execute(
-                """
-                INSERT INTO review_logs(
-                  lc_num, reviewed_at, grade,
-                  prev_due_at, next_due_at,
-                  prev_intvl, next_intvl,
-                  prev_ease, next_ease,
-                  note
-                ) VALUES(?,?,?,?,?,?,?,?,?,?);
-                """,
-                (n, now, "seed", None, due_now, None, 1.0, None, 2.50, "seeded by mark-done-before"),
-            )
+            (now, due_now, SEED_NOTE, lo, hi),
+        )
+        seeded = conn.execute(
+            """
+            INSERT INTO reviews(lc_num, due_at, interval_days, ease, reps, lapses, easy_streak, last_grade, status, updated_at)
+            SELECT p.lc_num, ?, 1.0, 2.50, 0, 0, 0, 'seed', 'active', ?
+            FROM problems p
+            WHERE p.plan_order >= ? AND p.plan_order < ?
+              AND NOT EXISTS (SELECT 1 FROM reviews r WHERE r.lc_num = p.lc_num);
+            """,
+            (due_now, now, lo, hi),
+        ).rowcount
 
         if force:
             conn.execute(
                 """
                 UPDATE reviews
                 SET due_at=?, status='active', updated_at=?
-                WHERE lc_num IN (SELECT lc_num FROM problems WHERE plan_order < ?);
+                WHERE lc_num IN (SELECT lc_num FROM problems WHERE plan_order >= ? AND plan_order < ?);
                 """,
-                (due_now, now, target_po),
+                (due_now, now, lo, hi),
             )
 
         # keep NEW aligned
         set_meta(conn, "cursor_plan_order", str(target_po))
 
     conn.close()
-    return len(rows)
-
+    return seeded
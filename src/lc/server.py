@@ -0,0 +1,253 @@
+from __future__ import annotations
+
+import ipaddress
+import json
+import os
+import signal
+import socketserver
+import sqlite3
+import threading
+from bisect import bisect_left, bisect_right, insort
+from dataclasses import asdict
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from . import clock
+from .config import load_config
+from .db import close_cached_connections, connect, enable_connection_cache
+from .done import apply_done
+from .frontier import pick_new, window_len
+from .history import fetch_history
+from .show import ShowItem
+from .srs import SECONDS_PER_DAY
+from .stats import compute_stats
+
+# `lc serve`: one warm process answering show/done/stats/history as JSON.
+# Requests are handled one at a time on a single thread, which serializes writes
+# and lets every call share one cached connection (db.enable_connection_cache).
+#
+#   GET  /show                       {"new": [...], "review": [...]}
+#   POST /done  {"lc_num", "grade", "note"?}
+#   GET  /stats
+#   GET  /history?n=20&all=1&before=<reviewed_at>:<id>
+#
+# There is no auth, so TCP only binds loopback addresses. Over TCP a request must
+# also carry a localhost Host header (a DNS-rebound page sends its own name), and
+# POST must be application/json: a browser has to preflight that from another
+# origin, and the preflight (OPTIONS) is never answered, so web pages can't grade cards.
+
+DEFAULT_PORT = 8765
+LOCAL_HOSTS = ("localhost", "127.0.0.1", "::1")
+
+
+def is_loopback(host: str) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def _host_name(header: str) -> str:
+    """Host header without the port: 'localhost:8765' -> 'localhost', '[::1]:8765' -> '::1'."""
+    if header.startswith("["):
+        return header[1:].split("]", 1)[0]
+    return header.rsplit(":", 1)[0] if header.count(":") == 1 else header
+
+
+class Daemon:
+    """
+    In-memory mirror of what `lc show` reads: the active due queue, the NEW
+    frontier, titles and the show-related meta keys. Our own writes patch it in
+    place; writes from other processes bump PRAGMA data_version and trigger a reload.
+    """
+
+    def __init__(self, db_path: Path) -> None:
+        self.db_path = db_path
+        self.conn = connect(db_path)
+        self.reload()
+
+    def reload(self) -> None:
+        conn = self.conn
+        self.data_version = self._data_version()
+        self.titles: Dict[int, str] = {
+            int(r["lc_num"]): str(r["title"]) for r in conn.execute("SELECT lc_num, title FROM problems;")
+        }
+        self.due_at: Dict[int, int] = {
+            int(r["lc_num"]): int(r["due_at"])
+            for r in conn.execute("SELECT lc_num, due_at FROM reviews WHERE status='active';")
+        }
+        self.due: List[Tuple[int, int]] = sorted((d, n) for n, d in self.due_at.items())
+        self.frontier: List[Tuple[int, int]] = [
+            (int(r["plan_order"]), int(r["lc_num"]))
+            for r in conn.execute("SELECT plan_order, lc_num FROM new_frontier ORDER BY plan_order;")
+        ]
+        self.frontier_po: Dict[int, int] = {n: po for po, n in self.frontier}
+        self._load_meta()
+
+    def _load_meta(self) -> None:
+        cfg = load_config(self.conn)
+        self.cursor = cfg.cursor_plan_order
+        self.new_quota = cfg.new_quota
+        self.review_per_new = cfg.review_per_new
+        self.interleave_ratio = cfg.interleave_ratio
+        self.window_size = cfg.window_size
+
+    def _data_version(self) -> int:
+        return int(self.conn.execute("PRAGMA data_version;").fetchone()[0])
+
+    def refresh(self) -> None:
+        """Reload if another connection committed since we last looked."""
+        if self._data_version() != self.data_version:
+            self.reload()
+
+    def show(self, now: Optional[int] = None) -> Tuple[List[ShowItem], List[ShowItem]]:
+        """Same result as show.load_show, from memory."""
+        now = clock.now() if now is None else now
+        self.refresh()
+        i = bisect_left(self.frontier, (self.cursor, -1))
+        window = [n for _, n in self.frontier[i : i + window_len(self.new_quota, self.window_size, self.interleave_ratio)]]
+        picked = pick_new(window, self.new_quota, self.interleave_ratio, now // SECONDS_PER_DAY)
+        new_items = [ShowItem(n, self.titles[n]) for n in picked]
+        review_quota = max(0, self.new_quota * self.review_per_new)
+        hi = bisect_right(self.due, (now, float("inf")))
+        review_items = [ShowItem(n, self.titles[n]) for _, n in self.due[: min(hi, review_quota)]]
+        return new_items, review_items
+
+    def done(self, lc_num: int, grade: str, note: Optional[str]) -> Tuple[int, int]:
+        self.refresh()
+        prev_due, next_due = apply_done(self.db_path, lc_num, grade, note)
+        self._patch(lc_num)
+        return prev_due, next_due
+
+    def _patch(self, lc_num: int) -> None:
+        old = self.due_at.pop(lc_num, None)
+        if old is not None:
+            del self.due[bisect_left(self.due, (old, lc_num))]
+        row = self.conn.execute("SELECT due_at, status FROM reviews WHERE lc_num=?;", (lc_num,)).fetchone()
+        if row is not None and row["status"] == "active":
+            self.due_at[lc_num] = int(row["due_at"])
+            insort(self.due, (int(row["due_at"]), lc_num))
+        po = self.frontier_po.pop(lc_num, None)
+        if po is not None:
+            del self.frontier[bisect_left(self.frontier, (po, lc_num))]
+        self._load_meta()
+
+    def handle(self, method: str, target: str, body: bytes = b"") -> Tuple[int, Any]:
+        """Route one request; returns (http status, json-able payload)."""
+        url = urlsplit(target)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        try:
+            if method == "GET" and url.path == "/show":
+                new_items, review_items = self.show()
+                return 200, {"new": [asdict(x) for x in new_items], "review": [asdict(x) for x in review_items]}
+            if method == "POST" and url.path == "/done":
+                req = json.loads(body or b"{}")
+                lc_num = int(req["lc_num"])
+                grade = str(req.get("grade", "good"))
+                prev_due, next_due = self.done(lc_num, grade, req.get("note") or None)
+                return 200, {"lc_num": lc_num, "grade": grade, "prev_due_at": prev_due, "next_due_at": next_due}
+            if method == "GET" and url.path == "/stats":
+                return 200, asdict(compute_stats(self.db_path))
+            if method == "GET" and url.path == "/history":
+                items = fetch_history(
+                    self.db_path,
+                    n=int(query.get("n", "20")),
+                    include_seed=query.get("all", "0") not in ("", "0", "false"),
+                    before=query.get("before"),
+                )
+                return 200, [asdict(x) for x in items]
+        except (ValueError, KeyError, TypeError) as e:
+            return 400, {"error": str(e) if not isinstance(e, KeyError) else f"missing field {e}"}
+        except sqlite3.Error as e:
+            return 500, {"error": str(e)}
+        return 404, {"error": f"no route for {method} {url.path}"}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "lcsrs"
+    daemon: Daemon  # set by serve()
+
+    def _send(self, status: int, payload: Any) -> None:
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _forbidden_host(self) -> bool:
+        # a Unix socket can't be reached from a browser; the Host header means nothing there
+        if not isinstance(self.client_address, tuple):
+            return False
+        if _host_name(self.headers.get("Host", "").strip().lower()) in LOCAL_HOSTS:
+            return False
+        self._send(403, {"error": "Host must be localhost or 127.0.0.1"})
+        return True
+
+    def do_GET(self) -> None:
+        if self._forbidden_host():
+            return
+        self._send(*self.daemon.handle(self.command, self.path))
+
+    def do_POST(self) -> None:
+        n = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(n) if n else b""
+        if self._forbidden_host():
+            return
+        if self.headers.get_content_type() != "application/json":
+            self._send(415, {"error": "Content-Type must be application/json"})
+            return
+        self._send(*self.daemon.handle(self.command, self.path, body))
+
+    def address_string(self) -> str:
+        # client_address is '' on a Unix socket
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+def _exit_on_sigterm(signum, frame) -> None:
+    raise SystemExit(0)
+
+
+class _UnixHTTPServer(socketserver.UnixStreamServer):
+    pass
+
+
+def serve(db_path: Path, host: str = "127.0.0.1", port: int = DEFAULT_PORT, socket_path: Optional[Path] = None,
+          ready=None) -> None:
+    """
+    Serve until interrupted. With socket_path, listen on a Unix socket (mode 0600)
+    instead of host:port; host must be a loopback address. ready(address) is
+    called once the socket is bound.
+    """
+    if socket_path is None and not is_loopback(host):
+        raise ValueError(f"--host {host} is not a loopback address; lc serve has no auth and only listens locally")
+    enable_connection_cache()
+    handler = type("Handler", (_Handler,), {"daemon": Daemon(db_path)})
+    if socket_path is not None:
+        if socket_path.is_socket():
+            socket_path.unlink()  # stale socket from a previous run
+        server: socketserver.BaseServer = _UnixHTTPServer(str(socket_path), handler)
+        os.chmod(socket_path, 0o600)
+        address = str(socket_path)
+    else:
+        server = HTTPServer((host, port), handler)
+        address = f"http://{host}:{server.server_address[1]}"
+    if threading.current_thread() is threading.main_thread():
+        # kill/systemd stop: leave through the finally below so the socket is removed
+        signal.signal(signal.SIGTERM, _exit_on_sigterm)
+    try:
+        if ready is not None:
+            ready(address)
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if socket_path is not None and socket_path.is_socket():
+            socket_path.unlink()
+        close_cached_connections()
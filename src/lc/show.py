@@ -1,60 +1,74 @@
 from __future__ import annotations
 
-import time
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
-from .db import connect, get_meta
+from . import clock
+from .config import load_config
+from .db import connect
+from .frontier import interleaved, new_rows as frontier_rows, phase_new_rows, window_len
+from .phases import resolve_phase
+from .srs import SECONDS_PER_DAY
 
 @dataclass(frozen=True)
 class ShowItem:
     lc_num: int
     title: str
 
-def load_show(db_path: Path) -> Tuple[List[ShowItem], List[ShowItem]]:
+def load_show(db_path: Path, phase: Optional[str] = None) -> Tuple[List[ShowItem], List[ShowItem]]:
     """
     Returns: (new_items, review_items)
     - NEW: from cursor_plan_order forward, problems that are NOT in reviews table
+      (interleave_ratio > 0: some picked from the next window_size, see frontier.pick_new)
     - REVIEW: reviews due_at <= now, independent of cursor
+    phase: only that phase (phases.resolve_phase); NEW then starts at the phase's
+    first unstudied problem, wherever the cursor is.
     """
-    now = int(time.time())
+    now = clock.now()
     conn = connect(db_path)
+    try:
+        cfg = load_config(conn)
+        cursor_plan_order = cfg.cursor_plan_order
+        new_quota = cfg.new_quota
+        review_quota = max(0, new_quota * cfg.review_per_new)
+        ratio = cfg.interleave_ratio
+        window = window_len(new_quota, cfg.window_size, ratio)
+        day = now // SECONDS_PER_DAY
 
-    cursor_plan_order = int(get_meta(conn, "cursor_plan_order", "1") or "1")
-    new_quota = int(get_meta(conn, "new_quota", "1")or "1")
-    review_per_new = int(get_meta(conn, "review_per_new", "3"))
-    review_quota = max(0, new_quota * review_per_new)
-
-    new_rows = conn.execute(
-        """
-        SELECT p.lc_num, p.title
-        FROM problems p
-        LEFT JOIN reviews r ON r.lc_num = p.lc_num
-        WHERE r.lc_num IS NULL
-          AND p.plan_order >= ?
-        ORDER BY p.plan_order
-        LIMIT ?;
-        """,
-        (cursor_plan_order, new_quota),
-    ).fetchall()
-
-    review_rows = conn.execute(
-        """
-        SELECT p.lc_num, p.title
-        FROM reviews r
-        JOIN problems p ON p.lc_num = r.lc_num
-        WHERE r.status='active'
-          AND r.due_at <= ?
-        ORDER BY r.due_at ASC
-        LIMIT ?;
-        """,
-        (now, review_quota),
-    ).fetchall()
-
-    conn.close()
+        if phase is None:
+            new_rows = interleaved(frontier_rows(conn, cursor_plan_order, window), new_quota, ratio, day)
+            review_rows = conn.execute(
+                """
+                SELECT p.lc_num, p.title
+                FROM reviews r
+                JOIN problems p ON p.lc_num = r.lc_num
+                WHERE r.status='active'
+                  AND r.due_at <= ?
+                ORDER BY r.due_at ASC
+                LIMIT ?;
+                """,
+                (now, review_quota),
+            ).fetchall()
+        else:
+            phase_id = resolve_phase(conn, phase)
+            new_rows = interleaved(phase_new_rows(conn, phase_id, window), new_quota, ratio, day)
+            review_rows = conn.execute(
+                """
+                SELECT p.lc_num, p.title
+                FROM problems p
+                JOIN reviews r ON r.lc_num = p.lc_num
+                WHERE p.phase_id = ?
+                  AND r.status='active'
+                  AND r.due_at <= ?
+                ORDER BY r.due_at ASC
+                LIMIT ?;
+                """,
+                (phase_id, now, review_quota),
+            ).fetchall()
+    finally:
+        conn.close()
 
     new_items = [ShowItem(int(r["lc_num"]), r["title"]) for r in new_rows]
     review_items = [ShowItem(int(r["lc_num"]), r["title"]) for r in review_rows]
     return new_items, review_items
-
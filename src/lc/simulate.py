@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import random
+import sqlite3
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, List, Optional
+
+from . import clock
+from .config import load_config
+from .db import SCHEMA_VERSION, close_cached_connections, connect, enable_connection_cache, ensure_schema, set_meta, tx
+from .done import BatchEntry, apply_done_batch
+from .forecast import GRADES, grade_distribution
+from .show import load_show
+from .srs import SECONDS_PER_DAY
+from .stats import compute_stats, due_total
+
+# `lc simulate`: the real daily loop (show.load_show -> done.apply_done_batch ->
+# stats.compute_stats) against a :memory: copy of the db, with clock.now() moved
+# one day per iteration. The copy lives in the connection cache, so every
+# function reuses one in-memory connection; the db on disk is only read once.
+
+MEMORY = Path(":memory:")
+PASS_GRADES = ("hard", "good", "easy")
+PASS_WEIGHTS = (0.2, 0.6, 0.2)
+DEFAULT_RECALL = 0.9
+POLICIES = ("history", "recall[:R]", "again", "hard", "good", "easy")
+
+# (rng, interval_days or None for a NEW problem, days since the last review) -> grade
+Policy = Callable[[random.Random, Optional[float], float], str]
+
+
+@dataclass(frozen=True)
+class SimDay:
+    day: int
+    at: int             # simulated session time (unix seconds)
+    due: int            # reviews due when the session starts
+    new: int            # NEW problems done
+    reviewed: int       # REVIEW problems done
+    backlog: int        # still due after the session
+    active: int
+    retired: int        # retired so far (cumulative)
+
+
+@dataclass(frozen=True)
+class SimResult:
+    days: List[SimDay]
+    policy: str
+    new_quota: int
+    review_per_new: int
+    retired_start: int
+    seconds: float
+
+
+def make_policy(spec: str, conn: sqlite3.Connection) -> Policy:
+    """
+    history     grades drawn from this db's review_logs distribution
+    recall[:R]  recall with p = R ** (elapsed / interval) (NEW: p = R); passes are hard/good/easy 20/60/20
+    <grade>     always that grade
+    """
+    name, _, arg = spec.partition(":")
+    if name in GRADES and not arg:
+        return lambda rng, interval, elapsed: name
+    if name == "history" and not arg:
+        probs = grade_distribution(conn)
+        weights = [probs[g] for g in GRADES]
+        return lambda rng, interval, elapsed: rng.choices(GRADES, weights)[0]
+    if name == "recall":
+        r = float(arg) if arg else DEFAULT_RECALL
+        if not 0.0 < r < 1.0:
+            raise ValueError("recall:R needs 0 < R < 1")
+
+        def recall(rng: random.Random, interval: Optional[float], elapsed: float) -> str:
+            p = r if interval is None else r ** (elapsed / max(interval, 1e-9))
+            if rng.random() >= p:
+                return "again"
+            return rng.choices(PASS_GRADES, PASS_WEIGHTS)[0]
+        return recall
+    raise ValueError(f"unknown policy {spec!r} (one of: {', '.join(POLICIES)})")
+
+
+def _copy_to_memory(db_path: Path) -> sqlite3.Connection:
+    if not db_path.exists():
+        raise FileNotFoundError(db_path)
+    mem = connect(MEMORY)
+    src = sqlite3.connect(f"{db_path.resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        src.backup(mem)
+    finally:
+        src.close()
+    if mem.execute("PRAGMA user_version;").fetchone()[0] < SCHEMA_VERSION:
+        ensure_schema(mem)  # an older file: upgrade the copy, never the user's db
+    return mem
+
+
+def simulate(
+    db_path: Path,
+    days: int = 365,
+    policy: str = "history",
+    seed: int = 0,
+    new_quota: Optional[int] = None,
+    review_per_new: Optional[int] = None,
+    start: Optional[int] = None,
+) -> SimResult:
+    """
+    Run `days` daily sessions on an in-memory copy of db_path: every session does
+    all NEW + REVIEW items `lc show` lists, graded by the policy. new_quota /
+    review_per_new override the copy's settings. db_path itself is never written.
+    """
+    if days < 0:
+        raise ValueError("days must be >= 0")
+    rng = random.Random(seed)
+    start = clock.now() if start is None else start
+    enable_connection_cache()
+    prev_now = clock.set_now(start)
+    try:
+        mem = _copy_to_memory(db_path)
+        with tx(mem):
+            if new_quota is not None:
+                set_meta(mem, "new_quota", str(new_quota))
+            if review_per_new is not None:
+                set_meta(mem, "review_per_new", str(review_per_new))
+        grade = make_policy(policy, mem)
+        cfg = load_config(mem)
+        quota, per_new = cfg.new_quota, cfg.review_per_new
+        retired_start = compute_stats(MEMORY).retired_total
+
+        out: List[SimDay] = []
+        t0 = time.perf_counter()
+        for d in range(days):
+            now = start + d * SECONDS_PER_DAY
+            clock.set_now(now)
+            due = due_total(mem, now)
+            new_items, review_items = load_show(MEMORY)
+            state = {
+                int(r["lc_num"]): (float(r["interval_days"]), int(r["updated_at"]))
+                for r in mem.execute(
+                    f"SELECT lc_num, interval_days, updated_at FROM reviews WHERE lc_num IN ({','.join('?' * len(review_items))});",
+                    [it.lc_num for it in review_items],
+                )
+            } if review_items else {}
+            entries = []
+            for it in review_items:
+                interval, last = state[it.lc_num]
+                entries.append(BatchEntry(it.lc_num, grade(rng, interval, (now - last) / SECONDS_PER_DAY), None, now))
+            for it in new_items:
+                entries.append(BatchEntry(it.lc_num, grade(rng, None, 0.0), None, now))
+            apply_done_batch(MEMORY, entries)
+            s = compute_stats(MEMORY)
+            out.append(SimDay(
+                day=d, at=now, due=due, new=len(new_items), reviewed=len(review_items),
+                backlog=s.due_total, active=s.active_total, retired=s.retired_total,
+            ))
+        seconds = time.perf_counter() - t0
+    finally:
+        clock.set_now(prev_now)
+        close_cached_connections()
+    return SimResult(
+        days=out, policy=policy, new_quota=quota, review_per_new=per_new,
+        retired_start=retired_start, seconds=seconds,
+    )
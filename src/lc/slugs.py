@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import csv
+import json
+import re
+import sqlite3
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterator, Optional, Tuple
+
+from .db import connect, tx
+
+# lc_num -> LeetCode URL slug, so `lc open` can go straight to /problems/<slug>/
+# instead of the search page. Filled offline:
+#   lc slugs import FILE   a catalog dump (the site's api/problems/all JSON, a GraphQL
+#                          problemsetQuestionList dump, JSON list / JSONL objects, or CSV lc_num,slug)
+#   lc slugs derive        slugify the titles already imported from plan.txt
+# Imported slugs always win; derived ones only replace other derived ones.
+
+UPSERT_SQL = """
+INSERT INTO slugs(lc_num, slug, source) VALUES(?,?,?)
+ON CONFLICT(lc_num) DO UPDATE SET slug=excluded.slug, source=excluded.source
+WHERE excluded.source = 'import' OR slugs.source = 'plan';
+"""
+
+_ID_KEYS = ("lc_num", "frontendQuestionId", "frontend_question_id", "questionFrontendId", "id")
+_SLUG_KEYS = ("slug", "titleSlug", "title_slug", "question__title_slug")
+_SLUG_RE = re.compile(r"^[a-z0-9]+(?:-[a-z0-9]+)*$")
+_DROP_RE = re.compile(r"[^a-z0-9\s-]")
+_SEP_RE = re.compile(r"[\s-]+")
+
+
+@dataclass(frozen=True)
+class SlugLoad:
+    loaded: int     # rows written
+    skipped: int    # non-numeric ids (LCP/剑指 Offer/...), bad slugs, non-ASCII titles
+
+
+def slugify(title: str) -> Optional[str]:
+    """LeetCode's slug for an English title ("Pow(x, n)" -> "powx-n"); None if it can't be derived."""
+    if not title.isascii():
+        return None
+    slug = _SEP_RE.sub("-", _DROP_RE.sub("", title.lower())).strip("-")
+    return slug or None
+
+
+def _first(obj: dict, keys: Tuple[str, ...]) -> Any:
+    for k in keys:
+        if obj.get(k) not in (None, ""):
+            return obj[k]
+    return None
+
+
+def _pair(lc_num: Any, slug: Any) -> Optional[Tuple[int, str]]:
+    num = str(lc_num).strip() if lc_num is not None else ""
+    slug = str(slug).strip().lower() if slug is not None else ""
+    if not num.isdigit() or not _SLUG_RE.match(slug):
+        return None
+    return int(num), slug
+
+
+def _json_objects(data: Any) -> Iterator[dict]:
+    if isinstance(data, list):
+        yield from (x for x in data if isinstance(x, dict))
+        return
+    if not isinstance(data, dict):
+        raise ValueError("unrecognized slug catalog JSON (expected a list or an object)")
+    if "stat_status_pairs" in data:  # api/problems/all
+        for p in data["stat_status_pairs"]:
+            yield (p or {}).get("stat") or {}
+        return
+    inner = data.get("data", data)
+    for key in ("problemsetQuestionList", "problemsetQuestionListV2"):
+        if isinstance(inner.get(key), dict):
+            inner = inner[key]
+    if isinstance(inner.get("questions"), list):
+        yield from _json_objects(inner["questions"])
+        return
+    raise ValueError("unrecognized slug catalog JSON")
+
+
+def iter_catalog(path: Path) -> Iterator[Optional[Tuple[int, str]]]:
+    """(lc_num, slug) per entry of a dump; None for entries that are skipped."""
+    suffix = path.suffix.lower()
+    with path.open("r", encoding="utf-8", newline="") as f:
+        if suffix == ".csv":
+            for lineno, row in enumerate(csv.reader(f), 1):
+                if not row or not row[0].strip() or row[0].lstrip().startswith("#"):
+                    continue
+                if lineno == 1 and not row[0].strip().isdigit():
+                    continue  # header
+                yield _pair(row[0], row[1] if len(row) > 1 else None)
+        elif suffix in (".jsonl", ".ndjson"):
+            for lineno, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    obj = json.loads(line)
+                except ValueError as e:
+                    raise ValueError(f"{path}:{lineno}: bad JSON ({e})") from None
+                yield _pair(_first(obj, _ID_KEYS), _first(obj, _SLUG_KEYS)) if isinstance(obj, dict) else None
+        else:
+            try:
+                data = json.load(f)
+            except ValueError as e:
+                raise ValueError(f"{path}: not a JSON slug catalog ({e})") from None
+            for obj in _json_objects(data):
+                yield _pair(_first(obj, _ID_KEYS), _first(obj, _SLUG_KEYS))
+
+
+def _load(conn: sqlite3.Connection, pairs: Iterator[Optional[Tuple[int, str]]], source: str) -> SlugLoad:
+    rows, skipped = [], 0
+    for p in pairs:
+        if p is None:
+            skipped += 1
+        else:
+            rows.append((p[0], p[1], source))
+    written = conn.executemany(UPSERT_SQL, rows).rowcount  # derived rows don't overwrite imported ones
+    return SlugLoad(loaded=max(written, 0), skipped=skipped)
+
+
+def import_slugs(db_path: Path, path: Path) -> SlugLoad:
+    """Bulk-load a catalog dump in one transaction; entries replace any slug for their lc_num."""
+    pairs = list(iter_catalog(path))  # parse errors surface before the transaction starts
+    conn = connect(db_path)
+    with tx(conn):
+        result = _load(conn, iter(pairs), "import")
+    conn.close()
+    return result
+
+
+def derive_slugs(db_path: Path) -> SlugLoad:
+    """Slugify problems.title for every problem without an imported slug."""
+    conn = connect(db_path)
+    with tx(conn):
+        titles = conn.execute("SELECT lc_num, title FROM problems;").fetchall()
+        result = _load(conn, (_pair(r["lc_num"], slugify(r["title"])) for r in titles), "plan")
+    conn.close()
+    return result
+
+
+def slug_for(conn: sqlite3.Connection, lc_num: int) -> Optional[str]:
+    row = conn.execute("SELECT slug FROM slugs WHERE lc_num=?;", (lc_num,)).fetchone()
+    return str(row["slug"]) if row else None
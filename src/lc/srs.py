@@ -1,7 +1,8 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Optional
+import json
+from dataclasses import asdict, dataclass, fields, replace
+from typing import Callable, Optional
 
 SECONDS_PER_DAY = 86400
 
@@ -16,42 +17,96 @@ class ReviewState:
     last_grade: str
     status: str  # active|retired
 
+def row_to_state(row) -> ReviewState:
+    """ReviewState from a reviews / replay_state row (sqlite3.Row or mapping)."""
+    return ReviewState(
+        due_at=int(row["due_at"]),
+        interval_days=float(row["interval_days"]),
+        ease=float(row["ease"]),
+        reps=int(row["reps"]),
+        lapses=int(row["lapses"]),
+        easy_streak=int(row["easy_streak"]),
+        last_grade=str(row["last_grade"]),
+        status=str(row["status"]),
+    )
+
+@dataclass(frozen=True)
+class SrsParams:
+    """Scheduler constants; fitted per user by `lc optimize` (optimize.py), stored in meta.srs_params (config.load_params)."""
+    ease_start: float = 2.50
+    ease_again: float = 0.20    # ease -= on again
+    ease_hard: float = 0.15     # ease -= on hard
+    ease_easy: float = 0.15     # ease += on easy
+    hard_mult: float = 1.20
+    easy_bonus: float = 1.30
+    # first interval per grade; hard/good/easy are also the interval floors later on
+    interval_again: float = 1.0
+    interval_hard: float = 2.0
+    interval_good: float = 3.0
+    interval_easy: float = 5.0
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), sort_keys=True)
+
+    @classmethod
+    def from_json(cls, text: Optional[str]) -> "SrsParams":
+        """Unknown keys are ignored, missing ones keep their default."""
+        if not text:
+            return DEFAULT_PARAMS
+        data = json.loads(text)
+        names = {f.name for f in fields(cls)}
+        return replace(DEFAULT_PARAMS, **{k: float(v) for k, v in data.items() if k in names})
+
+DEFAULT_PARAMS = SrsParams()
+
+EASE_MIN = 1.30
+EASE_MAX = 3.00
+
 def clamp(x: float, lo: float, hi: float) -> float:
     return max(lo, min(hi, x))
 
-def next_state(prev: Optional[ReviewState], grade: str, now: int) -> ReviewState:
+# (ideal_due_at, interval_days, now) -> due_at actually used; see balance.LoadBalancer
+Balancer = Callable[[int, float, int], int]
+
+def next_state(prev: Optional[ReviewState], grade: str, now: int, balancer: Optional[Balancer] = None,
+               params: SrsParams = DEFAULT_PARAMS) -> ReviewState:
     """
     Anki-ish day-granularity scheduler + 3x easy => retired.
     grade in: again|hard|good|easy
+    balancer (optional) may move the due date of active cards, e.g. to level daily load.
+    params: scheduler constants (config.load_params(conn) for the fitted ones).
     """
+    P = params
     grade = grade.lower().strip()
     if grade not in {"again", "hard", "good", "easy"}:
         raise ValueError("grade must be one of: again, hard, good, easy")
 
     if prev is None:
         # First time entering SRS from NEW
-        ease = 2.50
+        ease = P.ease_start
         reps = 0
         lapses = 0
         easy_streak = 0
         if grade == "again":
-            interval = 1.0
-            ease = clamp(ease - 0.20, 1.30, 3.00)
+            interval = P.interval_again
+            ease = clamp(ease - P.ease_again, EASE_MIN, EASE_MAX)
             lapses += 1
         elif grade == "hard":
-            interval = 2.0
-            ease = clamp(ease - 0.15, 1.30, 3.00)
+            interval = P.interval_hard
+            ease = clamp(ease - P.ease_hard, EASE_MIN, EASE_MAX)
         elif grade == "good":
-            interval = 3.0
+            interval = P.interval_good
         else:  # easy
-            interval = 5.0
-            ease = clamp(ease + 0.15, 1.30, 3.00)
+            interval = P.interval_easy
+            ease = clamp(ease + P.ease_easy, EASE_MIN, EASE_MAX)
             easy_streak = 1
 
         status = "active"
         if easy_streak >= 3:
             status = "retired"
         due_at = now + int(round(interval) * SECONDS_PER_DAY)
+        if balancer is not None and status == "active":
+            due_at = balancer(due_at, interval, now)
 
         return ReviewState(
             due_at=due_at,
@@ -72,27 +127,29 @@ def next_state(prev: Optional[ReviewState], grade: str, now: int) -> ReviewState
     easy_streak = prev.easy_streak
 
     if grade == "again":
-        ease = clamp(ease - 0.20, 1.30, 3.00)
-        interval = 1.0
+        ease = clamp(ease - P.ease_again, EASE_MIN, EASE_MAX)
+        interval = P.interval_again
         lapses += 1
         easy_streak = 0
     elif grade == "hard":
-        ease = clamp(ease - 0.15, 1.30, 3.00)
-        interval = max(2.0, interval * 1.20)
+        ease = clamp(ease - P.ease_hard, EASE_MIN, EASE_MAX)
+        interval = max(P.interval_hard, interval * P.hard_mult)
         easy_streak = 0
         reps += 1
     elif grade == "good":
-        interval = max(3.0, interval * ease)
+        interval = max(P.interval_good, interval * ease)
         easy_streak = 0
         reps += 1
     else:  # easy
-        ease = clamp(ease + 0.15, 1.30, 3.00)
-        interval = max(5.0, interval * ease * 1.30)
+        ease = clamp(ease + P.ease_easy, EASE_MIN, EASE_MAX)
+        interval = max(P.interval_easy, interval * ease * P.easy_bonus)
         easy_streak += 1
         reps += 1
 
     status = "retired" if easy_streak >= 3 else "active"
     due_at = now + int(round(interval) * SECONDS_PER_DAY)
+    if balancer is not None and status == "active":
+        due_at = balancer(due_at, interval, now)
 
     return ReviewState(
         due_at=due_at,
@@ -1,10 +1,15 @@
 from __future__ import annotations
 
-import time
-from dataclasses import dataclass
+import sqlite3
+from dataclasses import dataclass, fields
 from pathlib import Path
+from typing import List
 
-from .db import connect, get_meta
+from . import clock
+from .config import load_config
+from .db import COUNTERS_REBUILD_SQL, connect, tx
+
+SECONDS_PER_DAY = 86400
 
 
 @dataclass(frozen=True)
@@ -23,56 +28,182 @@ class Stats:
     logs_7d: int
 
 
-def compute_stats(db_path: Path) -> Stats:
-    now = int(time.time())
-    today_start = now - (now % 86400)  # naive local/UTC boundary ok for MVP
-    seven_days_ago = now - 7 * 86400
-
-    conn = connect(db_path)
-
-    cursor_po = int(get_meta(conn, "cursor_plan_order", "1") or "1")
-
+def _cursor(conn: sqlite3.Connection) -> tuple[int, int | None, str | None]:
+    cursor_po = load_config(conn).cursor_plan_order
     cur = conn.execute(
-        "SELECT lc_num, title FROM problems WHERE plan_order=?;",
+        "SELECT lc_num, title FROM problems WHERE plan_order=? AND parked = 0;",
         (cursor_po,),
     ).fetchone()
     cursor_lc = int(cur["lc_num"]) if cur else None
     cursor_title = str(cur["title"]) if cur else None
+    return cursor_po, cursor_lc, cursor_title
+
+
+def due_total(conn: sqlite3.Connection, now: int) -> int:
+    """Active cards due at or before now."""
+    # whole days from the due_days histogram, only today's part from reviews
+    day = now // SECONDS_PER_DAY
+    return int(conn.execute(
+        """
+        SELECT (SELECT COALESCE(SUM(n), 0) FROM due_days WHERE day < ?)
+             + (SELECT COUNT(*) FROM reviews WHERE status='active' AND due_at >= ? AND due_at <= ?) AS c;
+        """,
+        (day, day * SECONDS_PER_DAY, now),
+    ).fetchone()["c"])
+
+
+def _stats_from_counters(conn: sqlite3.Connection, now: int) -> Stats | None:
+    """Read trigger-maintained counters; None if this db has no counters yet."""
+    try:
+        counters = {r["name"]: int(r["value"]) for r in conn.execute("SELECT name, value FROM counters;")}
+    except sqlite3.OperationalError:
+        return None
+    if not counters:
+        return None
+
+    today_start = now - (now % SECONDS_PER_DAY)  # naive local/UTC boundary ok for MVP
+    seven_days_ago = now - 7 * SECONDS_PER_DAY
+    boundary_day = seven_days_ago // SECONDS_PER_DAY
+
+    row = conn.execute(
+        """
+        SELECT
+          (SELECT COALESCE(SUM(n), 0) FROM log_days WHERE day >= ?) AS today,
+          (SELECT COALESCE(SUM(n), 0) FROM log_days WHERE day > ?) AS full_days,
+          (SELECT COUNT(*) FROM review_logs
+            WHERE reviewed_at >= ? AND reviewed_at < ? AND grade != 'seed') AS partial_day;
+        """,
+        (today_start // SECONDS_PER_DAY, boundary_day, seven_days_ago, (boundary_day + 1) * SECONDS_PER_DAY),
+    ).fetchone()
+
+    cursor_po, cursor_lc, cursor_title = _cursor(conn)
+    return Stats(
+        cursor_plan_order=cursor_po,
+        cursor_lc_num=cursor_lc,
+        cursor_title=cursor_title,
+        problems_total=counters.get("problems_total", 0),
+        reviews_total=counters.get("reviews_total", 0),
+        active_total=counters.get("active_total", 0),
+        due_total=due_total(conn, now),
+        retired_total=counters.get("retired_total", 0),
+        logs_today=int(row["today"]),
+        logs_7d=int(row["full_days"]) + int(row["partial_day"]),
+    )
 
-    problems_total = conn.execute("SELECT COUNT(*) AS c FROM problems;").fetchone()["c"]
-    reviews_total = conn.execute("SELECT COUNT(*) AS c FROM reviews;").fetchone()["c"]
-    active_total = conn.execute(
-        "SELECT COUNT(*) AS c FROM reviews WHERE status='active';"
-    ).fetchone()["c"]
-    due_total = conn.execute(
-        "SELECT COUNT(*) AS c FROM reviews WHERE status='active' AND due_at <= ?;",
-        (now,),
-    ).fetchone()["c"]
-    retired_total = conn.execute(
-        "SELECT COUNT(*) AS c FROM reviews WHERE status='retired';"
-    ).fetchone()["c"]
-
-    logs_today = conn.execute(
-        "SELECT COUNT(*) AS c FROM review_logs WHERE reviewed_at >= ? AND grade != 'seed';",
-        (today_start,),
-    ).fetchone()["c"]
-    logs_7d = conn.execute(
-        "SELECT COUNT(*) AS c FROM review_logs WHERE reviewed_at >= ? AND grade != 'seed';",
-        (seven_days_ago,),
-    ).fetchone()["c"]
-
-    conn.close()
 
+def _stats_from_scan(conn: sqlite3.Connection, now: int) -> Stats:
+    """Recompute everything from the base tables in one aggregate query."""
+    today_start = now - (now % SECONDS_PER_DAY)
+    seven_days_ago = now - 7 * SECONDS_PER_DAY
+
+    row = conn.execute(
+        """
+        SELECT
+          (SELECT COUNT(*) FROM problems WHERE parked = 0) AS problems_total,
+          r.reviews_total, r.active_total, r.due_total, r.retired_total,
+          l.logs_today, l.logs_7d
+        FROM (
+          SELECT COUNT(*) AS reviews_total,
+                 COALESCE(SUM(status='active'), 0) AS active_total,
+                 COALESCE(SUM(status='active' AND due_at <= ?), 0) AS due_total,
+                 COALESCE(SUM(status='retired'), 0) AS retired_total
+          FROM reviews
+        ) r, (
+          SELECT COALESCE(SUM(reviewed_at >= ?), 0) AS logs_today,
+                 COUNT(*) AS logs_7d
+          FROM review_logs
+          WHERE reviewed_at >= ? AND grade != 'seed'
+        ) l;
+        """,
+        (now, today_start, seven_days_ago),
+    ).fetchone()
+
+    cursor_po, cursor_lc, cursor_title = _cursor(conn)
     return Stats(
         cursor_plan_order=cursor_po,
         cursor_lc_num=cursor_lc,
         cursor_title=cursor_title,
-        problems_total=int(problems_total),
-        reviews_total=int(reviews_total),
-        active_total=int(active_total),
-        due_total=int(due_total),
-        retired_total=int(retired_total),
-        logs_today=int(logs_today),
-        logs_7d=int(logs_7d),
+        problems_total=int(row["problems_total"]),
+        reviews_total=int(row["reviews_total"]),
+        active_total=int(row["active_total"]),
+        due_total=int(row["due_total"]),
+        retired_total=int(row["retired_total"]),
+        logs_today=int(row["logs_today"]),
+        logs_7d=int(row["logs_7d"]),
     )
 
+
+@dataclass(frozen=True)
+class PhaseStats:
+    phase: str
+    problems: int
+    new: int        # no reviews row yet
+    active: int
+    retired: int
+    due: int        # active and due_at <= now
+
+
+# one pass over idx_problems_phase (already grouped by phase_id) + a reviews PK lookup per problem
+PHASE_STATS_SQL = """
+SELECT ph.name AS phase,
+       COUNT(*) AS problems,
+       COALESCE(SUM(r.lc_num IS NULL), 0) AS new,
+       COALESCE(SUM(r.status = 'active'), 0) AS active,
+       COALESCE(SUM(r.status = 'retired'), 0) AS retired,
+       COALESCE(SUM(r.status = 'active' AND r.due_at <= ?), 0) AS due
+FROM problems p
+JOIN phases ph ON ph.id = p.phase_id
+LEFT JOIN reviews r ON r.lc_num = p.lc_num
+WHERE p.parked = 0
+GROUP BY p.phase_id
+ORDER BY MIN(p.plan_order);
+"""
+
+
+def phase_stats_for(conn: sqlite3.Connection, now: int | None = None) -> List[PhaseStats]:
+    now = clock.now() if now is None else now
+    return [PhaseStats(**{k: r[k] for k in r.keys()}) for r in conn.execute(PHASE_STATS_SQL, (now,))]
+
+
+def compute_phase_stats(db_path: Path) -> List[PhaseStats]:
+    conn = connect(db_path)
+    try:
+        return phase_stats_for(conn)
+    finally:
+        conn.close()
+
+
+def stats_for(conn: sqlite3.Connection, now: int | None = None) -> Stats:
+    now = clock.now() if now is None else now
+    return _stats_from_counters(conn, now) or _stats_from_scan(conn, now)
+
+
+def compute_stats(db_path: Path) -> Stats:
+    conn = connect(db_path)
+    try:
+        return stats_for(conn)
+    finally:
+        conn.close()
+
+
+def verify_counters(db_path: Path, repair: bool = False) -> List[str]:
+    """
+    Compare counter-based stats with a from-scratch scan.
+    Returns the names of mismatching fields; repair=True rebuilds the counters.
+    """
+    now = clock.now()
+    conn = connect(db_path)
+    try:
+        fast = _stats_from_counters(conn, now)
+        slow = _stats_from_scan(conn, now)
+        if fast is None:
+            bad = ["counters"]
+        else:
+            bad = [f.name for f in fields(Stats) if getattr(fast, f.name) != getattr(slow, f.name)]
+        if repair and bad:
+            with tx(conn):
+                for sql in COUNTERS_REBUILD_SQL:
+                    conn.execute(sql)
+        return bad
+    finally:
+        conn.close()
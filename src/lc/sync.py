@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import sqlite3
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Tuple
+
+from .config import load_config, load_params
+from .db import connect, set_meta, tx
+from .done import UPSERT_REVIEW_SQL
+from .frontier import advance_cursor
+from .replay import replay_cards
+
+# `lc sync OTHER.db`: pull another device's review_logs into this db.
+#
+# The other file is ATTACHed read-only. Log ids are per file, so a log is
+# identified by (lc_num, reviewed_at, grade); logs this db already has, including
+# ones the peer pulled from us earlier, are dropped. Per peer (meta 'db_id' of the
+# other file) we keep a high-water mark
+# "sync_hwm:<peer id>" = "<peer log id>:<reviewed_at>:<lc_num>", and only read
+# peer logs after it. The (reviewed_at, lc_num) part is checked against the
+# peer before it is trusted: a restored or swapped file falls back to a full
+# pull, which the duplicate check keeps correct.
+# Only the cards that received logs are replayed (replay.replay_cards), and the
+# cursor moves to the larger of the two cursors, then past anything now reviewed.
+
+HWM_PREFIX = "sync_hwm:"
+
+# the peer is ATTACHed read-only as `peer`; the primary key drops duplicates within the pulled batch
+INCOMING_TABLE_SQL = """
+CREATE TEMP TABLE IF NOT EXISTS sync_in (
+  peer_id     INTEGER NOT NULL,
+  lc_num      INTEGER NOT NULL,
+  reviewed_at INTEGER NOT NULL,
+  grade       TEXT    NOT NULL,
+  prev_due_at INTEGER, next_due_at INTEGER,
+  prev_intvl  REAL,    next_intvl  REAL,
+  prev_ease   REAL,    next_ease   REAL,
+  note        TEXT,
+  PRIMARY KEY (lc_num, reviewed_at, grade)
+) WITHOUT ROWID;
+"""
+
+PULL_SQL = """
+INSERT OR IGNORE INTO temp.sync_in
+SELECT id, lc_num, reviewed_at, grade, prev_due_at, next_due_at, prev_intvl, next_intvl, prev_ease, next_ease, note
+FROM peer.review_logs WHERE id > ?;
+"""
+
+# new ids are handed out in (reviewed_at, peer id) order, i.e. the order replay uses
+MERGE_SQL = """
+INSERT INTO review_logs(lc_num, reviewed_at, grade, prev_due_at, next_due_at, prev_intvl, next_intvl, prev_ease, next_ease, note)
+SELECT s.lc_num, s.reviewed_at, s.grade, s.prev_due_at, s.next_due_at, s.prev_intvl, s.next_intvl, s.prev_ease, s.next_ease, s.note
+FROM temp.sync_in s
+WHERE EXISTS (SELECT 1 FROM problems p WHERE p.lc_num = s.lc_num)
+  AND NOT EXISTS (
+    SELECT 1 FROM review_logs l
+    WHERE l.lc_num = s.lc_num AND l.reviewed_at = s.reviewed_at AND l.grade = s.grade
+  )
+ORDER BY s.reviewed_at, s.peer_id;
+"""
+
+
+@dataclass(frozen=True)
+class SyncResult:
+    pulled: int         # peer logs read (after the high-water mark)
+    merged: int         # inserted into review_logs
+    duplicates: int     # already here
+    unknown: int        # lc_num not in this plan
+    cards: int          # reviews rows replayed
+    cursor: int         # cursor_plan_order afterwards
+    full_pull: bool     # high-water mark missing or not valid for this peer
+
+
+def _peer_meta(conn: sqlite3.Connection, key: str) -> Optional[str]:
+    row = conn.execute("SELECT value FROM peer.meta WHERE key=?;", (key,)).fetchone()
+    return str(row["value"]) if row else None
+
+
+def _checked_hwm(conn: sqlite3.Connection, raw: Optional[str]) -> int:
+    """Peer log id to continue after; 0 when the stored mark doesn't match the peer's log at that id."""
+    try:
+        log_id, reviewed_at, lc_num = (int(x) for x in (raw or "").split(":"))
+    except ValueError:
+        return 0
+    row = conn.execute("SELECT reviewed_at, lc_num FROM peer.review_logs WHERE id=?;", (log_id,)).fetchone()
+    if row is None or (int(row["reviewed_at"]), int(row["lc_num"])) != (reviewed_at, lc_num):
+        return 0
+    return log_id
+
+
+def _pull(conn: sqlite3.Connection, after_id: int) -> Tuple[int, Optional[str]]:
+    """Copy peer logs after after_id into temp.sync_in; returns (count, new high-water mark)."""
+    conn.execute(INCOMING_TABLE_SQL)
+    conn.execute("DELETE FROM temp.sync_in;")
+    n = conn.execute("SELECT COUNT(*) AS c FROM peer.review_logs WHERE id > ?;", (after_id,)).fetchone()["c"]
+    if not n:
+        return 0, None
+    conn.execute(PULL_SQL, (after_id,))
+    last = conn.execute("SELECT id, reviewed_at, lc_num FROM peer.review_logs ORDER BY id DESC LIMIT 1;").fetchone()
+    return int(n), f"{last['id']}:{last['reviewed_at']}:{last['lc_num']}"
+
+
+def sync_from(db_path: Path, peer_path: Path) -> SyncResult:
+    """Merge the peer's new review_logs into db_path and replay the cards they touch."""
+    if peer_path.resolve() == db_path.resolve():
+        raise ValueError("cannot sync a database with itself")
+    if not peer_path.exists():
+        raise FileNotFoundError(peer_path)
+    conn = connect(db_path)
+    # ATTACH is not allowed inside a transaction
+    conn.execute("ATTACH DATABASE ? AS peer;", (f"{peer_path.resolve().as_uri()}?mode=ro",))
+    try:
+        peer_id = _peer_meta(conn, "db_id") or f"path:{peer_path.resolve()}"
+        key = HWM_PREFIX + peer_id
+        with tx(conn):
+            cfg = load_config(conn)
+            after_id = _checked_hwm(conn, cfg.raw.get(key))
+            pulled, hwm = _pull(conn, after_id)
+
+            unknown = conn.execute(
+                "SELECT COUNT(*) AS c FROM temp.sync_in s WHERE NOT EXISTS (SELECT 1 FROM problems p WHERE p.lc_num = s.lc_num);"
+            ).fetchone()["c"]
+            before = conn.execute("SELECT COALESCE(MAX(id), 0) AS m FROM review_logs;").fetchone()["m"]
+            merged = conn.execute(MERGE_SQL).rowcount
+            conn.execute("DELETE FROM temp.sync_in;")
+
+            cards = 0
+            if merged:
+                # a rowid range; DISTINCT here would make SQLite walk all of idx_logs_card instead
+                touched = {int(r["lc_num"]) for r in conn.execute(
+                    "SELECT lc_num FROM review_logs WHERE id > ?;", (before,)
+                )}
+                states = replay_cards(conn, touched, load_params(conn, cfg))
+                conn.executemany(
+                    UPSERT_REVIEW_SQL,
+                    (
+                        (n, s.due_at, s.interval_days, s.ease, s.reps, s.lapses, s.easy_streak, s.last_grade, s.status, ts)
+                        for n, (s, ts) in states.items()
+                    ),
+                )
+                cards = len(states)
+
+            if hwm is not None:
+                set_meta(conn, key, hwm)
+            peer_cursor = int(_peer_meta(conn, "cursor_plan_order") or "1")
+            if peer_cursor > cfg.cursor_plan_order:
+                set_meta(conn, "cursor_plan_order", str(peer_cursor))
+            advance_cursor(conn)
+            cursor = load_config(conn).cursor_plan_order
+    finally:
+        conn.execute("DETACH DATABASE peer;")
+        conn.close()
+    return SyncResult(
+        pulled=pulled,
+        merged=merged,
+        duplicates=pulled - merged - int(unknown),
+        unknown=int(unknown),
+        cards=cards,
+        cursor=cursor,
+        full_pull=after_id == 0,
+    )
@@ -0,0 +1,273 @@
+from __future__ import annotations
+
+import atexit
+import json
+import re
+import sqlite3
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import IO, Any, Dict, List, Optional
+
+from . import db
+
+# SQL tracing for `lc --profile ...` / LCSRS_TRACE=1 (LCSRS_TRACE_FILE=path for JSONL).
+#
+# enable() swaps db.CONNECTION_FACTORY for TracingConnection. Every statement that
+# goes through a cursor is timed (execute + all fetches), its rows counted, and the
+# first time a statement text is seen its EXPLAIN QUERY PLAN is captured. The
+# sqlite trace callback additionally counts trigger programs fired per statement
+# and catches statements that never reach a cursor. A summary goes to stderr at exit.
+
+TOP_N = 8
+_WS = re.compile(r"\s+")
+_EQP_KINDS = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "REPLACE")
+
+
+def _norm(sql: str) -> str:
+    return _WS.sub(" ", sql).strip()
+
+
+@dataclass
+class Event:
+    sql: str
+    t_ms: float                 # start, relative to enable()
+    ms: float = 0.0             # execute + fetch time
+    rows: int = 0               # rows fetched, or rowcount for DML
+    triggers: int = 0           # trigger programs run on behalf of this statement
+    many: int = 0               # parameter sets (executemany) / statements (executescript)
+    callbacks: int = 0          # trace callbacks while executing: the statement itself + triggers
+
+
+@dataclass
+class Stmt:
+    sql: str
+    calls: int = 0
+    ms: float = 0.0
+    max_ms: float = 0.0
+    rows: int = 0
+    triggers: int = 0
+    plan: Optional[List[str]] = None
+    full_scans: List[str] = field(default_factory=list)
+
+
+class Tracer:
+    def __init__(self, out: Optional[Path] = None) -> None:
+        self.t0 = time.perf_counter()
+        self.out = out
+        self.events: List[Event] = []
+        self.stmts: Dict[str, Stmt] = {}
+        self.current: Optional[Event] = None
+        self.untraced = 0       # statements seen only by the trace callback (BEGIN/COMMIT/executescript...)
+        self.explaining = False
+
+    def start(self, conn: sqlite3.Connection, sql: str, params: Any) -> Event:
+        key = _norm(sql)
+        ev = Event(sql=key, t_ms=(time.perf_counter() - self.t0) * 1000)
+        st = self.stmts.get(key)
+        if st is None:
+            st = self.stmts[key] = Stmt(sql=key)
+            st.plan = self._explain(conn, sql, params)
+            st.full_scans = [p for p in st.plan or () if _is_full_scan(p)]
+        st.calls += 1
+        self.events.append(ev)
+        self.current = ev
+        return ev
+
+    def add(self, ev: Event, ms: float, rows: int = 0) -> None:
+        ev.ms += ms
+        ev.rows += rows
+        st = self.stmts[ev.sql]
+        st.ms += ms
+        st.rows += rows
+        st.max_ms = max(st.max_ms, ev.ms)
+
+    def on_trace(self, sql: str) -> None:
+        # fires when a statement starts stepping; trigger programs report their parent's SQL again
+        if self.explaining:
+            return
+        if self.current is None:
+            self.untraced += 1
+        else:
+            self.current.callbacks += 1
+
+    def executed(self, ev: Event, ms: float, rows: int, script: bool = False) -> None:
+        """Close the execute() phase of ev; later fetches only add time/rows."""
+        self.current = None
+        if script:
+            ev.many = ev.callbacks
+        else:
+            ev.triggers = max(0, ev.callbacks - max(1, ev.many))
+            self.stmts[ev.sql].triggers += ev.triggers
+        self.add(ev, ms, rows)
+
+    def _explain(self, conn: sqlite3.Connection, sql: str, params: Any) -> Optional[List[str]]:
+        if not sql.lstrip().upper().startswith(_EQP_KINDS):
+            return None
+        self.explaining = True
+        try:
+            # a plain cursor, so the EXPLAIN itself is not traced
+            rows = conn.cursor(sqlite3.Cursor).execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+            return [str(r[3]) for r in rows]
+        except (sqlite3.Error, ValueError):
+            return None
+        finally:
+            self.explaining = False
+
+    # -- reporting ---------------------------------------------------------
+
+    def summary(self) -> Dict[str, Any]:
+        wall = (time.perf_counter() - self.t0) * 1000
+        db_ms = sum(e.ms for e in self.events)
+        return {
+            "command": " ".join(sys.argv[1:]),
+            "wall_ms": round(wall, 3),
+            "db_ms": round(db_ms, 3),
+            "python_ms": round(wall - db_ms, 3),
+            "statements": len(self.events),
+            "distinct": len(self.stmts),
+            "untraced": self.untraced,
+        }
+
+    def report(self, err: IO[str]) -> None:
+        s = self.summary()
+        w = err.write
+        w(f"-- lc profile: {s['command'] or '(python)'}\n")
+        w(f"wall {s['wall_ms']:.1f} ms = db {s['db_ms']:.1f} ms + python {s['python_ms']:.1f} ms  "
+          f"({s['statements']} statements, {s['distinct']} distinct, {s['untraced']} untimed)\n")
+        slow = sorted(self.stmts.values(), key=lambda st: st.ms, reverse=True)[:TOP_N]
+        if slow:
+            w("slowest statements (total ms / calls / rows / triggers):\n")
+            for st in slow:
+                w(f"  {st.ms:8.2f}  x{st.calls:<4} rows={st.rows:<6} trg={st.triggers:<4} {_short(st.sql)}\n")
+        scans = [st for st in self.stmts.values() if st.full_scans]
+        if scans:
+            w("full table scans:\n")
+            for st in sorted(scans, key=lambda st: st.ms, reverse=True):
+                w(f"  {', '.join(st.full_scans)}  <- {_short(st.sql)}\n")
+
+    def dump(self, path: Path) -> None:
+        with path.open("w", encoding="utf-8") as f:
+            for ev in self.events:
+                st = self.stmts[ev.sql]
+                f.write(json.dumps({
+                    "t_ms": round(ev.t_ms, 3), "ms": round(ev.ms, 3), "rows": ev.rows,
+                    "triggers": ev.triggers, "many": ev.many, "sql": ev.sql, "plan": st.plan,
+                }, ensure_ascii=False) + "\n")
+            f.write(json.dumps({"summary": self.summary()}, ensure_ascii=False) + "\n")
+
+    def finish(self) -> None:
+        self.report(sys.stderr)
+        if self.out is not None:
+            self.dump(self.out)
+
+
+def _is_full_scan(detail: str) -> bool:
+    # "SCAN reviews" is a table scan; "SCAN x USING [COVERING] INDEX" walks an index,
+    # "SCAN (subquery-1)" / "SCAN CONSTANT ROW" read materialized/constant rows
+    return detail.startswith("SCAN ") and "USING" not in detail and not detail.startswith(("SCAN (", "SCAN CONSTANT"))
+
+
+def _short(sql: str, width: int = 110) -> str:
+    return sql if len(sql) <= width else sql[: width - 3] + "..."
+
+
+_TRACER: Optional[Tracer] = None
+
+
+class TracingCursor(sqlite3.Cursor):
+    _ev: Optional[Event] = None
+
+    def _run(self, method, sql: str, params: Any, many: bool = False):
+        tracer = _TRACER
+        if many:
+            params = list(params)
+        ev = tracer.start(self.connection, sql, params[0] if many and params else params)
+        ev.many = len(params) if many else 0
+        self._ev = ev
+        t0 = time.perf_counter()
+        try:
+            return method(sql, params)
+        finally:
+            ms = (time.perf_counter() - t0) * 1000
+            is_query = self.description is not None
+            tracer.executed(ev, ms, 0 if is_query else max(0, self.rowcount))
+
+    def execute(self, sql: str, params: Any = ()):
+        return self._run(super().execute, sql, params)
+
+    def executemany(self, sql: str, seq: Any):
+        return self._run(super().executemany, sql, seq, many=True)
+
+    def executescript(self, script: str):
+        tracer = _TRACER
+        ev = Event(sql="executescript: " + _short(_norm(script), 60), t_ms=(time.perf_counter() - tracer.t0) * 1000)
+        tracer.stmts.setdefault(ev.sql, Stmt(sql=ev.sql)).calls += 1
+        tracer.events.append(ev)
+        tracer.current = ev
+        t0 = time.perf_counter()
+        try:
+            return super().executescript(script)
+        finally:
+            tracer.executed(ev, (time.perf_counter() - t0) * 1000, 0, script=True)
+
+    def _fetch(self, method, *args):
+        t0 = time.perf_counter()
+        out = method(*args)
+        if self._ev is not None:
+            n = (1 if out is not None else 0) if method.__name__ in ("fetchone", "__next__") else len(out)
+            _TRACER.add(self._ev, (time.perf_counter() - t0) * 1000, n)
+        return out
+
+    def fetchone(self):
+        return self._fetch(super().fetchone)
+
+    def fetchmany(self, size: int = -1):
+        return self._fetch(super().fetchmany, size if size >= 0 else self.arraysize)
+
+    def fetchall(self):
+        return self._fetch(super().fetchall)
+
+    def __next__(self):
+        t0 = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            if self._ev is not None:
+                _TRACER.add(self._ev, (time.perf_counter() - t0) * 1000)
+            raise
+        if self._ev is not None:
+            _TRACER.add(self._ev, (time.perf_counter() - t0) * 1000, 1)
+        return row
+
+
+class TracingConnection(db.Connection):
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.set_trace_callback(_TRACER.on_trace)
+
+    def cursor(self, factory=TracingCursor):
+        return super().cursor(factory)
+
+    # Connection.execute & co. create their cursor in C, bypassing cursor(); route them explicitly
+    def execute(self, sql: str, params: Any = ()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql: str, seq: Any):
+        return self.cursor().executemany(sql, seq)
+
+    def executescript(self, script: str):
+        return self.cursor().executescript(script)
+
+
+def enable(out: Optional[Path] = None) -> Tracer:
+    """Trace every connection opened from now on; report at interpreter exit."""
+    global _TRACER
+    if _TRACER is None:
+        _TRACER = Tracer(out)
+        db.CONNECTION_FACTORY = TracingConnection
+        atexit.register(_TRACER.finish)
+    elif out is not None:
+        _TRACER.out = out
+    return _TRACER
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import heapq
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, fields
+from functools import partial
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar
+
+from . import clock
+from .history import HistoryItem, fetch_history
+from .stats import Stats, compute_stats
+
+# A workspace is a directory of per-user databases, one `<user>.db` per person.
+# Single-user commands are routed to a shard with LCSRS_WORKSPACE + LCSRS_USER
+# (db.DEFAULT_DB_PATH); the --all-users variants fan out over a process pool,
+# so aggregation over many shards scales with cores rather than running file by file.
+
+SHARD_SUFFIX = ".db"
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class WorkspaceStats:
+    per_user: Dict[str, Stats]
+    totals: Dict[str, int]     # summed count fields of Stats
+    errors: Dict[str, str]     # user -> error for shards that could not be read
+
+
+# Stats fields that add up across users (cursor fields are per-user only)
+SUMMED_FIELDS = tuple(f.name for f in fields(Stats) if f.name.endswith("_total") or f.name.startswith("logs_"))
+
+
+def shards(workspace: Path) -> Dict[str, Path]:
+    """user -> db path, sorted by user name."""
+    if not workspace.is_dir():
+        raise ValueError(f"workspace {workspace} is not a directory")
+    return {p.stem: p for p in sorted(workspace.glob(f"*{SHARD_SUFFIX}")) if p.is_file()}
+
+
+def shard_path(workspace: Path, user: str) -> Path:
+    return workspace / f"{user}{SHARD_SUFFIX}"
+
+
+def _safe(fn: Callable[[Path], T], path: Path) -> Tuple[Optional[T], Optional[str]]:
+    # runs in the worker: one bad shard must not sink the whole fan-out
+    try:
+        return fn(path), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+def fan_out(fn: Callable[[Path], T], workspace: Path, workers: Optional[int] = None
+            ) -> Tuple[Dict[str, T], Dict[str, str]]:
+    """
+    Call fn(db_path) on every shard in a process pool.
+    fn must be picklable (a module-level function or a functools.partial of one).
+    Returns (results by user, errors by user).
+    """
+    paths = shards(workspace)
+    if not paths:
+        return {}, {}
+    workers = min(workers or os.cpu_count() or 1, len(paths))
+    call = partial(_safe, fn)
+    if workers == 1:
+        outs = list(map(call, paths.values()))
+    else:
+        chunksize = max(1, len(paths) // (workers * 4))
+        # spawn/forkserver workers start with a fresh clock module: pass on a --now pin
+        with ProcessPoolExecutor(max_workers=workers, initializer=clock.set_now, initargs=(clock.pinned(),)) as ex:
+            outs = list(ex.map(call, paths.values(), chunksize=chunksize))
+
+    results: Dict[str, T] = {}
+    errors: Dict[str, str] = {}
+    for user, (res, err) in zip(paths, outs):
+        if err is None:
+            results[user] = res
+        else:
+            errors[user] = err
+    return results, errors
+
+
+def all_stats(workspace: Path, workers: Optional[int] = None) -> WorkspaceStats:
+    per_user, errors = fan_out(compute_stats, workspace, workers)
+    totals = {name: sum(getattr(s, name) for s in per_user.values()) for name in SUMMED_FIELDS}
+    return WorkspaceStats(per_user=per_user, totals=totals, errors=errors)
+
+
+def all_history(workspace: Path, n: int = 20, include_seed: bool = False, workers: Optional[int] = None
+                ) -> Tuple[List[Tuple[str, HistoryItem]], Dict[str, str]]:
+    """Most recent n logs across all users, newest first (each shard returns its own top n)."""
+    per_user, errors = fan_out(partial(fetch_history, n=n, include_seed=include_seed), workspace, workers)
+    streams = ([(user, it) for it in items] for user, items in per_user.items())
+    merged = heapq.merge(*streams, key=lambda ui: ui[1].reviewed_at, reverse=True)
+    return [ui for _, ui in zip(range(n), merged)], errors